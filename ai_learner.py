@@ -6,20 +6,32 @@ import torch
 import torch.nn as nn
 import torch.optim as optim
 import torch.nn.functional as F
+import torch.distributed as dist
 import importlib.util
 import itertools
+import functools
 import signal
 import getopt
 import sys
 import os
 import logging
+import json
 from collections import namedtuple, deque
 from traceback import print_exc
-from rubiks import Cube, face_relations
+import rubiks
+from rubiks import Cube, face_relations, format_actions
+import pattern_db
+import twophase
+import optimal
+import search
+import bidirectional
+import endgame
+import pocket
 
 # Path per salvare/caricare il modello
 MODEL_PATH = 'rubiks_dqn_model.pth'
-MEMORY_PATH = 'rubiks_memory.pkl'  # Opzionale: salva la replay memory
+MEMORY_DIR = 'rubiks_memory'  # Replay memory su disco (file mappati in memoria)
+MEMORY_PATH = 'rubiks_memory.pkl'  # Formato precedente della replay memory, convertito da --load_model
 OPTIMIZER_PATH = 'rubiks_optimizer.pth'  # Opzionale
 
 # Flag per modalità inference (no training, eps_threshold=0)
@@ -28,6 +40,27 @@ flag_inference_only = False
 # Number of blocks along each edge of the Cube.
 edge_length = 3
 
+# If True, the reward is driven by the pattern databases' distance estimate (3x3x3 only).
+flag_pdb_reward = False
+pattern_databases = None
+
+# Search solver used instead of the DQN's greedy walk ('twophase', 'optimal', 'astar', 'beam' or 'bidirectional'), or None.
+solver = None
+solvers = ('twophase', 'optimal', 'astar', 'beam', 'bidirectional')
+# Wall-clock budget of the optimal and bidirectional solvers, in seconds.
+solver_time = 60.
+# Weighted A* guided by the DQN: states expanded per forward pass, weight of the path cost, node limit.
+search_batch_size = 1000
+search_weight = 0.6
+search_max_nodes = 1000000
+# Beam search guided by the DQN: sequences kept at each depth, longest sequence tried.
+beam_width = 100
+beam_max_depth = 100
+
+# Depth of the endgame table finishing the attempts that reach it (see endgame.py), or None.
+endgame_depth = None
+endgame_table = None
+
 # Number of layers to use in the NN.
 num_layers = 3
 
@@ -46,6 +79,26 @@ solved_stats = []
 flag_term_point = True
 term_iter = 600000
 
+# Number of cubes stepped in lockstep by the training attempts.
+num_envs = 1
+
+# Largest number of cubes scrambled by composing each one's actions (see scrambled_faces).
+scramble_batch_size = 16
+
+# Number of actor processes feeding the learner (0: act and learn in turn, in one process).
+num_actors = 0
+# Learner steps between two publications of the weights to the actors.
+ACTOR_SYNC_STEPS = 50
+# Seconds between two throughput reports.
+REPORT_INTERVAL = 10.
+
+# Data-parallel training over torch.distributed (gloo): this process's rank among world_size,
+# each with its own cubes and replay memory shard. A stop asked on any rank (Ctrl+C) is agreed by all.
+flag_distributed = False
+rank = 0
+world_size = 1
+flag_stop_requested = False
+
 # Used in ReplayMemory class.
 Transition = namedtuple('Transition', ('state', 'action', 'next_state', 'reward'))
 
@@ -57,21 +110,35 @@ EPS_END = 0.03
 EPS_DECAY = 1000000
 TRANSITION_MEMORY_SIZE = 15000
 total_iterations = 0
+optimization_steps = 0
+
+# Prioritized replay (--prioritized): priority exponent, importance-sampling exponent
+# (annealed from its start to 1 over the given optimization steps) and the priority of a zero TD error.
+flag_prioritized_replay = False
+PRIORITY_ALPHA = 0.6
+PRIORITY_BETA_START = 0.4
+PRIORITY_BETA_STEPS = 100000
+PRIORITY_EPSILON = 1e-3
 
 # Memory of the past 3 actions, used for simple rule enforcement.
 recent_actions_len = 7
 recent_actions = deque([-1] * recent_actions_len, maxlen=recent_actions_len)
 
+# Random draws of the action choices, seeded with each attempt.
+uniform_draws = None
+
 # Creation of DQN and related objects.
 
 
 def save_model():
     """Salva il modello, optimizer e memory."""
-    torch.save(policy_net.state_dict(), MODEL_PATH)
+    if 'memory' in globals():  # Con --solver la replay memory non viene creata
+        memory.flush()  # Le transizioni sono già su disco: aggiorna solo lo schema
+    if rank != 0:
+        return  # I pesi sono uguali su tutti i rank: li salva solo il rank 0
+    net = policy_net.module if isinstance(policy_net, nn.parallel.DistributedDataParallel) else policy_net
+    torch.save(net.state_dict(), MODEL_PATH)
     torch.save(optimizer.state_dict(), OPTIMIZER_PATH)  # Opzionale
-    import pickle
-    with open(MEMORY_PATH, 'wb') as f:
-        pickle.dump(memory.memory, f)  # Opzionale: salva la lista di transizioni
     logging.info(f'Model saved in {MODEL_PATH}')
     print(f'Modello salvato in {MODEL_PATH}')
 
@@ -85,6 +152,13 @@ def exit_gracefully(signum, frame):
 	global time_start
 	global best_cube
 	global max_correct
+	global flag_stop_requested
+
+	if world_size > 1:
+		# The ranks cannot all be asked: they stop together at the next optimization step.
+		flag_stop_requested = True
+		print('\n---------- STOPPING AT THE NEXT OPTIMIZATION STEP ----------')
+		return
 
 	signal.signal(signal.SIGINT, original_sigint)
 	time_paused = time.time()
@@ -157,99 +231,478 @@ class DQN(nn.Module):
 
 
 class ReplayMemory(object):
-	""" Memory of past state transitions and their associated rewards. """
-	def __init__(self, capacity):
+	"""
+	Memory of past state transitions and their associated rewards.
+	States are stored as the colour of each square (uint8) in preallocated ring buffers,
+	and only one-hot encoded for the sampled batches.
+	Given a directory path, the buffers are memory-mapped .npy files there, which may exceed the RAM,
+	and a schema file records the cube size, capacity and write position, so that open() resumes them.
+	"""
+	# Version of the on-disk layout, stored in the schema.
+	store_version = 1
+
+	def __init__(self, capacity, edge_length, device, path=None):
 		self.capacity = capacity
-		self.memory = []
+		self.edge_length = edge_length
+		self.num_squares = 6 * edge_length * edge_length
+		self.device = device
+		self.path = path
 		self.position = 0
-
-	def push(self, *args):
-		"""Saves a transition."""
-		if len(self.memory) < self.capacity:
-			self.memory.append(None)
-		self.memory[self.position] = Transition(*args)
+		self.size = 0
+		for name, (shape, dtype) in self.fields().items():
+			if path is None:
+				buffer = np.zeros((capacity,) + shape, dtype=dtype)
+			else:
+				os.makedirs(path, exist_ok=True)
+				buffer = np.lib.format.open_memmap(
+					os.path.join(path, name + '.npy'), mode='w+', dtype=dtype, shape=(capacity,) + shape)
+			setattr(self, name, buffer)
+		# Row c is the one-hot encoding of colour c.
+		self.one_hot_colours = torch.eye(6, dtype=torch.float32, device=device)
+		if path is not None:
+			self.flush()
+
+	def fields(self):
+		"""Returns the shape (after the capacity) and dtype of every buffer."""
+		return {
+			'states': ((self.num_squares,), np.uint8), 'actions': ((), np.uint8),
+			'next_states': ((self.num_squares,), np.uint8), 'rewards': ((), np.float32)}
+
+	@staticmethod
+	def schema_path(path):
+		return os.path.join(path, 'schema.json')
+
+	@classmethod
+	def open(cls, path, capacity, edge_length, device):
+		"""
+		Reopens the on-disk memory at path; its buffers are paged in lazily as they are sampled.
+		Raises ValueError if it was written for another cube size or capacity.
+		"""
+		with open(cls.schema_path(path)) as f:
+			schema = json.load(f)
+		expected = {'version': cls.store_version, 'edge_length': edge_length, 'capacity': capacity}
+		for key, value in expected.items():
+			if schema.get(key) != value:
+				raise ValueError(f'La replay memory in {path} ha {key} = {schema.get(key)}, non {value}.')
+		memory = cls.__new__(cls)
+		memory.capacity = capacity
+		memory.edge_length = edge_length
+		memory.num_squares = 6 * edge_length * edge_length
+		memory.device = device
+		memory.path = path
+		memory.position = schema['position']
+		memory.size = schema['size']
+		for name, (shape, dtype) in memory.fields().items():
+			buffer = np.load(os.path.join(path, name + '.npy'), mmap_mode='r+')
+			if buffer.shape != (capacity,) + shape or buffer.dtype != dtype:
+				raise ValueError(f'Il file {name}.npy della replay memory in {path} non corrisponde allo schema.')
+			setattr(memory, name, buffer)
+		memory.one_hot_colours = torch.eye(6, dtype=torch.float32, device=device)
+		return memory
+
+	def flush(self):
+		"""Writes the dirty pages of the on-disk buffers and the schema (only the schema is rewritten)."""
+		if self.path is None:
+			return
+		for name in self.fields():
+			getattr(self, name).flush()
+		schema = {
+			'version': self.store_version, 'edge_length': self.edge_length, 'capacity': self.capacity,
+			'position': self.position, 'size': self.size}
+		temp_path = self.schema_path(self.path) + '.tmp'
+		with open(temp_path, 'w') as f:
+			json.dump(schema, f)
+		os.replace(temp_path, self.schema_path(self.path))
+
+	def push(self, state, action, next_state, reward):
+		"""Saves a transition: the square colours before and after the action, the action and the reward."""
+		self.states[self.position] = state
+		self.actions[self.position] = action
+		self.next_states[self.position] = next_state
+		self.rewards[self.position] = reward
 		self.position = (self.position + 1) % self.capacity
+		self.size = min(self.size + 1, self.capacity)
+
+	def push_batch(self, states, actions, next_states, rewards):
+		"""Saves a batch of transitions (one per row) at once, returning the positions they were written to."""
+		idxs = (self.position + np.arange(len(actions))) % self.capacity
+		self.states[idxs] = states
+		self.actions[idxs] = actions
+		self.next_states[idxs] = next_states
+		self.rewards[idxs] = rewards
+		self.position = (self.position + len(actions)) % self.capacity
+		self.size = min(self.size + len(actions), self.capacity)
+		return idxs
+
+	def one_hot(self, squares):
+		"""Returns the one-hot network input (shape (batch, 6 * num_squares)) of a batch of square colours."""
+		squares = torch.from_numpy(squares).to(self.device, dtype=torch.int64)
+		# index_select on the flat colours is several times faster than advanced indexing.
+		return torch.index_select(self.one_hot_colours, 0, squares.reshape(-1)).reshape(len(squares), -1)
+
+	def rows(self, idxs):
+		"""Returns copies of the square colours before, actions, square colours after and rewards at the given positions."""
+		return self.states[idxs], self.actions[idxs], self.next_states[idxs], self.rewards[idxs]
+
+	def transition(self, states, actions, next_states, rewards):
+		"""Returns stored rows as a Transition of batched tensors on the device."""
+		return Transition(
+			self.one_hot(states),
+			torch.from_numpy(actions).to(self.device, dtype=torch.int64),
+			self.one_hot(next_states),
+			torch.from_numpy(rewards).to(self.device))
 
 	def sample(self, batch_size):
-		return random.sample(self.memory, batch_size)
+		"""Returns batch_size distinct transitions as a Transition of batched tensors on the device."""
+		idxs = np.array(random.sample(range(self.size), batch_size))
+		return self.transition(*self.rows(idxs))
+
+	def state_dict(self):
+		"""Returns the stored transitions, oldest first."""
+		order = (np.arange(self.size) + (self.position if self.size == self.capacity else 0)) % self.capacity
+		return {
+			'states': self.states[order], 'actions': self.actions[order],
+			'next_states': self.next_states[order], 'rewards': self.rewards[order]}
+
+	def load_state_dict(self, saved):
+		"""Loads transitions saved by state_dict (or the Transition list of older versions), keeping the latest ones."""
+		if isinstance(saved, list):
+			# Older memories held one-hot state tensors: recover the square colours.
+			saved = [transition for transition in saved if transition is not None]
+			saved = {
+				'states': np.array([transition.state.reshape(-1, 6).argmax(1).cpu().numpy() for transition in saved]),
+				'actions': np.array([int(transition.action) for transition in saved]),
+				'next_states': np.array([transition.next_state.reshape(-1, 6).argmax(1).cpu().numpy() for transition in saved]),
+				'rewards': np.array([float(transition.reward) for transition in saved])}
+		if len(saved['states']) > 0 and saved['states'].shape[1] != self.num_squares:
+			print('La memoria salvata è di un cubo di dimensione diversa: ignorata.')
+			return
+		for state, action, next_state, reward in zip(saved['states'], saved['actions'], saved['next_states'], saved['rewards']):
+			self.push(state, action, next_state, reward)
 
 	def __len__(self):
-		return len(self.memory)
+		return self.size
+
+
+class SumTree(object):
+	"""
+	Array-based binary tree whose every node holds the sum of its two children.
+	Leaf i holds the priority of transition i; sampling and updates take O(log n) steps,
+	each vectorized over a whole batch.
+	"""
+	def __init__(self, capacity):
+		self.num_leaves = 1
+		while self.num_leaves < capacity:
+			self.num_leaves *= 2
+		# Node 1 is the root, the children of node n are 2n and 2n + 1, leaves start at num_leaves.
+		self.tree = np.zeros(2 * self.num_leaves, dtype=np.float64)
+
+	@property
+	def total(self):
+		return self.tree[1]
+
+	def update(self, idxs, priorities):
+		"""Sets the priorities of the given leaves, then the sums above them, level by level."""
+		nodes = np.asarray(idxs, dtype=np.int64) + self.num_leaves
+		self.tree[nodes] = priorities
+		nodes //= 2
+		while nodes[0] >= 1:
+			self.tree[nodes] = self.tree[2 * nodes] + self.tree[2 * nodes + 1]
+			nodes //= 2
+
+	def find(self, values):
+		"""Returns the leaf of each value: the first leaf where the running sum of priorities exceeds it."""
+		values = np.array(values, dtype=np.float64)
+		nodes = np.ones(len(values), dtype=np.int64)
+		while nodes[0] < self.num_leaves:
+			left = self.tree[2 * nodes]
+			go_right = values >= left
+			values -= np.where(go_right, left, 0.)
+			nodes = 2 * nodes + go_right
+		return nodes - self.num_leaves
+
+	def priorities(self, idxs):
+		return self.tree[np.asarray(idxs, dtype=np.int64) + self.num_leaves]
+
+
+class PrioritizedReplayMemory(ReplayMemory):
+	"""
+	Replay memory sampling each transition with probability proportional to its priority,
+	|TD error| ** PRIORITY_ALPHA, kept in a SumTree. New transitions get the highest priority seen,
+	so that each one is sampled at least once. Priorities are not saved: on resume they all start equal.
+	Sampling draws from the memory's own generator, seeded with --seed (offset by the rank).
+	"""
+	def __init__(self, capacity, edge_length, device, path=None):
+		super().__init__(capacity, edge_length, device, path)
+		self.init_priorities()
+
+	@classmethod
+	def open(cls, path, capacity, edge_length, device):
+		memory = super().open(path, capacity, edge_length, device)
+		memory.init_priorities()
+		return memory
+
+	def init_priorities(self):
+		self.generator = np.random.default_rng(root_seed)
+		self.sum_tree = SumTree(self.capacity)
+		self.max_priority = 1.
+		if self.size > 0:
+			self.sum_tree.update(np.arange(self.size), np.full(self.size, self.max_priority))
+
+	def push(self, state, action, next_state, reward):
+		"""Saves a transition with the highest priority seen so far."""
+		self.sum_tree.update([self.position], [self.max_priority])
+		super().push(state, action, next_state, reward)
+
+	def push_batch(self, states, actions, next_states, rewards):
+		"""Saves a batch of transitions with the highest priority seen so far."""
+		idxs = super().push_batch(states, actions, next_states, rewards)
+		self.sum_tree.update(idxs, np.full(len(idxs), self.max_priority))
+		return idxs
+
+	def sample(self, batch_size, beta):
+		"""
+		Returns a Transition of batch_size transitions, drawn by priority (one from each of batch_size
+		equal slices of the total), their indices and their importance-sampling weights (tensor),
+		(N * P(i)) ** -beta normalized by the largest one of the batch.
+		"""
+		total = self.sum_tree.total
+		values = (np.arange(batch_size) + self.generator.random(batch_size)) * (total / batch_size)
+		# Rounding can send a value past the last stored transition.
+		idxs = np.minimum(self.sum_tree.find(values), self.size - 1)
+		probabilities = self.sum_tree.priorities(idxs) / total
+		weights = (self.size * probabilities) ** -beta
+		weights /= weights.max()
+		batch = self.transition(*self.rows(idxs))
+		return batch, idxs, torch.as_tensor(weights, dtype=torch.float32, device=self.device)
+
+	def update_priorities(self, idxs, td_errors):
+		"""Sets the priorities of the sampled transitions from their new TD errors."""
+		priorities = (np.abs(td_errors) + PRIORITY_EPSILON) ** PRIORITY_ALPHA
+		self.max_priority = max(self.max_priority, float(priorities.max()))
+		self.sum_tree.update(idxs, priorities)
+
+
+class SharedReplayMemory(ReplayMemory):
+	"""
+	Replay memory shared by the processes forked after its creation: the actors push, the learner samples.
+	The memory-mapped buffers are already shared (buffers kept in RAM are moved to shared memory),
+	and the write position, size and number of transitions ever pushed live in a shared tensor,
+	updated under a lock together with the rows they cover.
+	"""
+	def __init__(self, capacity, edge_length, device, path=None):
+		# The counts must exist before the first flush.
+		self.init_counts(0, 0)
+		super().__init__(capacity, edge_length, device, path)
+		if path is None:
+			for name in self.fields():
+				setattr(self, name, torch.from_numpy(getattr(self, name)).clone().share_memory_().numpy())
+
+	@classmethod
+	def open(cls, path, capacity, edge_length, device):
+		memory = super().open(path, capacity, edge_length, device)
+		memory.init_counts(memory.position, memory.size)
+		return memory
+
+	def init_counts(self, position, size):
+		self.lock = torch.multiprocessing.get_context('fork').Lock()
+		self.counts = torch.tensor([position, size, 0], dtype=torch.int64).share_memory_()
+
+	@property
+	def num_pushed(self):
+		"""Number of transitions pushed by all the processes since the memory was created or opened."""
+		return int(self.counts[2])
+
+	def refresh(self):
+		"""Reads the write position and size left by the other processes."""
+		self.position, self.size = int(self.counts[0]), int(self.counts[1])
+
+	def push(self, state, action, next_state, reward):
+		self.push_batch([state], [action], [next_state], [reward])
+
+	def push_batch(self, states, actions, next_states, rewards):
+		with self.lock:
+			self.refresh()
+			idxs = super().push_batch(states, actions, next_states, rewards)
+			self.counts[0], self.counts[1] = self.position, self.size
+			self.counts[2] += len(idxs)
+		return idxs
+
+	def sample(self, batch_size):
+		self.refresh()
+		return super().sample(batch_size)
+
+	def rows(self, idxs):
+		# The actors write whole rows under the lock: copying under it too never mixes an old and a new transition.
+		with self.lock:
+			return super().rows(idxs)
+
+	def flush(self):
+		with self.lock:
+			self.refresh()
+			super().flush()
+
+	def state_dict(self):
+		with self.lock:
+			self.refresh()
+			return super().state_dict()
+
+	def __len__(self):
+		return int(self.counts[1])
+
+
+class UniformBuffer():
+	"""
+	Uniform draws in [0, 1) generated on the host a block at a time, handed out in order,
+	so that choosing actions never waits on a random number generator call per cube.
+	"""
+	def __init__(self, seed, block_size=2 ** 16):
+		self.generator = np.random.default_rng(seed)
+		self.block_size = block_size
+		self.draws = self.generator.random(block_size)
+		self.position = 0
+
+	def take(self, num_draws):
+		""" Returns the next num_draws draws. """
+		if self.position + num_draws > len(self.draws):
+			self.draws = np.concatenate([self.draws[self.position:], self.generator.random(max(self.block_size, num_draws))])
+			self.position = 0
+		draws = self.draws[self.position:self.position + num_draws]
+		self.position += num_draws
+		return draws
 
 
 def select_action(state):
-    """ Generate an action, depending on the current state. """
+    """ Generate an action, depending on the current state (the single cube version of select_actions). """
     global total_iterations
     global eps_threshold
 
-    sample = random.random()
     eps_threshold = EPS_END + (EPS_START - EPS_END) * \
         np.exp(-1. * total_iterations / EPS_DECAY)
+    last_actions = list(itertools.islice(recent_actions, len(recent_actions) - 3, len(recent_actions)))
+    mask = action_mask_table(rubiks.num_actions(edge_length))[last_actions[-1] + 1, int(len(set(last_actions)) == 1)]
+    draw, rank_draw = uniform_draws.take(2)
 
-    if sample > eps_threshold:
+    if draw > eps_threshold:
         with torch.no_grad():
-            # Assicura state su device (ridondante, ma safe)
-            state = state.to(device)
-            # Take max valid action
-            actions = torch.argsort(policy_net.forward(state), descending=True)
-            actions_idx = 0
-            action = actions[actions_idx]
-            while not check_valid_action(action.item()):  # Usa .item() per int-check
-                actions_idx += 1
-                action = actions[actions_idx]
+            # Take max valid action, copying the Q values back once.
+            q_values = policy_net(state.to(device)).cpu().numpy()
+        action = int(np.argmax(np.where(mask, q_values, -np.inf)))
     else:
-        # Take random valid action - CREA SU DEVICE!
-        action = torch.randint(low=0, high=6*2, size=(1,), dtype=torch.long, device=device)[0]
-        while not check_valid_action(action.item()):  # Usa .item() per int-check
-            action = torch.randint(low=0, high=6*2, size=(1,), dtype=torch.long, device=device)[0]
+        # Take random valid action.
+        valid_actions = np.flatnonzero(mask)
+        action = int(valid_actions[int(rank_draw * len(valid_actions))])
 
-    recent_actions.append(int(action))  # Converti a int per la deque
+    recent_actions.append(action)
     total_iterations += 1
-    return action.view(1)  # Resta su device
+    return torch.tensor([action], device=device)
 
 
-def check_valid_action(action):
-	""" Returns whether the given action is valid, given the rule-set. """
-	flag_valid_action = True
+def select_actions(states, recent_actions):
+	"""
+	Generate one action per cube of a batch, depending on the current states (one-hot, one row per cube)
+	and the last 3 actions of each cube (shape (batch, 3), most recent last, -1 for none).
+	Greedy actions are the max valid ones, random actions are drawn uniformly among all the valid ones.
+	"""
+	global total_iterations
+	global eps_threshold
+
+	eps_threshold = EPS_END + (EPS_START - EPS_END) * \
+		np.exp(-1. * total_iterations / EPS_DECAY)
+	num_envs = len(recent_actions)
+	masks = valid_action_masks(recent_actions, rubiks.num_actions(edge_length))
+	explore = uniform_draws.take(num_envs) <= eps_threshold
+
+	actions = np.empty(num_envs, dtype=np.int64)
+	if not np.all(explore):
+		# Take the max valid actions, with one forward pass (and one copy back) for the whole batch.
+		greedy = ~explore
+		with torch.no_grad():
+			q_values = policy_net(states[torch.from_numpy(greedy).to(states.device)]).cpu().numpy()
+		actions[greedy] = np.argmax(np.where(masks[greedy], q_values, -np.inf), axis=1)
+	if np.any(explore):
+		# Take random valid actions: the k-th valid action of each row, for a uniform k.
+		explore_masks = masks[explore]
+		ranks = (uniform_draws.take(len(explore_masks)) * np.sum(explore_masks, axis=1)).astype(np.int64)
+		actions[explore] = np.argmax(np.cumsum(explore_masks, axis=1) > ranks[:, np.newaxis], axis=1)
+
+	total_iterations += num_envs
+	return actions
+
+
+@functools.lru_cache(maxsize=None)
+def action_mask_table(num_actions):
+	"""
+	Returns the (num_actions + 1, 2, num_actions) boolean table of the actions allowed by the rule-set,
+	indexed by the last action plus one (0 when there is none yet) and by whether the last 3 actions were all that one.
+	"""
+	last_actions = np.arange(-1, num_actions)[:, np.newaxis, np.newaxis]
+	repeated = np.array([False, True])[:, np.newaxis]
+	actions = np.arange(num_actions)
+	# Disallow moves that counter the previous move, and 4 similar consecutive moves.
+	table = ~((actions == last_actions ^ 1) | ((actions == last_actions) & repeated))
+	table.setflags(write=False)
+	return table
 
-	# Disallow moves that counter the previous move.
-	if action % 2 == 0:
-		if recent_actions[-1] == action + 1:
-			flag_valid_action = False
-	else:
-		if recent_actions[-1] == action - 1:
-			flag_valid_action = False
 
-	# Disallow 4 similar consecutive moves.
-	if recent_actions[-1] == action and len(set(itertools.islice(recent_actions, len(recent_actions) - 3, len(recent_actions)))) == 1:
-		flag_valid_action = False
+def valid_action_masks(recent_actions, num_actions):
+	"""
+	Returns which of the num_actions actions the rule-set allows after each row of the last 3 actions
+	(shape (batch, 3), most recent last), as a (batch, num_actions) boolean array.
+	"""
+	recent_actions = np.asarray(recent_actions)
+	last_actions = recent_actions[:, -1]
+	repeated = np.all(recent_actions == last_actions[:, np.newaxis], axis=1)
+	return action_mask_table(num_actions)[last_actions + 1, repeated.astype(np.intp)]
 
-	return flag_valid_action
+
+def check_valid_action(action):
+	""" Returns whether the given action is valid, given the rule-set. """
+	return bool(valid_action_masks([list(recent_actions)[-3:]], rubiks.num_actions(edge_length))[0, action])
 
 
 def optimize_model():
 	""" Update the model. """
-	if len(memory) < BATCH_SIZE:
+	global optimization_steps
+
+	ready = len(memory) >= BATCH_SIZE
+	if world_size > 1:
+		# Every rank must take the same steps: skip unless all of them are ready, and stop together.
+		flags = torch.tensor([float(flag_stop_requested), float(not ready)])
+		dist.all_reduce(flags, op=dist.ReduceOp.MAX)
+		if flags[0] > 0:
+			stop_distributed_training()
+			return
+		ready = bool(flags[1] == 0)
+	if not ready:
 		return
-	transitions = memory.sample(BATCH_SIZE)
-	batch = Transition(*zip(*transitions))
-
-	state_batch = torch.cat(batch.state).to(device).reshape(-1, 6 * 6 * edge_length * edge_length)
-	next_state_batch = torch.cat(batch.next_state).to(device).reshape(-1, 6 * 6 * edge_length * edge_length)
-	action_batch = torch.cat(batch.action).to(device)
-	reward_batch = torch.cat(batch.reward).to(device)
+	if flag_prioritized_replay:
+		beta = min(1., PRIORITY_BETA_START + (1. - PRIORITY_BETA_START) * optimization_steps / PRIORITY_BETA_STEPS)
+		batch, idxs, weights = memory.sample(BATCH_SIZE, beta)
+	else:
+		batch = memory.sample(BATCH_SIZE)
+	state_batch, action_batch, next_state_batch, reward_batch = batch
 
 	# Compute Q(s_t, a):
 	# Computes Q(s_t), then selects the columns of actions taken.
 	state_action_values = policy_net(state_batch).gather(1, action_batch.unsqueeze(1))
 
 	# Compute V(s_{t+1}) for all next states.
-	next_state_values = policy_net(next_state_batch).max(1)[0].detach()
+	# No graph is needed: DistributedDataParallel expects the backward pass of a single forward pass.
+	with torch.no_grad():
+		next_state_values = policy_net(next_state_batch).max(1)[0]
 	# Compute the expected Q values.
 	expected_state_action_values = reward_batch + GAMMA * next_state_values
 
 	# Compute Huber loss.
-	loss = F.smooth_l1_loss(state_action_values, expected_state_action_values.unsqueeze(1))
+	if flag_prioritized_replay:
+		# Weighted by importance sampling; the new TD errors become the priorities.
+		losses = F.smooth_l1_loss(state_action_values, expected_state_action_values.unsqueeze(1), reduction='none')
+		loss = (weights * losses.squeeze(1)).mean()
+		td_errors = (expected_state_action_values.unsqueeze(1) - state_action_values).detach().squeeze(1)
+		memory.update_priorities(idxs, td_errors.cpu().numpy())
+	else:
+		loss = F.smooth_l1_loss(state_action_values, expected_state_action_values.unsqueeze(1))
 
 	# Optimize the model.
 	optimizer.zero_grad()
@@ -257,237 +710,223 @@ def optimize_model():
 	for param in policy_net.parameters():
 		param.grad.data.clamp_(-6, 6)
 	optimizer.step()
+	optimization_steps += 1
 
 
-def reward_function(cube):
-	""" Calculates a cube's reward, which is a scalar measurement of how good it is. """
-	total_correct = 0.
-	reward = 0.
+def stop_distributed_training():
+	""" Stop every rank, after a stop was asked on one of them; rank 0 saves the model. """
+	global flag_continue_main
+	global flag_continue_attempt
 
-	# Check corner correctness.
-	total_correct_corners = 0
-	total_correct_corners += check_corners(cube.faces)
-	total_correct_corners *= 3
-	total_correct += total_correct_corners
+	flag_continue_main = False
+	flag_continue_attempt = False
+	print('\n---------- QUITTING ----------')
+	save_model()
 
-	if cube.edge_length >= 3:
-		# Check edge correctness.
-		total_correct_edges = 0
-		total_correct_edges += check_edges(cube.faces, cube.edge_length)
-		total_correct_edges *= 2
-		total_correct += total_correct_edges
 
-		# Check inner correctness.
-		total_correct_inner = check_inner(cube.faces, cube.edge_length)
-		total_correct += total_correct_inner
+@functools.lru_cache(maxsize=None)
+def reward_index_tables(edge_length):
+	"""
+	Returns the tables scoring a Cube of the given size: the colour of every (flat) facelet when solved,
+	then the facelet indices of the (8, 3) corner triples, the (12*(N-2), 2) edge pairs and the inner squares.
+	"""
+	facelets = np.arange(6 * edge_length * edge_length).reshape(6, edge_length, edge_length)
+	corners = []
+	edges = []
+	for face_idx in [0, 5]:
+		u, l, d, r = (face_relations['_'.join([str(face_idx), side])] for side in 'uldr')
+		if face_idx == 0:
+			corners += [
+				[(0, 0, 0), (l, 0, -1), (u, -1, 0)], [(0, 0, -1), (r, 0, 0), (u, -1, -1)],
+				[(0, -1, 0), (l, -1, -1), (d, 0, 0)], [(0, -1, -1), (r, -1, 0), (d, 0, -1)]]
+		else:
+			corners += [
+				[(5, 0, 0), (l, 0, -1), (u, 0, -1)], [(5, 0, -1), (r, 0, 0), (u, 0, 0)],
+				[(5, -1, 0), (l, -1, -1), (d, -1, -1)], [(5, -1, -1), (r, -1, 0), (d, -1, 0)]]
+	for face_idx in [0, 1, 3, 5]:
+		u, l, d, r = (face_relations['_'.join([str(face_idx), side])] for side in 'uldr')
+		for edge_idx in range(1, edge_length - 1):
+			if face_idx == 0:
+				edges += [
+					[(0, 0, edge_idx), (u, -1, edge_idx)], [(0, edge_idx, 0), (l, edge_idx, -1)],
+					[(0, -1, edge_idx), (d, 0, edge_idx)], [(0, edge_idx, -1), (r, edge_idx, 0)]]
+			elif face_idx == 1:
+				edges += [[(1, edge_idx, 0), (l, 0, edge_idx)], [(1, edge_idx, -1), (r, 0, -1-edge_idx)]]
+			elif face_idx == 3:
+				edges += [[(3, edge_idx, 0), (l, -1, -1-edge_idx)], [(3, edge_idx, -1), (r, -1, edge_idx)]]
+			else:
+				edges += [
+					[(5, 0, edge_idx), (u, 0, -1-edge_idx)], [(5, edge_idx, 0), (l, edge_idx, -1)],
+					[(5, -1, edge_idx), (d, -1, -1-edge_idx)], [(5, edge_idx, -1), (r, edge_idx, 0)]]
 
-	reward += total_correct
+	corner_idxs = np.array([[facelets[square] for square in corner] for corner in corners], dtype=np.intp)
+	edge_idxs = np.array([[facelets[square] for square in edge] for edge in edges], dtype=np.intp).reshape(-1, 2)
+	inner_idxs = facelets[:, 1:-1, 1:-1].ravel()
+	facelet_colours = facelets.ravel() // (edge_length * edge_length)
+	for table in (facelet_colours, corner_idxs, edge_idxs, inner_idxs):
+		table.setflags(write=False)
+	return facelet_colours, corner_idxs, edge_idxs, inner_idxs
 
-	for face_idx,face in enumerate(cube.faces):
-		# Provides up to 2 extra points for each face, depending on colour correctness.
-		num_correct_colours = np.sum(face.flatten() == face_idx)
-		reward += 2 * num_correct_colours / (cube.edge_length * cube.edge_length)
 
-	return total_correct, reward
+def correct_facelets(faces):
+	""" Returns which facelets of a cube (or of each cube of a batch (B, 6, N, N)) show their own face's colour, flattened. """
+	facelet_colours = reward_index_tables(faces.shape[-1])[0]
+	return faces.reshape(faces.shape[:-3] + (-1,)) == facelet_colours
 
 
 def check_inner(faces, edge_length):
 	"""
-	Returns the number of inner blocks of a cube that are correct.
+	Returns the number of inner blocks of a cube (or of each cube of a batch (B, 6, N, N)) that are correct.
 	"""
-	num_correct_inner = 0
-
-	for face_idx in range(6):
-		num_correct_inner += np.sum(faces[face_idx, 1:-1, 1:-1] == face_idx)
-	return num_correct_inner
+	inner_idxs = reward_index_tables(edge_length)[3]
+	return np.sum(correct_facelets(faces)[..., inner_idxs], axis=-1)
 
 
 def check_edges(faces, edge_length):
 	"""
-	Returns the number of edge blocks of a cube that are entirely correct.
+	Returns the number of edge blocks of a cube (or of each cube of a batch) that are entirely correct.
 	"""
-	num_correct_edges = 0
+	edge_idxs = reward_index_tables(edge_length)[2]
+	return np.sum(np.all(correct_facelets(faces)[..., edge_idxs], axis=-1), axis=-1)
 
-	for face_idx in [0, 1, 3, 5]:
-		# Face above.
-		u_face_colour = face_relations['_'.join([str(face_idx), 'u'])]
-		u_face = faces[u_face_colour]
-
-		# Face to the left.
-		l_face_colour = face_relations['_'.join([str(face_idx), 'l'])]
-		l_face = faces[l_face_colour]
-
-		# Face below.
-		d_face_colour = face_relations['_'.join([str(face_idx), 'd'])]
-		d_face = faces[d_face_colour]
-
-		# Face to the right.
-		r_face_colour = face_relations['_'.join([str(face_idx), 'r'])]
-		r_face = faces[r_face_colour]
 
-		if face_idx == 0:
-			# Check all 4 sides of face 0
-			for edge_idx in range(1, edge_length - 1):
-				# Upper edge
-				if faces[face_idx, 0, edge_idx] == face_idx:
-					u_face_edge = u_face[-1, edge_idx]
-					if u_face_edge == u_face_colour:
-						num_correct_edges += 1
-				# Left edge
-				if faces[face_idx, edge_idx, 0] == face_idx:
-					l_face_edge = l_face[edge_idx, -1]
-					if l_face_edge == l_face_colour:
-						num_correct_edges += 1
-				# Bottom edge
-				if faces[face_idx, -1, edge_idx] == face_idx:
-					d_face_edge = d_face[0, edge_idx]
-					if d_face_edge == d_face_colour:
-						num_correct_edges += 1
-				# Right edge
-				if faces[face_idx, edge_idx, -1] == face_idx:
-					r_face_edge = r_face[edge_idx, 0]
-					if r_face_edge == r_face_colour:
-						num_correct_edges += 1
-
-		elif face_idx == 1:
-			# Check left and right sides of face 1
-			for edge_idx in range(1, edge_length - 1):
-				# Left edge
-				if faces[face_idx, edge_idx, 0] == face_idx:
-					l_face_edge = l_face[0, edge_idx]
-					if l_face_edge == l_face_colour:
-						num_correct_edges += 1
-				# Right edge
-				if faces[face_idx, edge_idx, -1] == face_idx:
-					r_face_edge = r_face[0, -1-edge_idx]
-					if r_face_edge == r_face_colour:
-						num_correct_edges += 1
-
-		elif face_idx == 3:
-			# Check left and right sides of face 3
-			for edge_idx in range(1, edge_length - 1):
-				# Left edge
-				if faces[face_idx, edge_idx, 0] == face_idx:
-					l_face_edge = l_face[-1, -1-edge_idx]
-					if l_face_edge == l_face_colour:
-						num_correct_edges += 1
-				# Right edge
-				if faces[face_idx, edge_idx, -1] == face_idx:
-					r_face_edge = r_face[-1, edge_idx]
-					if r_face_edge == r_face_colour:
-						num_correct_edges += 1
-
-		elif face_idx == 5:
-			# Check all 4 sides of face 5
-			for edge_idx in range(1, edge_length - 1):
-				# Upper edge
-				if faces[face_idx, 0, edge_idx] == face_idx:
-					u_face_edge = u_face[0, -1-edge_idx]
-					if u_face_edge == u_face_colour:
-						num_correct_edges += 1
-				# Left edge
-				if faces[face_idx, edge_idx, 0] == face_idx:
-					l_face_edge = l_face[edge_idx, -1]
-					if l_face_edge == l_face_colour:
-						num_correct_edges += 1
-				# Bottom edge
-				if faces[face_idx, -1, edge_idx] == face_idx:
-					d_face_edge = d_face[-1, -1-edge_idx]
-					if d_face_edge == d_face_colour:
-						num_correct_edges += 1
-				# Right edge
-				if faces[face_idx, edge_idx, -1] == face_idx:
-					r_face_edge = r_face[edge_idx, 0]
-					if r_face_edge == r_face_colour:
-						num_correct_edges += 1
-
-	return num_correct_edges
+def check_corners(faces):
+	"""
+	Returns the number of corner blocks of a cube (or of each cube of a batch) that are entirely correct.
+	"""
+	corner_idxs = reward_index_tables(faces.shape[-1])[1]
+	return np.sum(np.all(correct_facelets(faces)[..., corner_idxs], axis=-1), axis=-1)
 
 
-def check_corners(faces):
+def batch_reward_function(faces):
 	"""
-	Returns the number of corner blocks of a cube that are entirely correct.
+	Calculates the number of correct squares and the reward of every cube of a batch of faces (B, 6, N, N),
+	returned as two float arrays, with the same values as reward_function.
 	"""
-	num_correct_corners = 0
+	faces = np.asarray(faces)
+	edge_length = faces.shape[-1]
+	_, corner_idxs, edge_idxs, inner_idxs = reward_index_tables(edge_length)
+	correct = correct_facelets(faces)
+
+	# Corners count 3 squares and edges 2.
+	total_correct = 3. * np.sum(np.all(correct[:, corner_idxs], axis=-1), axis=-1)
+	if edge_length >= 3:
+		total_correct += 2 * np.sum(np.all(correct[:, edge_idxs], axis=-1), axis=-1) + np.sum(correct[:, inner_idxs], axis=-1)
+
+	if flag_pdb_reward:
+		return total_correct, pdb_reward(faces, total_correct)
+
+	# Provides up to 2 extra points for each face, depending on colour correctness.
+	# The cumulative sum adds them face by face, rounding exactly as the scalar version always did.
+	face_points = 2 * np.sum(correct.reshape(len(faces), 6, -1), axis=-1) / (edge_length * edge_length)
+	reward = np.cumsum(np.column_stack([total_correct, face_points]), axis=1)[:, -1]
+	return total_correct, reward
 
-	for face_idx in [0, 5]:
-		# Face above.
-		u_face_colour = face_relations['_'.join([str(face_idx), 'u'])]
-		u_face = faces[u_face_colour]
 
-		# Face to the left.
-		l_face_colour = face_relations['_'.join([str(face_idx), 'l'])]
-		l_face = faces[l_face_colour]
+def reward_function(cube):
+	""" Calculates a cube's reward, which is a scalar measurement of how good it is. """
+	total_correct, reward = batch_reward_function(cube.faces[np.newaxis])
+	return float(total_correct[0]), float(reward[0])
 
-		# Face below.
-		d_face_colour = face_relations['_'.join([str(face_idx), 'd'])]
-		d_face = faces[d_face_colour]
 
-		# Face to the right.
-		r_face_colour = face_relations['_'.join([str(face_idx), 'r'])]
-		r_face = faces[r_face_colour]
+def pdb_reward(faces, total_correct):
+	"""
+	Reward guided by the pattern databases: the reward of a solved cube,
+	minus 6 points for each move the databases say is still needed.
+	Takes a batch of faces and their numbers of correct squares.
+	"""
+	num_squares = faces[0].size
+	try:
+		estimates = pattern_db.heuristic(faces, pattern_databases)
+	except ValueError:
+		if len(faces) > 1:
+			return np.concatenate([pdb_reward(faces[idx:idx + 1], total_correct[idx:idx + 1]) for idx in range(len(faces))])
+		# Not a reachable 3x3x3 state: fall back on the correct squares alone.
+		return np.asarray(total_correct, dtype=float)
+	return (num_squares + 12 - 6 * np.asarray(estimates)).astype(float)
+
+class RewardScorer():
+	"""
+	Incremental version of reward_function: keeps the correctness of every facelet, corner and edge,
+	and after an action only rechecks the facelets it moved (and the corners and edges holding them).
+	Returns the same (total_correct, reward) values as reward_function.
+	"""
+	def __init__(self, edge_length):
+		self.edge_length = edge_length
+		facelet_colours, corner_idxs, edge_idxs, inner_idxs = reward_index_tables(edge_length)
+		num_facelets = len(facelet_colours)
+		self.facelet_colours = facelet_colours.tolist()
+		self.corner_facelets = corner_idxs.tolist()
+		self.edge_facelets = edge_idxs.tolist()
+		self.is_inner = np.isin(np.arange(num_facelets), inner_idxs).tolist()
+
+		# Corner or edge holding each facelet, -1 for none.
+		facelet_corners = np.full(num_facelets, -1)
+		facelet_corners[corner_idxs] = np.arange(len(corner_idxs))[:, np.newaxis]
+		facelet_edges = np.full(num_facelets, -1)
+		facelet_edges[edge_idxs] = np.arange(len(edge_idxs))[:, np.newaxis]
+
+		# Facelets moved by each action, then the corners and edges holding them.
+		move_table = rubiks.get_move_table(edge_length)
+		self.touched_facelets = []
+		self.touched_corners = []
+		self.touched_edges = []
+		for action_table in move_table:
+			touched = np.flatnonzero(action_table != np.arange(num_facelets))
+			self.touched_facelets.append(touched)
+			self.touched_corners.append([int(corner) for corner in np.unique(facelet_corners[touched]) if corner >= 0])
+			self.touched_edges.append([int(edge) for edge in np.unique(facelet_edges[touched]) if edge >= 0])
+
+	def reset(self, cube):
+		""" Recount everything for the given cube, returning its (total_correct, reward). """
+		self.correct = correct_facelets(cube.faces).tolist()
+		self.corner_correct = [all(self.correct[idx] for idx in corner) for corner in self.corner_facelets]
+		self.edge_correct = [all(self.correct[idx] for idx in edge) for edge in self.edge_facelets]
+		self.num_correct_corners = sum(self.corner_correct)
+		self.num_correct_edges = sum(self.edge_correct)
+		self.num_correct_inner = sum(correct for correct, inner in zip(self.correct, self.is_inner) if inner)
+		num_face_squares = self.edge_length * self.edge_length
+		self.num_correct_colours = [sum(self.correct[face_idx * num_face_squares:(face_idx + 1) * num_face_squares]) for face_idx in range(6)]
+		return self.score(cube)
+
+	def update(self, cube, action):
+		""" Account for the given action, just taken by the cube, returning its (total_correct, reward). """
+		touched = self.touched_facelets[action]
+		num_face_squares = self.edge_length * self.edge_length
+		for idx, colour in zip(touched.tolist(), cube.faces.reshape(-1)[touched].tolist()):
+			correct = colour == self.facelet_colours[idx]
+			if correct != self.correct[idx]:
+				self.correct[idx] = correct
+				delta = 1 if correct else -1
+				self.num_correct_colours[idx // num_face_squares] += delta
+				if self.is_inner[idx]:
+					self.num_correct_inner += delta
+		for corner in self.touched_corners[action]:
+			correct = all(self.correct[idx] for idx in self.corner_facelets[corner])
+			if correct != self.corner_correct[corner]:
+				self.corner_correct[corner] = correct
+				self.num_correct_corners += 1 if correct else -1
+		for edge in self.touched_edges[action]:
+			correct = all(self.correct[idx] for idx in self.edge_facelets[edge])
+			if correct != self.edge_correct[edge]:
+				self.edge_correct[edge] = correct
+				self.num_correct_edges += 1 if correct else -1
+		return self.score(cube)
+
+	def score(self, cube):
+		""" Returns (total_correct, reward) from the counters, adding them up in the order reward_function does. """
+		total_correct = 3. * self.num_correct_corners
+		if self.edge_length >= 3:
+			total_correct += 2 * self.num_correct_edges + self.num_correct_inner
+
+		if flag_pdb_reward:
+			return total_correct, float(pdb_reward(cube.faces[np.newaxis], np.array([total_correct]))[0])
+
+		reward = total_correct
+		for num_correct_colours in self.num_correct_colours:
+			reward += 2 * num_correct_colours / (self.edge_length * self.edge_length)
+		return total_correct, reward
 
-		if face_idx == 0:
-			# Top-left
-			if faces[face_idx, 0, 0] == face_idx:
-				l_face_corner = l_face[0, -1]
-				if l_face_corner == l_face_colour:
-					u_face_corner = u_face[-1, 0]
-					if u_face_corner == u_face_colour:
-						num_correct_corners += 1
-			# Top-right
-			if faces[face_idx, 0, -1] == face_idx:
-				r_face_corner = r_face[0, 0]
-				if r_face_corner == r_face_colour:
-					u_face_corner = u_face[-1, -1]
-					if u_face_corner == u_face_colour:
-						num_correct_corners += 1
-			# Bottom-left
-			if faces[face_idx, -1, 0] == face_idx:
-				l_face_corner = l_face[-1, -1]
-				if l_face_corner == l_face_colour:
-					d_face_corner = d_face[0, 0]
-					if d_face_corner == d_face_colour:
-						num_correct_corners += 1
-			# Bottom-right
-			if faces[face_idx, -1, -1] == face_idx:
-				r_face_corner = r_face[-1, 0]
-				if r_face_corner == r_face_colour:
-					d_face_corner = d_face[0, -1]
-					if d_face_corner == d_face_colour:
-						num_correct_corners += 1
-
-		elif face_idx == 5:
-			# Top-left
-			if faces[face_idx, 0, 0] == face_idx:
-				l_face_corner = l_face[0, -1]
-				if l_face_corner == l_face_colour:
-					u_face_corner = u_face[0, -1]
-					if u_face_corner == u_face_colour:
-						num_correct_corners += 1
-			# Top-right
-			if faces[face_idx, 0, -1] == face_idx:
-				r_face_corner = r_face[0, 0]
-				if r_face_corner == r_face_colour:
-					u_face_corner = u_face[0, 0]
-					if u_face_corner == u_face_colour:
-						num_correct_corners += 1
-			# Bottom-left
-			if faces[face_idx, -1, 0] == face_idx:
-				l_face_corner = l_face[-1, -1]
-				if l_face_corner == l_face_colour:
-					d_face_corner = d_face[-1, -1]
-					if d_face_corner == d_face_colour:
-						num_correct_corners += 1
-			# Bottom-right
-			if faces[face_idx, -1, -1] == face_idx:
-				r_face_corner = r_face[-1, 0]
-				if r_face_corner == r_face_colour:
-					d_face_corner = d_face[-1, 0]
-					if d_face_corner == d_face_colour:
-						num_correct_corners += 1
-
-	return num_correct_corners
 
 
 def show_stats(
@@ -516,6 +955,90 @@ def show_solved_stats():
 	logging.info('Solved statistics displayed.')
 
 
+def log_scramble(actions):
+	""" Log the actions drawn to scramble a cube. """
+	logging.info('Cube scrambled with {0} random actions.'.format(len(actions)))
+	logging.debug('Scramble actions: {0}'.format(' '.join(str(action) for action in actions)))
+
+
+def log_optimal_distance(cube):
+	""" Show how many quarter turns a 2x2x2 cube is from solved, to compare the attempt's length with. """
+	if cube.edge_length != 2:
+		return
+	distance = int(pocket.distances(cube.faces))
+	print('Distanza ottimale: {0} mosse.'.format(distance))
+	logging.info('Optimal distance of the 2x2x2 cube: {0} quarter turns.'.format(distance))
+
+
+def solver_attempt(initial_cube=None):
+	""" Solve a Cube with the search solver chosen with --solver, showing the solution's length and time. """
+	if initial_cube is not None:
+		cube = initial_cube.copy()
+		print('\nCubo caricato:')
+	else:
+		cube = Cube(edge_length=edge_length)
+		log_scramble(cube.scramble())
+		print('\nCubo mescolato:')
+	print(cube)
+
+	try:
+		if solver == 'optimal' and edge_length == 2:
+			print('Loading the 2x2x2 distance table (it is built on the first run)...')
+			time_start = time.time()
+			solution = pocket.solve(cube)
+			solve_time = time.time() - time_start
+		elif solver == 'optimal':
+			print('Loading the pattern databases...')
+			optimal_solver = optimal.OptimalSolver()
+			result = optimal_solver.solve(cube, solver_time)
+			print(result)
+			logging.info('Optimal search: {0} nodes in {1:.2f} seconds ({2:.0f} nodes/s), bound {3}, cache hit rate {4:.3f}.'.format(
+				result.nodes, result.seconds, result.nodes_per_second, result.bound, result.cache_hit_rate))
+			solution, solve_time = result.solution, result.seconds
+		elif solver == 'astar':
+			result = search.weighted_astar(cube, policy_net, device, search_batch_size, search_weight, search_max_nodes)
+			print(result)
+			logging.info('Weighted A*: {0} nodes in {1:.2f} seconds ({2:.0f} nodes/s), {3:.1f} forward passes/s.'.format(
+				result.nodes, result.seconds, result.nodes_per_second, result.forward_passes_per_second))
+			solution = None if result.solution is None else format_actions(result.solution, edge_length).split()
+			solve_time = result.seconds
+		elif solver == 'bidirectional':
+			time_start = time.time()
+			actions = bidirectional.solve(cube, time_limit=solver_time)
+			solve_time = time.time() - time_start
+			solution = None if actions is None else format_actions(actions, edge_length).split()
+		elif solver == 'beam':
+			result = search.beam_search(cube, policy_net, device, beam_width, beam_max_depth)
+			print(result)
+			logging.info('Beam search: {0} nodes in {1:.2f} seconds ({2:.0f} nodes/s), {3:.1f} forward passes/s.'.format(
+				result.nodes, result.seconds, result.nodes_per_second, result.forward_passes_per_second))
+			solution = None if result.solution is None else format_actions(result.solution, edge_length).split()
+			solve_time = result.seconds
+		else:
+			print('Loading the two-phase tables (they are built on the first run)...')
+			two_phase = twophase.get_solver()
+			time_start = time.time()
+			solution = two_phase.solve(cube)
+			solve_time = time.time() - time_start
+	except FileNotFoundError as e:
+		print(f'{e}\nBuild them all with: python pattern_db.py --build=all')
+		return
+	except ValueError as e:
+		print(f'\nErrore: {e}')
+		return
+	if solution is None:
+		print('No solution found.')
+		logging.info('{0} solver found no solution.'.format(solver))
+		return
+
+	cube.apply_sequence(' '.join(solution))
+	print(cube)
+	print('Solution ({0} moves, {1:.3f} seconds): {2}'.format(
+		twophase.solution_length(solution), solve_time, ' '.join(solution)))
+	logging.info('{0} solution of {1} moves found in {2:.3f} seconds: {3}'.format(
+		solver, twophase.solution_length(solution), solve_time, ' '.join(solution)))
+
+
 def show_best_cube_statistics(cube, max_correct):
 	""" Show the given best cube and its number of correct squares. """
 	print('\n\nAttempt {0} (seed: {1})'.format(attempt_num, attempt_seeds[-1]))
@@ -535,9 +1058,11 @@ def solution_attempt(initial_cube: dict | None = None):
 	global max_correct
 	global att_iter
 	global flag_continue_attempt
+	global uniform_draws
 
 	# Dictates continuation of each attempt.
 	flag_continue_attempt = True
+	uniform_draws = UniformBuffer(attempt_seeds[-1])
 
 	if initial_cube is not None:
 		cube = initial_cube.copy()
@@ -549,7 +1074,8 @@ def solution_attempt(initial_cube: dict | None = None):
 		print('\nCubo originale:')
 		print(cube)
 		print('\nScrambling...')
-		cube.scramble()
+		log_scramble(cube.scramble())
+	log_optimal_distance(cube)
 
 	num_squares = 6 * cube.edge_length * cube.edge_length
 	num_states = num_squares * 6
@@ -561,15 +1087,18 @@ def solution_attempt(initial_cube: dict | None = None):
 	running_stats_length = 1000
 	running_num_correct = [0] * running_stats_length
 	running_reward = [0] * running_stats_length
+	# Rewards are updated from the facelets each action moves.
+	reward_scorer = RewardScorer(cube.edge_length)
+	reward_scorer.reset(cube)
 
 	if flag_deliberate_attempt:
 		# Used to translate the cube's state into boolean values.
 		state_grid = torch.arange(start=0, end=num_states, step=6, dtype=torch.int64).to(device)
 
 		# Gather the cube's current state.
-		squares = torch.as_tensor(cube.faces.flatten(), dtype=torch.int64).to(device)
+		squares = cube.faces.flatten()
 		state = torch.zeros([num_states], dtype=torch.float32).to(device)
-		state[state_grid + squares] = 1
+		state[state_grid + torch.as_tensor(squares, dtype=torch.int64, device=device)] = 1
 
 	while flag_continue_attempt:
 		if flag_deliberate_attempt:
@@ -577,12 +1106,20 @@ def solution_attempt(initial_cube: dict | None = None):
 			action = select_action(state)
 			# Take the action.
 			cube.rotate(int(action))
+			num_correct, reward = reward_scorer.update(cube, int(action))
 		else:
 			# Take a random action.
-			cube.random_rotation()
+			num_correct, reward = reward_scorer.update(cube, cube.random_rotation())
+
+		if endgame_table is not None:
+			# Within reach of the endgame table: play its actions to solved.
+			endgame_actions = endgame_table.solution(cube)
+			if endgame_actions:
+				print('\nEndgame table: solved with {0}.'.format(format_actions(endgame_actions, cube.edge_length)))
+				for endgame_action in endgame_actions:
+					cube.rotate(endgame_action)
+				num_correct, reward = reward_scorer.reset(cube)
 
-		# Compute the number of correctly-coloured squares and corresponding reward.
-		num_correct, reward = reward_function(cube)
 		running_num_correct[att_iter % running_stats_length] = num_correct
 		running_reward[att_iter % running_stats_length] = reward
 
@@ -601,16 +1138,19 @@ def solution_attempt(initial_cube: dict | None = None):
 
 		if flag_deliberate_attempt:
 			# Gather the cube's current state.
-			squares = torch.as_tensor(cube.faces.flatten(), dtype=torch.int64).to(device)
+			next_squares = cube.faces.flatten()
 			next_state = torch.zeros([num_states], dtype=torch.float32, device=device)
-			next_state[state_grid + squares] = 1
-			# Store the transition in memory
-			memory.push(state, action, next_state, torch.as_tensor([reward], device=device))
+			next_state[state_grid + torch.as_tensor(next_squares, dtype=torch.int64, device=device)] = 1
+			# Store the transition in memory, as the colours of the squares.
+			memory.push(squares, int(action), next_squares, reward)
+			squares = next_squares
 			state = next_state
 
 			if total_iterations % BATCH_SIZE == 0:
 				# Perform one step of the optimization.
 				optimize_model()
+				# Keep the on-disk memory resumable even if the run is killed.
+				memory.flush()
 
 		if att_iter % 1000 == 0:
 			show_stats(
@@ -628,7 +1168,9 @@ def solution_attempt(initial_cube: dict | None = None):
 			print('Creating a new cube.')
 			cube = Cube(edge_length=edge_length)
 			print('Scrambling...')
-			cube.scramble()
+			log_scramble(cube.scramble())
+			log_optimal_distance(cube)
+			reward_scorer.reset(cube)
 			att_iter = 0
 			max_correct = 0
 			best_cube = cube.copy()
@@ -643,12 +1185,315 @@ def solution_attempt(initial_cube: dict | None = None):
 		show_best_cube_statistics(best_cube, max_correct)
 
 
+def scrambled_faces(num_cubes, rng):
+	"""
+	Returns the faces of num_cubes scrambled cubes. The few cubes of a restart each have their random actions
+	composed into a single permutation; past scramble_batch_size cubes, one gather per action step for all of them is cheaper.
+	"""
+	cubes = rubiks.BatchCube(num_cubes, edge_length)
+	actions = rng.integers(rubiks.num_actions(edge_length), size=[num_cubes, rubiks.scramble_iterations])
+	if num_cubes <= scramble_batch_size:
+		flat_faces = cubes.faces.reshape(num_cubes, -1)
+		flat_faces[:] = np.take_along_axis(flat_faces, rubiks.sequence_permutation(actions, edge_length), axis=1)
+	else:
+		for step_actions in actions.T:
+			cubes.rotate(step_actions)
+	logging.info('{0} cubes scrambled with {1} random actions each.'.format(num_cubes, rubiks.scramble_iterations))
+	return cubes.faces
+
+
+class CubeEnvironments():
+	"""
+	num_envs cubes stepped in lockstep (a rubiks.BatchCube), each with its own move count and last actions.
+	A cube that is solved or, if set, reaches term_iter moves of its own is replaced by a new scrambled one.
+	"""
+	def __init__(self, num_envs, rng):
+		self.num_envs = num_envs
+		self.rng = rng
+		self.num_squares = 6 * edge_length * edge_length
+		self.cubes = rubiks.BatchCube(num_envs, edge_length)
+		self.cubes.faces[:] = scrambled_faces(num_envs, rng)
+		self.iters = np.zeros(num_envs, dtype=np.int64)
+		self.time_starts = np.full(num_envs, time.time())
+		self.recent_actions = np.full([num_envs, 3], -1, dtype=np.int64)
+		# Colours of the squares of every cube, one row per cube.
+		self.squares = self.cubes.faces.reshape(num_envs, -1).copy()
+
+	def step(self, actions):
+		"""
+		Takes one action per cube (finishing with the endgame table's actions the cubes reaching it), returning the numbers
+		of correct squares, the rewards, the squares reached and which cubes were solved or hit their termination point.
+		"""
+		self.cubes.rotate(actions)
+		self.recent_actions[:, :-1] = self.recent_actions[:, 1:]
+		self.recent_actions[:, -1] = actions
+		self.iters += 1
+		if endgame_table is not None:
+			# Within reach of the endgame table: play its actions to solved.
+			for env_idx in np.flatnonzero(endgame_table.lookup(self.cubes.faces)[0] > 0).tolist():
+				cube = self.cubes.get_cube(env_idx)
+				endgame_actions = endgame_table.solution(cube)
+				print('\nEndgame table: environment {0} solved with {1}.'.format(env_idx, format_actions(endgame_actions, edge_length)))
+				cube.apply_permutation(rubiks.sequence_permutation(endgame_actions, edge_length))
+				self.cubes.set_cube(env_idx, cube)
+		num_correct, reward = batch_reward_function(self.cubes.faces)
+		next_squares = self.cubes.faces.reshape(self.num_envs, -1).copy()
+
+		solved = num_correct == self.num_squares
+		terminated = flag_term_point & (self.iters % term_iter == 0) & ~solved
+		self.squares = next_squares
+		return num_correct, reward, next_squares, solved, terminated
+
+	def restart(self, finished):
+		"""Replaces the selected cubes (boolean mask) with new scrambled ones."""
+		self.cubes.faces[finished] = scrambled_faces(int(np.count_nonzero(finished)), self.rng)
+		self.iters[finished] = 0
+		self.time_starts[finished] = time.time()
+		self.recent_actions[finished] = -1
+		self.squares = self.squares.copy()
+		self.squares[finished] = self.cubes.faces[finished].reshape(-1, self.num_squares)
+
+
+def batch_solution_attempt(num_envs):
+	"""
+	Attempt to solve num_envs Rubik's Cubes in lockstep.
+	Every step chooses the actions of all the cubes with one forward pass, applies them with one
+	gather, scores them in one batch and pushes all the transitions at once. A cube is replaced
+	by a new scrambled one when solved or, if set, after term_iter iterations of its own.
+	"""
+	global attempt_num
+	global time_start
+	global best_cube
+	global max_correct
+	global att_iter
+	global flag_continue_attempt
+	global uniform_draws
+
+	# Dictates continuation of each attempt.
+	flag_continue_attempt = True
+	uniform_draws = UniformBuffer(attempt_seeds[-1])
+
+	# The environments draw from their own generator, seeded by the attempt's seed.
+	rng = np.random.default_rng(random.randint(0, 2 ** 30))
+	print('\nScrambling {0} cubes...'.format(num_envs))
+	envs = CubeEnvironments(num_envs, rng)
+
+	att_iter = 0
+	max_correct = 0
+	best_cube = envs.cubes.get_cube(0)
+	max_reward = 0
+	time_start = time.time()
+	running_stats_length = 1000
+	running_num_correct = [0] * running_stats_length
+	running_reward = [0] * running_stats_length
+	num_moves = 0
+
+	while flag_continue_attempt:
+		squares = envs.squares
+		if flag_deliberate_attempt:
+			# Select the actions, depending on the current states.
+			actions = select_actions(memory.one_hot(squares), envs.recent_actions)
+		else:
+			actions = rng.integers(rubiks.num_actions(edge_length), size=num_envs)
+		# Take the actions.
+		num_correct, reward, next_squares, solved, terminated = envs.step(actions)
+		num_moves += num_envs
+
+		if flag_deliberate_attempt:
+			# Store the transitions in memory, as the colours of the squares.
+			memory.push_batch(squares, actions, next_squares, reward)
+			# Keep one optimization step per BATCH_SIZE transitions, as a single cube does.
+			if total_iterations // BATCH_SIZE > (total_iterations - num_envs) // BATCH_SIZE:
+				optimize_model()
+				memory.flush()
+
+		best_env = int(np.argmax(num_correct))
+		running_num_correct[att_iter % running_stats_length] = float(np.mean(num_correct))
+		running_reward[att_iter % running_stats_length] = float(np.mean(reward))
+		if num_correct[best_env] > max_correct:
+			max_correct = float(num_correct[best_env])
+			best_cube = envs.cubes.get_cube(best_env)
+		max_reward = max(max_reward, float(np.max(reward)))
+
+		for env_idx in np.flatnonzero(solved).tolist():
+			print('\n\nSolved! (environment {0})'.format(env_idx))
+			solved_stats.append([attempt_num, int(envs.iters[env_idx]), time.time() - envs.time_starts[env_idx], attempt_seeds[-1]])
+		if np.any(terminated):
+			print('\n\nTermination point reached by {0} cubes.'.format(int(np.count_nonzero(terminated))))
+			logging.info('Termination point reached.')
+		finished = solved | terminated
+		if np.any(finished):
+			# Start the finished environments over with new cubes.
+			envs.restart(finished)
+			attempt_num += int(np.count_nonzero(finished))
+			save_model()
+
+		if att_iter % 1000 == 0:
+			show_stats(
+				envs.cubes.get_cube(best_env), running_stats_length, num_correct[best_env], running_num_correct, max_correct,
+				reward[best_env], running_reward, max_reward, att_iter, time_start)
+			print('Environments: {0}, moves/s: {1:.0f}'.format(num_envs, num_moves / max(time.time() - time_start, 1e-9)))
+
+		att_iter += 1
+
+	if flag_continue_main:
+		if len(solved_stats) > 0:
+			show_solved_stats()
+		show_best_cube_statistics(best_cube, max_correct)
+
+
+def actor_process(actor_idx, seed, shared_net, weights_version, weights_lock, stop_event, stats_queue):
+	"""
+	Actor of actor_learner_training: steps num_envs cubes with its own copy of the network, reloaded whenever
+	the learner publishes new weights, and pushes the transitions into the shared replay memory.
+	Every REPORT_INTERVAL seconds, puts (actor_idx, transitions per second, cubes solved) on stats_queue.
+	"""
+	global policy_net
+	global device
+	global uniform_draws
+	global total_iterations
+
+	# Ctrl+C is handled by the learner, which stops the actors.
+	signal.signal(signal.SIGINT, signal.SIG_IGN)
+	torch.set_num_threads(1)
+	random.seed(seed)
+	torch.manual_seed(seed)
+	device = torch.device('cpu')
+	memory.device = device
+	memory.one_hot_colours = torch.eye(6, dtype=torch.float32, device=device)
+	policy_net = DQN()
+	version = -1
+	uniform_draws = UniformBuffer(seed)
+	envs = CubeEnvironments(num_envs, np.random.default_rng(seed))
+
+	num_transitions = 0
+	num_solved = 0
+	time_report = time.time()
+	# Also stop if the learner died without setting stop_event.
+	learner_pid = os.getppid()
+	while not stop_event.is_set() and os.getppid() == learner_pid:
+		if weights_version.value != version:
+			with weights_lock:
+				policy_net.load_state_dict(shared_net.state_dict())
+				version = weights_version.value
+			# Exploration decays with the transitions of all the actors.
+			total_iterations = memory.num_pushed
+
+		squares = envs.squares
+		actions = select_actions(memory.one_hot(squares), envs.recent_actions)
+		num_correct, reward, next_squares, solved, terminated = envs.step(actions)
+		memory.push_batch(squares, actions, next_squares, reward)
+		num_transitions += num_envs
+		num_solved += int(np.count_nonzero(solved))
+		finished = solved | terminated
+		if np.any(finished):
+			envs.restart(finished)
+
+		if time.time() - time_report >= REPORT_INTERVAL:
+			stats_queue.put((actor_idx, num_transitions / (time.time() - time_report), num_solved))
+			num_transitions = 0
+			time_report = time.time()
+
+
+def publish_weights(shared_net, weights_version, weights_lock):
+	""" Copy the learner's weights into the network the actors reload. """
+	state_dict = getattr(policy_net, 'module', policy_net).state_dict()
+	with weights_lock:
+		shared_net.load_state_dict(state_dict)
+		weights_version.value += 1
+
+
+def actor_learner_training(num_actors):
+	"""
+	Train with num_actors processes acting while this one learns: the actors (see actor_process) fill the
+	shared replay memory, and this process runs optimize_model continuously, publishing its weights to the
+	actors every ACTOR_SYNC_STEPS steps. Actors run on the CPU; the processes are forked (Linux).
+	"""
+	global total_iterations
+
+	context = torch.multiprocessing.get_context('fork')
+	shared_net = DQN()
+	shared_net.share_memory()
+	weights_version = context.Value('q', 0, lock=False)
+	weights_lock = context.Lock()
+	stop_event = context.Event()
+	stats_queue = context.Queue()
+	publish_weights(shared_net, weights_version, weights_lock)
+
+	actors = []
+	for actor_idx in range(num_actors):
+		actor = context.Process(
+			target=actor_process, daemon=True,
+			args=(actor_idx, random.randint(0, 2 ** 30), shared_net, weights_version, weights_lock, stop_event, stats_queue))
+		actor.start()
+		actors.append(actor)
+	print('{0} actors started, with {1} cubes each.'.format(num_actors, num_envs))
+	logging.info(f'Actor/learner training with {num_actors} actors.')
+
+	actor_rates = [0.] * num_actors
+	actor_solved = [0] * num_actors
+	learner_steps = 0
+	report_steps = 0
+	time_report = time.time()
+	try:
+		while flag_continue_main:
+			if len(memory) < BATCH_SIZE:
+				time.sleep(0.1)
+			else:
+				total_iterations = memory.num_pushed
+				optimize_model()
+				learner_steps += 1
+				report_steps += 1
+				if learner_steps % ACTOR_SYNC_STEPS == 0:
+					publish_weights(shared_net, weights_version, weights_lock)
+				if learner_steps % (100 * ACTOR_SYNC_STEPS) == 0:
+					save_model()
+
+			while not stats_queue.empty():
+				actor_idx, rate, solved = stats_queue.get()
+				actor_rates[actor_idx] = rate
+				actor_solved[actor_idx] = solved
+			if time.time() - time_report >= REPORT_INTERVAL:
+				print('\nLearner: {0} steps, {1:.1f} steps/s, replay memory: {2} transitions'.format(
+					learner_steps, report_steps / (time.time() - time_report), len(memory)))
+				for actor_idx, (rate, solved) in enumerate(zip(actor_rates, actor_solved)):
+					print('Actor {0:>2}: {1:8.0f} transitions/s, {2} cubes solved'.format(actor_idx, rate, solved))
+				print('Randomness: {0:.2f}%'.format(100 * (EPS_END + (EPS_START - EPS_END) * np.exp(-1. * total_iterations / EPS_DECAY))))
+				memory.flush()
+				report_steps = 0
+				time_report = time.time()
+	finally:
+		stop_event.set()
+		for actor in actors:
+			actor.join(timeout=5)
+			if actor.is_alive():
+				actor.terminate()
+
+
 def main():
 	global edge_length
 	global num_layers
 	global root_seed
 	global flag_deliberate_attempt
 	global flag_inference_only
+	global flag_pdb_reward
+	global pattern_databases
+	global solver
+	global solver_time
+	global search_batch_size
+	global search_weight
+	global search_max_nodes
+	global beam_width
+	global beam_max_depth
+	global TRANSITION_MEMORY_SIZE
+	global flag_prioritized_replay
+	global num_envs
+	global num_actors
+	global flag_distributed
+	global rank
+	global world_size
+	global endgame_depth
+	global endgame_table
 
 	global memory
 	global policy_net
@@ -656,30 +1501,16 @@ def main():
 	global device
 
 	load_custom_cube = False
+	flag_load_model = False
 	custom_cube_to_solve = None
 
 	device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
 	print(f"Utilizzo di: {device}")
 	logging.info(f'Using device: {device}')
 
-	policy_net = DQN(
-		
-	)          # crea il modello (numero di layer, ecc.)
-	policy_net.to(device)          # <‑‑ sposta il modello
-
-	optimizer  = optim.Adam(policy_net.parameters(), lr=0.001)
-	# se vuoi salvare l’ottimizzatore anche su disco
-	torch.save(optimizer.state_dict(), OPTIMIZER_PATH)
-	memory = ReplayMemory(TRANSITION_MEMORY_SIZE)
-
-	# --- 3.  (Opzionale)  Se usi DataParallel per più GPU ------------------
-	if torch.cuda.device_count() > 1:
-		print(f"Usando {torch.cuda.device_count()} GPU con DataParallel")
-		policy_net = nn.DataParallel(policy_net)
-
 	# Read all command-line parameters.
 	try:
-		opts, args = getopt.getopt(sys.argv[1:], 's:l:h', ['size=', 'layers=', 'seed=', 'random', 'inference', 'load_model', 'help', 'load_cube='])
+		opts, args = getopt.getopt(sys.argv[1:], 's:l:h', ['size=', 'layers=', 'seed=', 'random', 'inference', 'load_model', 'help', 'load_cube=', 'pdb_reward', 'solver=', 'solver_time=', 'search_batch=', 'search_weight=', 'max_nodes=', 'beam=', 'beam_depth=', 'endgame=', 'memory_size=', 'prioritized', 'envs=', 'actors=', 'distributed'])
 		for opt, arg in opts:
 			if opt in ('--load_cube'):
 				if edge_length != 3:
@@ -713,6 +1544,21 @@ def main():
 				print(' -l N, --layers=N    number of layers in the NN (default: 2, allowable: 2, 3)')
 				print(' --seed=N            set the RNG seed')
 				print(' --random            only use random choices, no AI')
+				print(' --solver=NAME       solve with a search solver instead of the DQN\'s greedy walk (twophase: size 3 only; optimal: size 2 and 3; astar, beam, bidirectional)')
+				print(' --solver_time=S     time budget of the optimal and bidirectional solvers in seconds (default: 60)')
+				print(' --search_batch=N    states expanded per forward pass by astar (default: 1000)')
+				print(' --search_weight=W   weight of the path cost in astar (default: 0.6)')
+				print(' --max_nodes=N       states expanded by astar before giving up (default: 1000000)')
+				print(' --beam=K            solve by beam search keeping the K best sequences (same as --solver=beam)')
+				print(' --beam_depth=N      longest sequence tried by beam search (default: 100)')
+				print(' --memory_size=N     transitions kept by the replay memory, on disk in {0} (default: {1})'.format(MEMORY_DIR, TRANSITION_MEMORY_SIZE))
+				print(' --prioritized       sample the replay memory by TD error instead of uniformly')
+				print(' --envs=K            train on K cubes in lockstep, batching their actions and transitions (default: 1)')
+				print(' --actors=N          act in N processes (with --envs cubes each) while this one trains (Linux)')
+				print(' --distributed       train data-parallel with the other ranks of torch.distributed (gloo), e.g.:')
+				print('                     torchrun --nproc_per_node=4 ai_learner.py --distributed --envs=64 (needs --envs > 1)')
+				print(' --endgame=K         finish the attempts reaching a state within K actions of solved (see endgame.py)')
+				print(' --pdb_reward        reward from the pattern databases\' distance estimate (size 3 only)')
 				print(' -h, --help          display this help page and exit')
 				print('\n')
 				quit()
@@ -760,33 +1606,68 @@ def main():
 				flag_deliberate_attempt = False
 				print('Only using random choices during attempts.')
 			
+			elif opt in ('--solver'):
+				if arg not in solvers:
+					print('Unknown solver {0!r}, choose among: {1}.'.format(arg, ', '.join(solvers)))
+					quit()
+				solver = arg
+
+			elif opt in ('--search_batch', '--max_nodes', '--beam', '--beam_depth', '--endgame', '--memory_size', '--envs', '--actors'):
+				try:
+					arg = int(arg)
+					if arg < 1:
+						raise ValueError
+					if opt == '--search_batch':
+						search_batch_size = arg
+					elif opt == '--max_nodes':
+						search_max_nodes = arg
+					elif opt == '--beam':
+						beam_width = arg
+						solver = 'beam'
+					elif opt == '--endgame':
+						endgame_depth = arg
+					elif opt == '--memory_size':
+						TRANSITION_MEMORY_SIZE = arg
+					elif opt == '--envs':
+						num_envs = arg
+					elif opt == '--actors':
+						num_actors = arg
+					else:
+						beam_max_depth = arg
+				except ValueError:
+					print('Provided {0} is not valid.'.format(opt))
+					time.sleep(3)
+
+			elif opt in ('--search_weight'):
+				try:
+					search_weight = float(arg)
+				except ValueError:
+					print('Provided search weight is not valid.')
+					time.sleep(3)
+
+			elif opt in ('--solver_time'):
+				try:
+					solver_time = float(arg)
+				except ValueError:
+					print('Provided solver time is not valid.')
+					time.sleep(3)
+
+			elif opt in ('--pdb_reward'):
+				flag_pdb_reward = True
+
+			elif opt in ('--prioritized'):
+				flag_prioritized_replay = True
+				print('Prioritized experience replay enabled.')
+
+			elif opt in ('--distributed'):
+				flag_distributed = True
+
 			elif opt in ('--inference'):
 				flag_inference_only = True
 				print('Modalità inference only attivata: nessun training, solo risoluzione.')
 			
 			elif opt in ('--load_model'):
-				if os.path.exists(MODEL_PATH):
-					policy_net.load_state_dict(torch.load(MODEL_PATH, map_location=device))  # Su device
-					print(f'Modello caricato da {MODEL_PATH}')
-					if os.path.exists(OPTIMIZER_PATH):
-						optimizer.load_state_dict(torch.load(OPTIMIZER_PATH, map_location=device))
-					if os.path.exists(MEMORY_PATH):
-						import pickle
-						with open(MEMORY_PATH, 'rb') as f:
-							memory.memory = pickle.load(f)
-							# Ricostruisci tensori su device dopo il load (loop semplice)
-							for i in range(len(memory.memory)):
-								if memory.memory[i] is not None:
-									trans = memory.memory[i]
-									memory.memory[i] = Transition(
-										trans.state.to(device) if trans.state is not None else None,
-										trans.action.to(device) if trans.action is not None else None,
-										trans.next_state.to(device) if trans.next_state is not None else None,
-										trans.reward.to(device) if trans.reward is not None else None
-									)
-							memory.position = len(memory.memory) % memory.capacity
-				else:
-					print(f'Errore: modello non trovato a {MODEL_PATH}. Procedo senza caricamento.')
+				flag_load_model = True
 
 	except getopt.GetoptError:
 		print('\nError: Unrecognized option provided,'
@@ -795,6 +1676,108 @@ def main():
 		print_exc()
 		quit()
 	
+	if flag_distributed:
+		if not flag_deliberate_attempt or solver is not None or load_custom_cube:
+			print('Distributed training needs the DQN training attempts (no --random, --solver or --load_cube).')
+			quit()
+		if num_envs < 2 or num_actors > 0:
+			# Only the lockstep attempts reach optimize_model, the collective step, at the same iterations on every rank.
+			print('Distributed training needs --envs=K with K > 1, and no --actors.')
+			quit()
+		# Rank, world size and rendezvous address come from the environment (set by torchrun).
+		dist.init_process_group('gloo')
+		rank = dist.get_rank()
+		world_size = dist.get_world_size()
+		if root_seed is not None:
+			root_seed += rank
+		print(f'Rank {rank} di {world_size} (gloo).')
+		# torchrun stops its workers with SIGTERM: stop them together, saving the model.
+		signal.signal(signal.SIGTERM, exit_gracefully)
+		logging.info(f'Distributed training: rank {rank} of {world_size}.')
+
+	# The network's shape depends on --size and --layers.
+	policy_net = DQN(
+		
+	)          # crea il modello (numero di layer, ecc.)
+	policy_net.to(device)          # <‑‑ sposta il modello
+
+	optimizer  = optim.Adam(policy_net.parameters(), lr=0.001)
+	# se vuoi salvare l’ottimizzatore anche su disco
+	if rank == 0:
+		torch.save(optimizer.state_dict(), OPTIMIZER_PATH)
+
+	# --- 3.  (Opzionale)  Se usi DataParallel per più GPU ------------------
+	if torch.cuda.device_count() > 1 and not flag_distributed:
+		print(f"Usando {torch.cuda.device_count()} GPU con DataParallel")
+		policy_net = nn.DataParallel(policy_net)
+
+	if flag_load_model:
+		if os.path.exists(MODEL_PATH):
+			policy_net.load_state_dict(torch.load(MODEL_PATH, map_location=device))  # Su device
+			print(f'Modello caricato da {MODEL_PATH}')
+			if os.path.exists(OPTIMIZER_PATH):
+				optimizer.load_state_dict(torch.load(OPTIMIZER_PATH, map_location=device))
+		else:
+			print(f'Errore: modello non trovato a {MODEL_PATH}. Procedo senza caricamento.')
+
+	if flag_distributed:
+		# Broadcasts the weights of rank 0, then averages the gradients of all the ranks at each step.
+		policy_net = nn.parallel.DistributedDataParallel(policy_net)
+
+	if solver is not None:
+		if edge_length != 3 and solver not in ('astar', 'beam', 'bidirectional') and not (solver == 'optimal' and edge_length == 2):
+			print('The {0} solver only solves the 3x3x3 Cube (--size=3).'.format(solver))
+			quit()
+		if root_seed is not None:
+			random.seed(root_seed)
+		solver_attempt(custom_cube_to_solve if load_custom_cube else None)
+		return
+
+	if num_actors > 0 and flag_prioritized_replay:
+		print('The actors cannot share a prioritized replay memory: --prioritized ignored.')
+		flag_prioritized_replay = False
+	if num_actors > 0:
+		memory_class = SharedReplayMemory
+	else:
+		memory_class = PrioritizedReplayMemory if flag_prioritized_replay else ReplayMemory
+	# Each rank keeps its own shard of the replay memory.
+	memory_dir = MEMORY_DIR if world_size == 1 else '{0}_{1}'.format(MEMORY_DIR, rank)
+	if flag_load_model and os.path.exists(ReplayMemory.schema_path(memory_dir)):
+		try:
+			memory = memory_class.open(memory_dir, TRANSITION_MEMORY_SIZE, edge_length, device)
+			print(f'Replay memory ripresa da {memory_dir}: {len(memory)} transizioni.')
+		except (ValueError, KeyError, OSError) as e:
+			print(f'Errore: {e}\nUsa le stesse opzioni della sessione salvata, o sposta {memory_dir} per ricominciare.')
+			quit()
+	else:
+		memory = memory_class(TRANSITION_MEMORY_SIZE, edge_length, device, memory_dir)
+		if flag_load_model and os.path.exists(MEMORY_PATH):
+			import pickle
+			with open(MEMORY_PATH, 'rb') as f:
+				memory.load_state_dict(pickle.load(f))
+			memory.flush()
+			print(f'Replay memory convertita da {MEMORY_PATH} a {memory_dir}.')
+
+	if flag_pdb_reward:
+		if edge_length != 3:
+			print('The pattern databases only cover the 3x3x3 Cube: --pdb_reward ignored.')
+			flag_pdb_reward = False
+		else:
+			try:
+				pattern_databases = pattern_db.load_pattern_databases()
+				print('Reward guided by the pattern databases.')
+			except (FileNotFoundError, ValueError) as e:
+				print(f'{e}\nBuild them all with: python pattern_db.py --build=all')
+				quit()
+
+	if endgame_depth is not None:
+		try:
+			endgame_table = endgame.EndgameTable(endgame_depth, edge_length)
+			print('Endgame table of {0} states loaded.'.format(len(endgame_table)))
+		except (FileNotFoundError, ValueError) as e:
+			print(e)
+			quit()
+
 	if flag_inference_only:
 		global EPS_START, EPS_END
 		EPS_START = 0.0
@@ -844,9 +1827,17 @@ def main():
 			last_random_state = random.getstate()
 			attempt_seeds.append(attempt_seed)
 			torch.manual_seed(attempt_seed)	
-			solution_attempt()
+			if num_actors > 0:
+				actor_learner_training(num_actors)
+			elif num_envs > 1:
+				batch_solution_attempt(num_envs)
+			else:
+				solution_attempt()
 			attempt_num += 1
 
+	if flag_distributed:
+		dist.destroy_process_group()
+
 
 if __name__ == '__main__':
 	main()
\ No newline at end of file
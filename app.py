@@ -8,7 +8,6 @@ import sys
 from cube_status import Cube
 from utilities import *
 from plots import RubikCubePlotter
-from copy import deepcopy
 
 class Display:
     def __init__(self,) -> None:
@@ -184,10 +183,10 @@ class Display:
                         plt = RubikCubePlotter(self.virtual_cube)
                         plt.plot_cube()
                     if veryfy_circle((val(1736), val(851)), event.pos, val(111)):
-                        copied_cube = deepcopy(self.virtual_cube._blocks)
+                        copied_cube = dict(self.virtual_cube.blocks)
                         with open('cube.py', 'w') as f:
                             f.write(f'my_rubiks_cube_state = {copied_cube}')
-                        subprocess.Popen('python ai_learner.py --load_model --inference --load_cube=cube.py', shell=True)
+                        subprocess.Popen('python ai_learner.py --solver=twophase --load_cube=cube.py', shell=True)
                         AI_is_running(self.virtual_surface)
 
             self.screen.fill((255, 255, 255))
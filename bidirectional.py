@@ -0,0 +1,121 @@
+"""
+Meet-in-the-middle search for Cubes a few moves from solved.
+
+A breadth-first search runs from the scrambled Cube and another from the solved
+one, always growing the smaller side by a whole level, until a state shows up on
+both sides. Levels are kept as sorted arrays of packed keys (see rubiks.pack_states),
+so expansion, deduplication and the meeting test are all vectorized, and the first
+meeting gives a shortest solution in the Cube's own actions (slice turns included).
+"""
+
+import time
+import logging
+import numpy as np
+import rubiks
+
+
+def contains_keys(level, keys):
+    """Returns which of the keys are in the sorted array of keys level."""
+    if len(level) == 0:
+        return np.zeros(len(keys), dtype=bool)
+    idxs = np.minimum(np.searchsorted(level, keys), len(level) - 1)
+    return level[idxs] == keys
+
+
+class _Side():
+    """One of the two searches: its BFS levels, as sorted keys with the parent and action reaching each one."""
+    def __init__(self, faces):
+        keys = rubiks.pack_states(faces.reshape((1,) + faces.shape))
+        self.key_dtype = np.dtype((np.void, keys.shape[1]))
+        self.levels = [keys.view(self.key_dtype).ravel()]
+        self.parents = [np.full(1, -1, dtype=np.int64)]
+        self.actions = [np.full(1, -1, dtype=np.int16)]
+
+    @property
+    def num_states(self):
+        return sum(len(level) for level in self.levels)
+
+    def expand(self, move_table, edge_length):
+        """Adds the next level: the children of the last level not seen before (only the last two levels can hold them)."""
+        num_actions = len(move_table)
+        packed = self.levels[-1].view(np.uint8).reshape(len(self.levels[-1]), -1)
+        faces = rubiks.unpack_states(packed, edge_length).reshape(len(packed), -1)
+        children = rubiks.pack_states(faces[:, move_table].reshape(-1, 6, edge_length, edge_length))
+        keys, child_idxs = np.unique(children.view(self.key_dtype).ravel(), return_index=True)
+        new = ~contains_keys(self.levels[-1], keys)
+        if len(self.levels) > 1:
+            new &= ~contains_keys(self.levels[-2], keys)
+        self.levels.append(keys[new])
+        self.parents.append(child_idxs[new] // num_actions)
+        self.actions.append((child_idxs[new] % num_actions).astype(np.int16))
+
+    def path(self, depth, idx):
+        """Returns the actions leading from the root to the state idx of the given level."""
+        actions = []
+        while depth > 0:
+            actions.append(int(self.actions[depth][idx]))
+            idx = self.parents[depth][idx]
+            depth -= 1
+        return actions[::-1]
+
+    def find(self, keys):
+        """Returns (depth, idx, key_idx) of the shallowest state of this side among keys, or None."""
+        for depth, level in enumerate(self.levels):
+            found = np.flatnonzero(contains_keys(level, keys))
+            if len(found) > 0:
+                key_idx = int(found[0])
+                return depth, int(np.searchsorted(level, keys[key_idx])), key_idx
+        return None
+
+
+def inverse_action(action):
+    """Returns the action undoing the given one: actions come in (clockwise, counter-clockwise) pairs."""
+    return action ^ 1
+
+
+def solve(cube, max_depth=10, max_states=2 ** 23, time_limit=None):
+    """
+    Returns a shortest list of actions solving the given rubiks.Cube, or None if there is none
+    within max_depth actions, the two searches would hold more than max_states states,
+    or the next level would not be expanded within time_limit seconds.
+    The default max_depth is about as deep as the default max_states lets a 3x3x3 search go.
+    """
+    time_start = time.time()
+    deadline = None if time_limit is None else time_start + time_limit
+    # Seconds per state of the last expansion, to predict the cost of the next one.
+    seconds_per_state = 0.
+    edge_length = cube.edge_length
+    move_table = rubiks.get_move_table(edge_length)
+    forward = _Side(cube.faces)
+    backward = _Side(rubiks.solved_faces(edge_length))
+    if np.array_equal(forward.levels[0], backward.levels[0]):
+        return []
+
+    depth = 0
+    while depth < max_depth:
+        # Grow the side with the smaller frontier, if the states it adds still fit under the cap.
+        side, other = (forward, backward) if len(forward.levels[-1]) <= len(backward.levels[-1]) else (backward, forward)
+        if forward.num_states + backward.num_states + len(side.levels[-1]) * len(move_table) > max_states:
+            logging.info(f'Bidirectional search stopped at depth {depth}: memory cap of {max_states} states reached.')
+            return None
+        expansion_start = time.time()
+        if deadline is not None and expansion_start + seconds_per_state * len(side.levels[-1]) > deadline:
+            logging.info(f'Bidirectional search stopped at depth {depth}: time limit of {time_limit} seconds reached.')
+            return None
+        num_expanded = len(side.levels[-1])
+        side.expand(move_table, edge_length)
+        seconds_per_state = (time.time() - expansion_start) / num_expanded
+        depth += 1
+        meeting = other.find(side.levels[-1])
+        if meeting is None:
+            continue
+
+        other_depth, other_idx, key_idx = meeting
+        side_path = side.path(len(side.levels) - 1, key_idx)
+        other_path = other.path(other_depth, other_idx)
+        forward_path, backward_path = (side_path, other_path) if side is forward else (other_path, side_path)
+        solution = forward_path + [inverse_action(action) for action in reversed(backward_path)]
+        logging.info('Bidirectional search: {0} actions found in {1:.3f} seconds ({2} states).'.format(
+            len(solution), time.time() - time_start, forward.num_states + backward.num_states))
+        return solution
+    return None
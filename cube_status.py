@@ -1,189 +1,122 @@
 import logging
+from collections.abc import Mapping
+import rubiks
+from rubiks import cube_dict_mapping, notation_face_actions
+
+# Nomi dei blocchi nell'ordine del dizionario blocks.
+block_keys = [face + str(num) for face in 'UFRBLD' for num in range(1, 10)]
+
+# Posizione di ogni blocco nelle facce appiattite del cubo risolutore (la stessa di rubiks.Cube.load_from_dict),
+# i cui colori sono i valori di rubiks.colours: il cubo risolto di questa app è anche quello di rubiks.Cube.
+block_positions = {key: face * 9 + row * 3 + col for key, (face, row, col) in cube_dict_mapping.items()}
+
+# Lettera di ogni valore di colore di rubiks.colours.
+colour_letters = 'rwgybo'
+
+# Azione (in senso orario) di rubiks.Cube che ruota ogni faccia di questo cubo; quella antioraria è la successiva.
+# La notazione di rubiks usa le lettere di questa app, quindi una sequenza ha lo stesso significato su entrambi i cubi.
+face_actions = notation_face_actions
+
+
+class BlocksView(Mapping):
+    """Vista in sola lettura dei blocchi di un Cube come dizionario ({'U1': 'w', ...}), senza copie."""
+    def __init__(self, faces):
+        self._flat_faces = faces.reshape(-1)
+
+    def __getitem__(self, key):
+        return colour_letters[self._flat_faces[block_positions[key]]]
+
+    def __iter__(self):
+        return iter(block_keys)
+
+    def __len__(self):
+        return len(block_keys)
+
+    def __repr__(self):
+        return repr(dict(self))
+
 
 class Cube():
-    def __init__(self):
-        """Inizializza il cubo nel suo stato risolto."""
-        self._blocks = {
-            'U1': 'w', 'U2': 'w', 'U3': 'w', 'U4': 'w', 'U5': 'w', 'U6': 'w', 'U7': 'w', 'U8': 'w', 'U9': 'w',
-            'F1': 'g', 'F2': 'g', 'F3': 'g', 'F4': 'g', 'F5': 'g', 'F6': 'g', 'F7': 'g', 'F8': 'g', 'F9': 'g',
-            'R1': 'r', 'R2': 'r', 'R3': 'r', 'R4': 'r', 'R5': 'r', 'R6': 'r', 'R7': 'r', 'R8': 'r', 'R9': 'r',
-            'B1': 'b', 'B2': 'b', 'B3': 'b', 'B4': 'b', 'B5': 'b', 'B6': 'b', 'B7': 'b', 'B8': 'b', 'B9': 'b',
-            'L1': 'o', 'L2': 'o', 'L3': 'o', 'L4': 'o', 'L5': 'o', 'L6': 'o', 'L7': 'o', 'L8': 'o', 'L9': 'o',
-            'D1': 'y', 'D2': 'y', 'D3': 'y', 'D4': 'y', 'D5': 'y', 'D6': 'y', 'D7': 'y', 'D8': 'y', 'D9': 'y',
-        }
+    def __init__(self, solver_cube=None):
+        """
+        Inizializza il cubo nel suo stato risolto.
+
+        :param solver_cube: rubiks.Cube 3x3x3 di cui condividere lo stato (nessuna copia); se None ne crea uno risolto.
+        """
+        if solver_cube is None:
+            solver_cube = rubiks.Cube(3)
+        elif solver_cube.edge_length != 3:
+            raise ValueError('Il cubo dell\'app è un 3x3x3.')
+        self.solver_cube = solver_cube
+
+    @property
+    def faces(self):
+        """Array uint8 (6, 3, 3) dei colori, condiviso con solver_cube."""
+        return self.solver_cube.faces
 
     @property
     def blocks(self):
-        return self._blocks
+        return BlocksView(self.solver_cube.faces)
 
-    # --- Metodi Faccia Superiore (UP) ---
+    def turn(self, face, counter_clockwise=False):
+        """Ruota una faccia ('U', 'F', 'R', 'B', 'L' o 'D') con le tabelle di mosse di rubiks.Cube."""
+        self.solver_cube.rotate(face_actions[face] + int(counter_clockwise))
+        logging.debug('Rotated face %s (counter-clockwise: %s).', face, counter_clockwise)
+
+    # --- Metodi delle singole facce ---
     def U(self):
-        temp = self.blocks.copy()
-        # Ruota faccia U (senso orario)
-        self.blocks['U1'], self.blocks['U2'], self.blocks['U3'], self.blocks['U4'], self.blocks['U6'], self.blocks['U7'], self.blocks['U8'], self.blocks['U9'] = \
-        temp['U7'], temp['U4'], temp['U1'], temp['U8'], temp['U2'], temp['U9'], temp['U6'], temp['U3']
-        # Ruota lati
-        self.blocks['F1'], self.blocks['F2'], self.blocks['F3'] = temp['R1'], temp['R2'], temp['R3']
-        self.blocks['R1'], self.blocks['R2'], self.blocks['R3'] = temp['B1'], temp['B2'], temp['B3']
-        self.blocks['B1'], self.blocks['B2'], self.blocks['B3'] = temp['L1'], temp['L2'], temp['L3']
-        self.blocks['L1'], self.blocks['L2'], self.blocks['L3'] = temp['F1'], temp['F2'], temp['F3']
-        logging.info("Rotated face U (clockwise) and updated adjacent sides.")
+        self.turn('U')
 
     def U_(self):
-        temp = self.blocks.copy()
-        # Ruota faccia U (senso antiorario)
-        self.blocks['U1'], self.blocks['U2'], self.blocks['U3'], self.blocks['U4'], self.blocks['U6'], self.blocks['U7'], self.blocks['U8'], self.blocks['U9'] = \
-        temp['U3'], temp['U6'], temp['U9'], temp['U2'], temp['U8'], temp['U1'], temp['U4'], temp['U7']
-        # Ruota lati
-        self.blocks['F1'], self.blocks['F2'], self.blocks['F3'] = temp['L1'], temp['L2'], temp['L3']
-        self.blocks['L1'], self.blocks['L2'], self.blocks['L3'] = temp['B1'], temp['B2'], temp['B3']
-        self.blocks['B1'], self.blocks['B2'], self.blocks['B3'] = temp['R1'], temp['R2'], temp['R3']
-        self.blocks['R1'], self.blocks['R2'], self.blocks['R3'] = temp['F1'], temp['F2'], temp['F3']
-        logging.info("Rotated face U (counter-clockwise) and updated adjacent sides.")
-
-    # --- Metodi Faccia Inferiore (DOWN) ---
+        self.turn('U', counter_clockwise=True)
+
     def D(self):
-        temp = self.blocks.copy()
-        # Ruota faccia D (senso orario)
-        self.blocks['D1'], self.blocks['D2'], self.blocks['D3'], self.blocks['D4'], self.blocks['D6'], self.blocks['D7'], self.blocks['D8'], self.blocks['D9'] = \
-        temp['D7'], temp['D4'], temp['D1'], temp['D8'], temp['D2'], temp['D9'], temp['D6'], temp['D3']
-        # Ruota lati
-        self.blocks['F7'], self.blocks['F8'], self.blocks['F9'] = temp['L7'], temp['L8'], temp['L9']
-        self.blocks['L7'], self.blocks['L8'], self.blocks['L9'] = temp['B7'], temp['B8'], temp['B9']
-        self.blocks['B7'], self.blocks['B8'], self.blocks['B9'] = temp['R7'], temp['R8'], temp['R9']
-        self.blocks['R7'], self.blocks['R8'], self.blocks['R9'] = temp['F7'], temp['F8'], temp['F9']
-        logging.info("Rotated face D (clockwise) and updated adjacent sides.")
+        self.turn('D')
 
     def D_(self):
-        temp = self.blocks.copy()
-        # Ruota faccia D (senso antiorario)
-        self.blocks['D1'], self.blocks['D2'], self.blocks['D3'], self.blocks['D4'], self.blocks['D6'], self.blocks['D7'], self.blocks['D8'], self.blocks['D9'] = \
-        temp['D3'], temp['D6'], temp['D9'], temp['D2'], temp['D8'], temp['D1'], temp['D4'], temp['D7']
-        # Ruota lati
-        self.blocks['F7'], self.blocks['F8'], self.blocks['F9'] = temp['R7'], temp['R8'], temp['R9']
-        self.blocks['R7'], self.blocks['R8'], self.blocks['R9'] = temp['B7'], temp['B8'], temp['B9']
-        self.blocks['B7'], self.blocks['B8'], self.blocks['B9'] = temp['L7'], temp['L8'], temp['L9']
-        self.blocks['L7'], self.blocks['L8'], self.blocks['L9'] = temp['F7'], temp['F8'], temp['F9']
-        logging.info("Rotated face D (counter-clockwise) and updated adjacent sides.")
-
-    # --- Metodi Faccia Frontale (FRONT) ---
+        self.turn('D', counter_clockwise=True)
+
     def F(self):
-        temp = self.blocks.copy()
-        # Ruota faccia F (senso orario)
-        self.blocks['F1'], self.blocks['F2'], self.blocks['F3'], self.blocks['F4'], self.blocks['F6'], self.blocks['F7'], self.blocks['F8'], self.blocks['F9'] = \
-        temp['F7'], temp['F4'], temp['F1'], temp['F8'], temp['F2'], temp['F9'], temp['F6'], temp['F3']
-        # Ruota lati
-        self.blocks['U7'], self.blocks['U8'], self.blocks['U9'] = temp['L9'], temp['L6'], temp['L3']
-        self.blocks['R1'], self.blocks['R4'], self.blocks['R7'] = temp['U7'], temp['U8'], temp['U9']
-        self.blocks['D1'], self.blocks['D2'], self.blocks['D3'] = temp['R7'], temp['R4'], temp['R1']
-        self.blocks['L3'], self.blocks['L6'], self.blocks['L9'] = temp['D1'], temp['D2'], temp['D3']
-        logging.info("Rotated face F (clockwise) and updated adjacent sides.")
+        self.turn('F')
 
     def F_(self):
-        temp = self.blocks.copy()
-        # Ruota faccia F (senso antiorario)
-        self.blocks['F1'], self.blocks['F2'], self.blocks['F3'], self.blocks['F4'], self.blocks['F6'], self.blocks['F7'], self.blocks['F8'], self.blocks['F9'] = \
-        temp['F3'], temp['F6'], temp['F9'], temp['F2'], temp['F8'], temp['F1'], temp['F4'], temp['F7']
-        # Ruota lati
-        self.blocks['U7'], self.blocks['U8'], self.blocks['U9'] = temp['R1'], temp['R4'], temp['R7']
-        self.blocks['R1'], self.blocks['R4'], self.blocks['R7'] = temp['D3'], temp['D2'], temp['D1']
-        self.blocks['D1'], self.blocks['D2'], self.blocks['D3'] = temp['L9'], temp['L6'], temp['L3']
-        self.blocks['L3'], self.blocks['L6'], self.blocks['L9'] = temp['U9'], temp['U8'], temp['U7']
-        logging.info("Rotated face F (counter-clockwise) and updated adjacent sides.")
-
-    # --- Metodi Faccia Posteriore (BACK) ---
+        self.turn('F', counter_clockwise=True)
+
     def B(self):
-        temp = self.blocks.copy()
-        # Ruota faccia B (senso orario)
-        self.blocks['B1'], self.blocks['B2'], self.blocks['B3'], self.blocks['B4'], self.blocks['B6'], self.blocks['B7'], self.blocks['B8'], self.blocks['B9'] = \
-        temp['B7'], temp['B4'], temp['B1'], temp['B8'], temp['B2'], temp['B9'], temp['B6'], temp['B3']
-        # Ruota lati
-        self.blocks['U1'], self.blocks['U2'], self.blocks['U3'] = temp['R3'], temp['R6'], temp['R9']
-        self.blocks['L1'], self.blocks['L4'], self.blocks['L7'] = temp['U3'], temp['U2'], temp['U1']
-        self.blocks['D7'], self.blocks['D8'], self.blocks['D9'] = temp['L7'], temp['L4'], temp['L1']
-        self.blocks['R3'], self.blocks['R6'], self.blocks['R9'] = temp['D9'], temp['D8'], temp['D7']
-        logging.info("Rotated face B (clockwise) and updated adjacent sides.")
+        self.turn('B')
 
     def B_(self):
-        temp = self.blocks.copy()
-        # Ruota faccia B (senso antiorario)
-        self.blocks['B1'], self.blocks['B2'], self.blocks['B3'], self.blocks['B4'], self.blocks['B6'], self.blocks['B7'], self.blocks['B8'], self.blocks['B9'] = \
-        temp['B3'], temp['B6'], temp['B9'], temp['B2'], temp['B8'], temp['B1'], temp['B4'], temp['B7']
-        # Ruota lati
-        self.blocks['U1'], self.blocks['U2'], self.blocks['U3'] = temp['L7'], temp['L4'], temp['L1']
-        self.blocks['L1'], self.blocks['L4'], self.blocks['L7'] = temp['D7'], temp['D8'], temp['D9']
-        self.blocks['D7'], self.blocks['D8'], self.blocks['D9'] = temp['R9'], temp['R6'], temp['R3']
-        self.blocks['R3'], self.blocks['R6'], self.blocks['R9'] = temp['U1'], temp['U2'], temp['U3']
-        logging.info("Rotated face B (counter-clockwise) and updated adjacent sides.")
-
-    # --- Metodi Faccia Destra (RIGHT) ---
+        self.turn('B', counter_clockwise=True)
+
     def R(self):
-        temp = self.blocks.copy()
-        # Ruota faccia R (senso orario)
-        self.blocks['R1'], self.blocks['R2'], self.blocks['R3'], self.blocks['R4'], self.blocks['R6'], self.blocks['R7'], self.blocks['R8'], self.blocks['R9'] = \
-        temp['R7'], temp['R4'], temp['R1'], temp['R8'], temp['R2'], temp['R9'], temp['R6'], temp['R3']
-        # Ruota lati
-        self.blocks['U3'], self.blocks['U6'], self.blocks['U9'] = temp['F3'], temp['F6'], temp['F9']
-        self.blocks['F3'], self.blocks['F6'], self.blocks['F9'] = temp['D3'], temp['D6'], temp['D9']
-        self.blocks['D3'], self.blocks['D6'], self.blocks['D9'] = temp['B7'], temp['B4'], temp['B1']
-        self.blocks['B1'], self.blocks['B4'], self.blocks['B7'] = temp['U9'], temp['U6'], temp['U3']
-        logging.info("Rotated face R (clockwise) and updated adjacent sides.")
+        self.turn('R')
 
     def R_(self):
-        temp = self.blocks.copy()
-        # Ruota faccia R (senso antiorario)
-        self.blocks['R1'], self.blocks['R2'], self.blocks['R3'], self.blocks['R4'], self.blocks['R6'], self.blocks['R7'], self.blocks['R8'], self.blocks['R9'] = \
-        temp['R3'], temp['R6'], temp['R9'], temp['R2'], temp['R8'], temp['R1'], temp['R4'], temp['R7']
-        # Ruota lati
-        self.blocks['U3'], self.blocks['U6'], self.blocks['U9'] = temp['B7'], temp['B4'], temp['B1']
-        self.blocks['B1'], self.blocks['B4'], self.blocks['B7'] = temp['D9'], temp['D6'], temp['D3']
-        self.blocks['D3'], self.blocks['D6'], self.blocks['D9'] = temp['F3'], temp['F6'], temp['F9']
-        self.blocks['F3'], self.blocks['F6'], self.blocks['F9'] = temp['U3'], temp['U6'], temp['U9']
-        logging.info("Rotated face R (counter-clockwise) and updated adjacent sides.")
-
-    # --- Metodi Faccia Sinistra (LEFT) ---
+        self.turn('R', counter_clockwise=True)
+
     def L(self):
-        temp = self.blocks.copy()
-        # Ruota faccia L (senso orario)
-        self.blocks['L1'], self.blocks['L2'], self.blocks['L3'], self.blocks['L4'], self.blocks['L6'], self.blocks['L7'], self.blocks['L8'], self.blocks['L9'] = \
-        temp['L7'], temp['L4'], temp['L1'], temp['L8'], temp['L2'], temp['L9'], temp['L6'], temp['L3']
-        # Ruota lati
-        self.blocks['U1'], self.blocks['U4'], self.blocks['U7'] = temp['B9'], temp['B6'], temp['B3']
-        self.blocks['B3'], self.blocks['B6'], self.blocks['B9'] = temp['D7'], temp['D4'], temp['D1']
-        self.blocks['D1'], self.blocks['D4'], self.blocks['D7'] = temp['F1'], temp['F4'], temp['F7']
-        self.blocks['F1'], self.blocks['F4'], self.blocks['F7'] = temp['U1'], temp['U4'], temp['U7']
-        logging.info("Rotated face L (clockwise) and updated adjacent sides.")
+        self.turn('L')
 
     def L_(self):
-        temp = self.blocks.copy()
-        # Ruota faccia L (senso antiorario)
-        self.blocks['L1'], self.blocks['L2'], self.blocks['L3'], self.blocks['L4'], self.blocks['L6'], self.blocks['L7'], self.blocks['L8'], self.blocks['L9'] = \
-        temp['L3'], temp['L6'], temp['L9'], temp['L2'], temp['L8'], temp['L1'], temp['L4'], temp['L7']
-        # Ruota lati
-        self.blocks['U1'], self.blocks['U4'], self.blocks['U7'] = temp['F1'], temp['F4'], temp['F7']
-        self.blocks['F1'], self.blocks['F4'], self.blocks['F7'] = temp['D1'], temp['D4'], temp['D7']
-        self.blocks['D1'], self.blocks['D4'], self.blocks['D7'] = temp['B9'], temp['B6'], temp['B3']
-        self.blocks['B3'], self.blocks['B6'], self.blocks['B9'] = temp['U7'], temp['U4'], temp['U1']
-        logging.info("Rotated face L (counter-clockwise) and updated adjacent sides.")
-    
+        self.turn('L', counter_clockwise=True)
+
     def rotate_face(self, face_number: int, counter_clockwise: bool = False) -> None:
         """
         Ruota una faccia del cubo.
-        
+
         :param face_number: Numero della faccia da ruotare (1-6).
         :param counter_clockwise: Se True, ruota in senso antiorario.
         """
-        if face_number == 1:
-            self.U_() if counter_clockwise else self.U()
-        elif face_number == 2:
-            self.F_() if counter_clockwise else self.F()
-        elif face_number == 3:
-            self.R_() if counter_clockwise else self.R()
-        elif face_number == 4:
-            self.B_() if counter_clockwise else self.B()
-        elif face_number == 5:
-            self.L_() if counter_clockwise else self.L()
-        elif face_number == 6:
-            self.D_() if counter_clockwise else self.D()
-        else:
-            raise ValueError("Numero della faccia non valido. Deve essere tra 1 e 6.")
\ No newline at end of file
+        if not 1 <= face_number <= 6:
+            raise ValueError("Numero della faccia non valido. Deve essere tra 1 e 6.")
+        self.turn('UFRBLD'[face_number - 1], counter_clockwise)
+
+    def apply_sequence(self, sequence) -> None:
+        """
+        Applica un'intera sequenza di mosse in notazione standard (es. "R U R' U'") in un solo passo.
+        La sequenza viene compilata (e memorizzata) da rubiks.compile_sequence in un'unica permutazione.
+
+        :param sequence: Stringa in notazione standard, lista di mosse o di azioni di rubiks.Cube.
+        """
+        self.solver_cube.apply_sequence(sequence)
+        logging.info(f"Applied sequence {sequence!r}.")
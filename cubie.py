@@ -0,0 +1,300 @@
+"""
+Cubie-level representation of a 3x3x3 Rubik's Cube.
+
+A state is described by where each of the 8 corner and 12 edge cubies sits
+and how it is twisted, which is packed into four integer coordinates:
+corner permutation (0..40319), corner orientation (0..2186),
+edge permutation (0..479001599) and edge orientation (0..2047).
+Conversions to and from rubiks.Cube faces and the coordinate move tables are
+vectorized with numpy, so they also work on whole batches of states.
+"""
+
+import functools
+import numpy as np
+import rubiks
+from rubiks import facelet_keys, rubiks_face_positions
+
+# Corner cubies, each given by its facelets (U/D facelet first, then clockwise).
+# Order: UBR, URF, UFL, ULB, DRB, DFR, DLF, DBL.
+corner_facelet_names = [
+    ('U3', 'B1', 'R3'), ('U9', 'R1', 'F3'), ('U7', 'F1', 'L3'), ('U1', 'L1', 'B3'),
+    ('D9', 'R9', 'B7'), ('D3', 'F9', 'R7'), ('D1', 'L9', 'F7'), ('D7', 'B9', 'L7'),
+]
+# Edge cubies, each given by its two facelets.
+# Order: UB, UR, UF, UL, DB, DR, DF, DL, BR, FR, FL, BL.
+edge_facelet_names = [
+    ('U2', 'B2'), ('U6', 'R2'), ('U8', 'F2'), ('U4', 'L2'), ('D8', 'B8'), ('D6', 'R8'),
+    ('D2', 'F8'), ('D4', 'L8'), ('R6', 'B4'), ('R4', 'F6'), ('L6', 'F4'), ('L4', 'B6'),
+]
+
+# Positions of the corner/edge facelets in the flattened faces of a 3x3x3 rubiks.Cube.
+corner_facelets = np.array([[facelet_keys.index(name) for name in corner] for corner in corner_facelet_names])
+edge_facelets = np.array([[facelet_keys.index(name) for name in edge] for edge in edge_facelet_names])
+# Face of every facelet of each cubie in its home position (and orientation 0).
+corner_faces = corner_facelets // 9
+edge_faces = edge_facelets // 9
+# Positions of the six centres.
+centre_facelets = np.arange(6) * 9 + 4
+
+# Face moves in the order used by the coordinate move tables:
+# the 12 quarter turns share the numbering of rubiks.Cube actions, then come the 6 half turns.
+move_names = rubiks.action_notation(3)[:12] + [name + '2' for name in rubiks.action_notation(3)[:12:2]]
+num_moves = len(move_names)
+
+num_corner_permutations = 40320
+num_corner_orientations = 2187
+num_edge_permutations = 479001600
+num_edge_orientations = 2048
+
+
+def _cubie_lookup(home_faces):
+    """Returns a table mapping the encoded faces of a cubie (as read from its facelets) to its index."""
+    length = home_faces.shape[1]
+    lookup = np.full(6 ** length, -1, dtype=np.int16)
+    for cubie_idx, faces in enumerate(home_faces):
+        key = 0
+        for face in faces:
+            key = 6 * key + face
+        lookup[key] = cubie_idx
+    return lookup
+
+# Corner (or edge) index of every possible triple (or pair) of faces, -1 if no such cubie exists.
+corner_lookup = _cubie_lookup(corner_faces)
+edge_lookup = _cubie_lookup(edge_faces)
+
+
+def cubies_from_faces(faces):
+    """
+    Returns the arrays (cp, co, ep, eo) describing the given faces, which may be
+    a single (6, 3, 3) state or a batch of shape (..., 6, 3, 3).
+    Cubies are located relative to the centres, so whole-cube rotations are factored out.
+    Raises ValueError if a cubie does not exist on a real cube.
+    """
+    faces = np.asarray(faces)
+    flat_faces = faces.reshape(faces.shape[:-3] + (54,)).astype(np.intp)
+    # Translate colours into the face whose centre has that colour.
+    face_of_colour = np.argsort(flat_faces[..., centre_facelets], axis=-1)
+    facelet_faces = np.take_along_axis(face_of_colour, flat_faces, axis=-1)
+
+    # A corner's orientation is the position of its U/D facelet.
+    corners = facelet_faces[..., corner_facelets]
+    is_ud = (corners == rubiks_face_positions['U']) | (corners == rubiks_face_positions['D'])
+    co = np.argmax(is_ud, axis=-1)
+    rolled = np.take_along_axis(corners, (co[..., None] + np.arange(3)) % 3, axis=-1)
+    cp = corner_lookup[rolled[..., 0] * 36 + rolled[..., 1] * 6 + rolled[..., 2]]
+
+    # An edge is flipped when its facelets show the home faces in reverse order.
+    edges = facelet_faces[..., edge_facelets]
+    straight = edge_lookup[edges[..., 0] * 6 + edges[..., 1]]
+    flipped = edge_lookup[edges[..., 1] * 6 + edges[..., 0]]
+    eo = (straight < 0).astype(np.int8)
+    ep = np.where(straight < 0, flipped, straight)
+
+    if np.any(is_ud.sum(axis=-1) != 1) or np.any(cp < 0) or np.any(ep < 0):
+        raise ValueError('The faces do not describe a valid 3x3x3 cube.')
+    return cp.astype(np.int8), co.astype(np.int8), ep.astype(np.int8), eo
+
+
+def faces_from_cubies(cp, co, ep, eo):
+    """Returns the faces (shape (..., 6, 3, 3), standard centres) of the given cubie arrays."""
+    cp, co, ep, eo = (np.asarray(x, dtype=np.intp) for x in (cp, co, ep, eo))
+    flat_faces = np.empty(cp.shape[:-1] + (54,), dtype=np.uint8)
+    flat_faces[..., centre_facelets] = np.arange(6)
+    # The facelet n of the corner at position i shows face (n - co[i]) of its home position.
+    flat_faces[..., corner_facelets] = corner_faces[cp[..., None], (np.arange(3) - co[..., None]) % 3]
+    flat_faces[..., edge_facelets] = edge_faces[ep[..., None], (np.arange(2) - eo[..., None]) % 2]
+    return flat_faces.reshape(cp.shape[:-1] + (6, 3, 3))
+
+
+def permutation_coordinate(perms):
+    """Returns the rank (Lehmer code) of the permutations along the last axis."""
+    perms = np.asarray(perms, dtype=np.int64)
+    length = perms.shape[-1]
+    coordinate = np.zeros(perms.shape[:-1], dtype=np.int64)
+    for i in range(length):
+        smaller_after = np.sum(perms[..., i + 1:] < perms[..., i:i + 1], axis=-1)
+        coordinate = coordinate * (length - i) + smaller_after
+    return coordinate
+
+
+def permutation_from_coordinate(coordinates, length):
+    """Returns the permutations (along a new last axis) of the given ranks."""
+    coordinates = np.array(coordinates, dtype=np.int64)
+    digits = np.empty(coordinates.shape + (length,), dtype=np.int64)
+    for i in range(length - 1, -1, -1):
+        digits[..., i] = coordinates % (length - i)
+        coordinates //= (length - i)
+    # Each digit tells how many of the still unused values are smaller than the one picked.
+    used = np.zeros(digits.shape, dtype=bool)
+    perms = np.empty(digits.shape, dtype=np.int8)
+    for i in range(length):
+        free_rank = np.cumsum(~used, axis=-1) - 1
+        picked = np.argmax(~used & (free_rank == digits[..., i:i + 1]), axis=-1)
+        perms[..., i] = picked
+        np.put_along_axis(used, picked[..., None], True, axis=-1)
+    return perms
+
+
+def orientation_coordinate(oris, base):
+    """Returns the coordinate of the orientations along the last axis (the last one is implied)."""
+    oris = np.asarray(oris, dtype=np.int64)
+    coordinate = np.zeros(oris.shape[:-1], dtype=np.int64)
+    for i in range(oris.shape[-1] - 1):
+        coordinate = coordinate * base + oris[..., i]
+    return coordinate
+
+
+def orientation_from_coordinate(coordinates, base, length):
+    """Returns the orientations (along a new last axis) of the given coordinates."""
+    coordinates = np.array(coordinates, dtype=np.int64)
+    oris = np.empty(coordinates.shape + (length,), dtype=np.int8)
+    for i in range(length - 2, -1, -1):
+        oris[..., i] = coordinates % base
+        coordinates //= base
+    # The total twist of a real cube is always a multiple of base.
+    oris[..., -1] = (-np.sum(oris[..., :-1], axis=-1, dtype=np.int64)) % base
+    return oris
+
+
+class CubieCube():
+    """3x3x3 Cube described by the permutation and orientation of its corner and edge cubies."""
+    def __init__(self, cp=None, co=None, ep=None, eo=None):
+        self.cp = np.arange(8, dtype=np.int8) if cp is None else np.array(cp, dtype=np.int8)
+        self.co = np.zeros(8, dtype=np.int8) if co is None else np.array(co, dtype=np.int8)
+        self.ep = np.arange(12, dtype=np.int8) if ep is None else np.array(ep, dtype=np.int8)
+        self.eo = np.zeros(12, dtype=np.int8) if eo is None else np.array(eo, dtype=np.int8)
+
+    @classmethod
+    def from_cube(cls, cube):
+        """Returns the CubieCube of a 3x3x3 rubiks.Cube."""
+        if cube.edge_length != 3:
+            raise ValueError(f'Cubie coordinates need a 3x3x3 cube, not {cube.edge_length}x{cube.edge_length}.')
+        return cls(*cubies_from_faces(cube.faces))
+
+    @classmethod
+    def from_coordinates(cls, corner_permutation, corner_orientation, edge_permutation, edge_orientation):
+        """Returns the CubieCube with the given coordinates."""
+        return cls(
+            permutation_from_coordinate(corner_permutation, 8),
+            orientation_from_coordinate(corner_orientation, 3, 8),
+            permutation_from_coordinate(edge_permutation, 12),
+            orientation_from_coordinate(edge_orientation, 2, 12))
+
+    def copy(self):
+        """Returns a deep copy of the CubieCube."""
+        return CubieCube(self.cp, self.co, self.ep, self.eo)
+
+    def to_faces(self):
+        """Returns the (6, 3, 3) faces of the CubieCube."""
+        return faces_from_cubies(self.cp, self.co, self.ep, self.eo)
+
+    def to_cube(self):
+        """Returns the rubiks.Cube of the CubieCube."""
+        cube = rubiks.Cube(3)
+        cube.faces[:] = self.to_faces()
+        return cube
+
+    def multiply(self, other):
+        """Apply the cubie permutation 'other' after this one (in place)."""
+        self.co = (self.co[other.cp] + other.co) % 3
+        self.cp = self.cp[other.cp]
+        self.eo = (self.eo[other.ep] + other.eo) % 2
+        self.ep = self.ep[other.ep]
+
+    def move(self, move):
+        """Take the given face move (index in move_names)."""
+        self.multiply(basic_moves()[move])
+
+    @property
+    def corner_permutation(self):
+        return int(permutation_coordinate(self.cp))
+
+    @property
+    def corner_orientation(self):
+        return int(orientation_coordinate(self.co, 3))
+
+    @property
+    def edge_permutation(self):
+        return int(permutation_coordinate(self.ep))
+
+    @property
+    def edge_orientation(self):
+        return int(orientation_coordinate(self.eo, 2))
+
+    def coordinates(self):
+        """Returns the tuple (corner permutation, corner orientation, edge permutation, edge orientation)."""
+        return (self.corner_permutation, self.corner_orientation, self.edge_permutation, self.edge_orientation)
+
+    def is_valid(self):
+        """Returns whether the CubieCube can be reached from the solved state."""
+        corner_parity = permutation_parity(self.cp)
+        edge_parity = permutation_parity(self.ep)
+        return (sorted(self.cp) == list(range(8)) and sorted(self.ep) == list(range(12))
+            and int(np.sum(self.co)) % 3 == 0 and int(np.sum(self.eo)) % 2 == 0
+            and corner_parity == edge_parity)
+
+    def __eq__(self, other):
+        return (np.array_equal(self.cp, other.cp) and np.array_equal(self.co, other.co)
+            and np.array_equal(self.ep, other.ep) and np.array_equal(self.eo, other.eo))
+
+    def __hash__(self):
+        return hash(self.coordinates())
+
+    def __repr__(self):
+        return 'CubieCube(cp={0}, co={1}, ep={2}, eo={3})'.format(
+            self.cp.tolist(), self.co.tolist(), self.ep.tolist(), self.eo.tolist())
+
+
+def permutation_parity(perm):
+    """Returns the parity (0: even, 1: odd) of a permutation."""
+    perm = list(perm)
+    parity = 0
+    for i in range(len(perm)):
+        for j in range(i + 1, len(perm)):
+            if perm[j] < perm[i]:
+                parity ^= 1
+    return parity
+
+
+@functools.lru_cache(maxsize=None)
+def basic_moves():
+    """Returns the CubieCube of every face move, read from the facelet move tables of rubiks.Cube."""
+    cubies = []
+    for name in move_names:
+        cube = rubiks.Cube(3)
+        cube.apply_sequence(name)
+        cubies.append(CubieCube.from_cube(cube))
+    return tuple(cubies)
+
+
+@functools.lru_cache(maxsize=None)
+def corner_orientation_move_table():
+    """Returns the table [corner orientation, move] -> corner orientation."""
+    co = orientation_from_coordinate(np.arange(num_corner_orientations), 3, 8)
+    table = np.empty([num_corner_orientations, num_moves], dtype=np.int32)
+    for move_idx, move in enumerate(basic_moves()):
+        table[:, move_idx] = orientation_coordinate((co[:, move.cp] + move.co) % 3, 3)
+    table.setflags(write=False)
+    return table
+
+
+@functools.lru_cache(maxsize=None)
+def corner_permutation_move_table():
+    """Returns the table [corner permutation, move] -> corner permutation."""
+    cp = permutation_from_coordinate(np.arange(num_corner_permutations), 8)
+    table = np.empty([num_corner_permutations, num_moves], dtype=np.int32)
+    for move_idx, move in enumerate(basic_moves()):
+        table[:, move_idx] = permutation_coordinate(cp[:, move.cp])
+    table.setflags(write=False)
+    return table
+
+
+@functools.lru_cache(maxsize=None)
+def edge_orientation_move_table():
+    """Returns the table [edge orientation, move] -> edge orientation."""
+    eo = orientation_from_coordinate(np.arange(num_edge_orientations), 2, 12)
+    table = np.empty([num_edge_orientations, num_moves], dtype=np.int32)
+    for move_idx, move in enumerate(basic_moves()):
+        table[:, move_idx] = orientation_coordinate((eo[:, move.ep] + move.eo) % 2, 2)
+    table.setflags(write=False)
+    return table
@@ -0,0 +1,220 @@
+"""
+Endgame table: every position within a few actions of solved.
+
+The table holds the packed key (see rubiks.pack_states) of every state within
+depth actions of the solved Cube, together with its distance and the action
+leading one step closer to solved. Entries are sorted by a 64-bit hash of the key,
+so that a state is found by a binary search over plain integers and confirmed
+by comparing its full key. The table is built by a breadth-first search whose
+expansion is split across a process pool, stored under rubiks.tables_dir and
+opened with numpy memory maps.
+A solver (or the DQN loop) reaching a state in the table can finish at once.
+"""
+
+import os
+import sys
+import time
+import getopt
+import logging
+import multiprocessing
+import numpy as np
+import rubiks
+from bidirectional import contains_keys, inverse_action
+
+# Number of states expanded by a worker at once.
+chunk_size = 2 ** 16
+
+# Multiplier of the key hash (the 64-bit golden ratio).
+hash_multiplier = np.uint64(0x9E3779B97F4A7C15)
+
+
+def table_paths(depth, edge_length=3):
+    """Returns the paths of the hashes, keys and moves arrays of the given table."""
+    prefix = os.path.join(rubiks.tables_dir or '.', 'endgame_{0}_{1}'.format(edge_length, depth))
+    return prefix + '_hashes.npy', prefix + '_keys.npy', prefix + '_moves.npy'
+
+
+def load_table_arrays(depth, edge_length=3):
+    """
+    Returns the memory-mapped hashes, keys and moves arrays of the given table,
+    or None if any of them is missing, unreadable or of a different length from the others.
+    """
+    arrays = [rubiks.load_table(path, mmap_mode='r') for path in table_paths(depth, edge_length)]
+    if any(array is None for array in arrays) or not len(arrays[0]) == len(arrays[1]) == len(arrays[2]):
+        return None
+    return arrays
+
+
+def key_hashes(packed):
+    """Returns the 64-bit hashes of packed keys (shape (..., num_bytes))."""
+    packed = np.asarray(packed, dtype=np.uint8)
+    num_words = (packed.shape[-1] + 7) // 8
+    padded = np.zeros(packed.shape[:-1] + (8 * num_words,), dtype=np.uint8)
+    padded[..., :packed.shape[-1]] = packed
+    words = padded.view(np.uint64)
+    hashes = np.zeros(packed.shape[:-1], dtype=np.uint64)
+    for word_idx in range(num_words):
+        hashes = (hashes ^ words[..., word_idx]) * hash_multiplier
+    return hashes ^ (hashes >> np.uint64(29))
+
+
+_worker_move_table = None
+_worker_edge_length = None
+
+
+def _init_worker(edge_length):
+    global _worker_move_table
+    global _worker_edge_length
+    _worker_move_table = rubiks.get_move_table(edge_length)
+    _worker_edge_length = edge_length
+
+
+def _expand(packed):
+    """Returns the distinct children (packed keys) of a chunk of packed states and the action reaching each one."""
+    num_actions = len(_worker_move_table)
+    faces = rubiks.unpack_states(packed, _worker_edge_length).reshape(len(packed), -1)
+    children = rubiks.pack_states(faces[:, _worker_move_table].reshape(-1, 6, _worker_edge_length, _worker_edge_length))
+    keys, child_idxs = np.unique(children.view(np.dtype((np.void, children.shape[1]))).ravel(), return_index=True)
+    return keys.view(np.uint8).reshape(len(keys), -1), (child_idxs % num_actions).astype(np.uint8)
+
+
+def build_endgame_table(depth, edge_length=3, processes=None):
+    """Builds the table of the states within depth actions of solved by breadth-first search, returning its paths."""
+    paths = table_paths(depth, edge_length)
+    hashes_path, keys_path, moves_path = paths
+    if load_table_arrays(depth, edge_length) is not None:
+        print(f'Endgame table {keys_path} already built.')
+        return paths
+    if any(os.path.exists(path) for path in paths):
+        logging.warning(f'Rebuilding the incomplete endgame table {keys_path}.')
+
+    solved = rubiks.pack_states(rubiks.solved_faces(edge_length))
+    key_dtype = np.dtype((np.void, len(solved)))
+    levels = [solved.reshape(1, -1).view(key_dtype).ravel()]
+    level_actions = [np.zeros(1, dtype=np.uint8)]
+    processes = processes or os.cpu_count()
+    pool = multiprocessing.Pool(processes, initializer=_init_worker, initargs=(edge_length,)) if processes > 1 else None
+    if pool is None:
+        _init_worker(edge_length)
+    try:
+        for level_depth in range(1, depth + 1):
+            time_start = time.time()
+            frontier = levels[-1].view(np.uint8).reshape(len(levels[-1]), -1)
+            chunks = np.array_split(frontier, max(1, len(frontier) // chunk_size))
+            results = pool.map(_expand, chunks) if pool is not None else map(_expand, chunks)
+            chunk_keys, chunk_actions = zip(*results)
+            keys = np.concatenate(chunk_keys).view(key_dtype).ravel()
+            keys, idxs = np.unique(keys, return_index=True)
+            # The children of a level can only be in the two levels before it.
+            new = ~contains_keys(levels[-1], keys)
+            if len(levels) > 1:
+                new &= ~contains_keys(levels[-2], keys)
+            levels.append(keys[new])
+            level_actions.append(np.concatenate(chunk_actions)[idxs[new]])
+            print('Endgame table: {0:>9} states at depth {1:>2} ({2:.1f} seconds)'.format(
+                len(levels[-1]), level_depth, time.time() - time_start))
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+
+    keys = np.concatenate(levels).view(np.uint8).reshape(-1, len(solved))
+    hashes = key_hashes(keys)
+    order = np.argsort(hashes, kind='stable')
+    moves = np.empty([len(keys), 2], dtype=np.uint8)
+    moves[:, 0] = np.repeat(np.arange(len(levels)), [len(level) for level in levels])
+    # The next action towards solved undoes the action that reached the state from the solved side.
+    moves[:, 1] = inverse_action(np.concatenate(level_actions))
+    # Each array is replaced whole, and the moves go last: a build stopped halfway leaves the moves missing.
+    if os.path.exists(moves_path):
+        os.remove(moves_path)
+    rubiks.save_table(hashes_path, hashes[order])
+    rubiks.save_table(keys_path, keys[order])
+    rubiks.save_table(moves_path, moves[order])
+    logging.info(f'Endgame table {keys_path} built: {len(keys)} states within {depth} actions.')
+    return paths
+
+
+class EndgameTable():
+    """Memory-mapped endgame table of the states within depth actions of solved."""
+    def __init__(self, depth, edge_length=3):
+        self.depth = depth
+        self.edge_length = edge_length
+        paths = table_paths(depth, edge_length)
+        arrays = load_table_arrays(depth, edge_length)
+        if arrays is None:
+            raise FileNotFoundError(f'Endgame table {paths[1]} not found or incomplete, build it with: '
+                + f'python endgame.py --build={depth} --size={edge_length}')
+        self.hashes, self.keys, self.moves = arrays
+
+    def __len__(self):
+        return len(self.keys)
+
+    def lookup(self, faces):
+        """
+        Returns (distance, action) arrays for a batch of faces (..., 6, N, N), or scalars for a single state:
+        the distance to solved and the action getting one step closer, -1 for states outside the table.
+        """
+        packed = rubiks.pack_states(faces)
+        keys = packed.reshape(-1, packed.shape[-1])
+        hashes = key_hashes(keys)
+        idxs = np.minimum(np.searchsorted(self.hashes, hashes), len(self.hashes) - 1)
+        found = np.all(self.keys[idxs] == keys, axis=1)
+        # Keys sharing a hash sit next to each other: look past the first one.
+        for key_idx in np.flatnonzero(~found & (self.hashes[idxs] == hashes)):
+            idx = idxs[key_idx]
+            while idx + 1 < len(self.hashes) and self.hashes[idx + 1] == hashes[key_idx] and not found[key_idx]:
+                idx += 1
+                found[key_idx] = np.array_equal(self.keys[idx], keys[key_idx])
+            idxs[key_idx] = idx
+        moves = np.where(found[:, None], self.moves[idxs].astype(np.int16), -1)
+        distances = moves[:, 0].reshape(packed.shape[:-1])
+        actions = moves[:, 1].reshape(packed.shape[:-1])
+        return distances, actions
+
+    def solution(self, cube):
+        """Returns the actions taking the given rubiks.Cube to solved, or None if it is outside the table."""
+        distance, action = self.lookup(cube.faces)
+        if distance < 0:
+            return None
+        cube = cube.copy()
+        actions = []
+        while distance > 0:
+            actions.append(int(action))
+            cube.rotate(int(action))
+            distance, action = self.lookup(cube.faces)
+        return actions
+
+
+def main():
+    depth = None
+    edge_length = 3
+    processes = None
+    try:
+        opts, args = getopt.getopt(sys.argv[1:], 's:p:h', ['build=', 'size=', 'processes=', 'help'])
+        for opt, arg in opts:
+            if opt in ('-h', '--help'):
+                print('Options:')
+                print(' --build=K           build the table of the states within K actions of solved')
+                print(' -s N, --size=N      number of squares per Cube edge (default: 3)')
+                print(' -p N, --processes=N number of worker processes (default: all CPUs)')
+                print(' -h, --help          display this help page and exit')
+                print('\n')
+                quit()
+            elif opt == '--build':
+                depth = int(arg)
+            elif opt in ('-s', '--size'):
+                edge_length = int(arg)
+            elif opt in ('-p', '--processes'):
+                processes = int(arg)
+    except (getopt.GetoptError, ValueError) as e:
+        print(f'\nError: {e}')
+        print("Call with option '--help' or '-h' for the help page.\n\n")
+        quit()
+
+    if depth is not None:
+        build_endgame_table(depth, edge_length, processes)
+
+
+if __name__ == '__main__':
+    main()
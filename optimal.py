@@ -0,0 +1,225 @@
+"""
+Optimal solver for the 3x3x3 Rubik's Cube.
+
+Iterative-deepening A* over cubie coordinates, guided by the pattern databases of
+pattern_db (the maximum of the corner table and the two edge tables), so every
+solution it returns is a shortest one (half-turn metric). Move pruning never turns
+the same face twice in a row and takes commuting opposite faces in a fixed order.
+The search runs within a wall-clock budget and counts its nodes, which also makes
+it a throughput benchmark for the coordinate move tables.
+"""
+
+import sys
+import time
+import array
+import getopt
+import logging
+import random
+from collections import namedtuple
+import numpy as np
+import rubiks
+import cubie
+import pattern_db
+from twophase import move_faces, opposite_faces, reorientation, solution_length
+
+# Nodes expanded between two checks of the clock.
+time_check_interval = 2 ** 14
+
+
+def _flat_array(typecode, table):
+    """Returns a numpy table flattened into an array.array, whose items are read faster one at a time."""
+    flat = array.array(typecode)
+    flat.frombytes(np.ascontiguousarray(table, dtype=np.dtype(typecode)).tobytes())
+    return flat
+
+
+class SearchResult(namedtuple('SearchResult', ('solution', 'bound', 'nodes', 'seconds', 'cache_hits', 'cache_lookups'))):
+    """
+    Outcome of a search: the solution (list of move names, None if the budget ran out first), the
+    lower bound proven on the solution length, nodes expanded, time taken and heuristic cache counters.
+    """
+    @property
+    def nodes_per_second(self):
+        return self.nodes / self.seconds if self.seconds > 0 else 0.
+
+    @property
+    def cache_hit_rate(self):
+        return self.cache_hits / self.cache_lookups if self.cache_lookups > 0 else 0.
+
+    def __str__(self):
+        if self.solution is not None:
+            outcome = 'Solution ({0} moves): {1}'.format(solution_length(self.solution), ' '.join(self.solution))
+        else:
+            outcome = 'No solution found in time, at least {0} moves are needed'.format(self.bound)
+        return '{0}\nNodes: {1} in {2:.2f} seconds ({3:.0f} nodes/s), heuristic cache hits: {4:.1f}% of {5}'.format(
+            outcome, self.nodes, self.seconds, self.nodes_per_second, 100 * self.cache_hit_rate, self.cache_lookups)
+
+
+class OptimalSolver():
+    """
+    IDA* solver using the 'corners', 'edges_a' and 'edges_b' pattern databases.
+    The heuristic of the nodes within cache_depth moves of the root, which every iteration
+    visits again, is kept in a cache of at most cache_size entries.
+    """
+    def __init__(self, cache_depth=5, cache_size=2 ** 20):
+        time_start = time.time()
+        self.cache_depth = cache_depth
+        self.cache_size = cache_size
+        corners, edges_a, edges_b = pattern_db.load_pattern_databases(('corners', 'edges_a', 'edges_b'))
+        self.edge_patterns = (edges_a.pattern, edges_b.pattern)
+        # The nibble-packed tables are read into memory: indexing bytes is much faster than a memmap.
+        self.corner_distances = bytes(corners.table)
+        self.edge_distances = (bytes(edges_a.table), bytes(edges_b.table))
+
+        # Flat [coordinate * num_moves + move] tables, indexed one entry at a time by the search.
+        self.corner_permutation_move = _flat_array('i', cubie.corner_permutation_move_table())
+        self.corner_orientation_move = _flat_array('i', cubie.corner_orientation_move_table())
+        self.edge_moves = []
+        for pattern in self.edge_patterns:
+            arrangement_table, flip_table = pattern.move_tables()
+            self.edge_moves.append((_flat_array('i', arrangement_table), _flat_array('B', flip_table)))
+
+        # Moves allowed after each move (index num_moves: no previous move).
+        self.next_moves = []
+        for previous in range(cubie.num_moves + 1):
+            self.next_moves.append([move for move in range(cubie.num_moves) if previous == cubie.num_moves or (
+                move_faces[move] != move_faces[previous]
+                and not (move_faces[move] == opposite_faces[move_faces[previous]] and move_faces[move] < move_faces[previous]))])
+        logging.info('Optimal solver tables loaded in {0:.2f} seconds.'.format(time.time() - time_start))
+
+    def solve(self, cube, time_limit=None):
+        """
+        Returns the SearchResult of an optimal search for the given 3x3x3 rubiks.Cube (or CubieCube).
+        The solution ends with the whole-cube rotations needed if slice moves displaced the centres.
+        If time_limit (seconds) runs out first, the result has no solution and the best bound reached.
+        Raises ValueError if the cube cannot be solved.
+        """
+        cubie_cube = cube if isinstance(cube, cubie.CubieCube) else cubie.CubieCube.from_cube(cube)
+        if not cubie_cube.is_valid():
+            raise ValueError('The cube is not solvable: a cubie is twisted, flipped or swapped.')
+        self.deadline = None if time_limit is None else time.time() + time_limit
+        self.flag_stop = False
+        self.nodes = 0
+        self.cache = {}
+        self.cache_hits = 0
+        self.cache_lookups = 0
+        time_start = time.time()
+
+        state = [cubie_cube.corner_permutation, cubie_cube.corner_orientation]
+        for pattern in self.edge_patterns:
+            arrangement, flips = divmod(int(pattern.indices(cubie_cube.ep, cubie_cube.eo)), 64)
+            state += [arrangement, flips]
+        bound = self._distance(*state)
+        moves = []
+        while not self._search(*state, bound, moves):
+            if self.flag_stop:
+                break
+            bound += 1
+            logging.info('Optimal search: no solution within {0} moves ({1} nodes so far).'.format(bound - 1, self.nodes))
+
+        solution = None
+        if not self.flag_stop:
+            solution = [cubie.move_names[move] for move in moves]
+            if not isinstance(cube, cubie.CubieCube):
+                solution += reorientation(cube).split()
+        return SearchResult(solution, bound, self.nodes, time.time() - time_start, self.cache_hits, self.cache_lookups)
+
+    def _distance(self, corner_permutation, corner_orientation, arrangement_a, flips_a, arrangement_b, flips_b):
+        """Returns the pattern database estimate of a state, given by its coordinates."""
+        corners = corner_permutation * cubie.num_corner_orientations + corner_orientation
+        edges_a = arrangement_a * 64 + flips_a
+        edges_b = arrangement_b * 64 + flips_b
+        return max(
+            self.corner_distances[corners >> 1] >> ((corners & 1) << 2) & 15,
+            self.edge_distances[0][edges_a >> 1] >> ((edges_a & 1) << 2) & 15,
+            self.edge_distances[1][edges_b >> 1] >> ((edges_b & 1) << 2) & 15)
+
+    def _search(self, corner_permutation, corner_orientation, arrangement_a, flips_a, arrangement_b, flips_b, togo, moves):
+        """
+        Depth-first search of the states within togo moves, pruned by the heuristic.
+        Returns True (with the solution in moves) once the solved state is reached.
+        """
+        if togo == 0:
+            return (corner_permutation == 0 and corner_orientation == 0
+                and arrangement_a * 64 + flips_a == self.edge_patterns[0].solved_index
+                and arrangement_b * 64 + flips_b == self.edge_patterns[1].solved_index)
+        (arrangement_move_a, flip_move_a), (arrangement_move_b, flip_move_b) = self.edge_moves
+        caching = len(moves) < self.cache_depth
+        for move in self.next_moves[moves[-1] if moves else cubie.num_moves]:
+            self.nodes += 1
+            if self.nodes % time_check_interval == 0 and self.deadline is not None and time.time() > self.deadline:
+                self.flag_stop = True
+            if self.flag_stop:
+                return False
+            new_state = (
+                self.corner_permutation_move[corner_permutation * cubie.num_moves + move],
+                self.corner_orientation_move[corner_orientation * cubie.num_moves + move],
+                arrangement_move_a[arrangement_a * cubie.num_moves + move],
+                flips_a ^ flip_move_a[arrangement_a * cubie.num_moves + move],
+                arrangement_move_b[arrangement_b * cubie.num_moves + move],
+                flips_b ^ flip_move_b[arrangement_b * cubie.num_moves + move])
+            if caching:
+                self.cache_lookups += 1
+                distance = self.cache.get(new_state)
+                if distance is not None:
+                    self.cache_hits += 1
+                else:
+                    distance = self._distance(*new_state)
+                    if len(self.cache) < self.cache_size:
+                        self.cache[new_state] = distance
+            else:
+                distance = self._distance(*new_state)
+            if distance >= togo:
+                continue
+            moves.append(move)
+            if self._search(*new_state, togo - 1, moves):
+                return True
+            moves.pop()
+        return False
+
+
+def main():
+    sequence = None
+    depth = 14
+    time_limit = None
+    try:
+        opts, args = getopt.getopt(sys.argv[1:], 'h', ['scramble=', 'depth=', 'time=', 'seed=', 'help'])
+        for opt, arg in opts:
+            if opt in ('-h', '--help'):
+                print('Options:')
+                print(' --scramble=MOVES    solve the cube scrambled by the given moves')
+                print(' --depth=N           otherwise scramble with N random face moves (default: 14)')
+                print(' --time=SECONDS      wall-clock budget of the search (default: none)')
+                print(' --seed=N            set the RNG seed')
+                print(' -h, --help          display this help page and exit')
+                print('\n')
+                quit()
+            elif opt == '--scramble':
+                sequence = arg
+            elif opt == '--depth':
+                depth = int(arg)
+            elif opt == '--time':
+                time_limit = float(arg)
+            elif opt == '--seed':
+                random.seed(int(arg))
+    except (getopt.GetoptError, ValueError) as e:
+        print(f'\nError: {e}')
+        print("Call with option '--help' or '-h' for the help page.\n\n")
+        quit()
+
+    if sequence is None:
+        sequence = ' '.join(random.choice(cubie.move_names) for _ in range(depth))
+    try:
+        solver = OptimalSolver()
+    except (FileNotFoundError, ValueError) as e:
+        print(f'{e}\nBuild them all with: python pattern_db.py --build=all')
+        quit()
+    cube = rubiks.Cube(3)
+    cube.apply_sequence(sequence)
+    print(cube)
+    print('Scramble: {0}'.format(sequence))
+    print(solver.solve(cube, time_limit))
+
+
+if __name__ == '__main__':
+    main()
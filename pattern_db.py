@@ -0,0 +1,288 @@
+"""
+Pattern databases for the 3x3x3 Rubik's Cube.
+
+A pattern database stores, for every state of a sub-problem (all corners, or six
+of the edges), the number of face moves (half-turn metric) needed to solve it.
+Any of these distances is a lower bound for the whole cube, so their maximum is an
+admissible heuristic for optimal solvers.
+
+Tables are built once by a breadth-first search over coordinate space, which can be
+split across a process pool and resumed if interrupted, then stored with 4 bits per
+state under rubiks.tables_dir and opened with numpy.memmap.
+"""
+
+import os
+import sys
+import json
+import time
+import getopt
+import logging
+import functools
+import multiprocessing
+import numpy as np
+import rubiks
+import cubie
+
+# Distance of the states not reached yet while building a table.
+unvisited = 255
+# Number of frontier states expanded by a worker at once.
+chunk_size = 2 ** 18
+
+
+def arrangement_rank(positions, num_positions):
+    """Returns the rank of ordered selections of distinct positions (along the last axis)."""
+    positions = np.asarray(positions, dtype=np.int64)
+    rank = np.zeros(positions.shape[:-1], dtype=np.int64)
+    for i in range(positions.shape[-1]):
+        # Digit i counts the positions still free that are smaller than positions[i].
+        smaller_used = np.sum(positions[..., :i] < positions[..., i:i + 1], axis=-1)
+        rank = rank * (num_positions - i) + positions[..., i] - smaller_used
+    return rank
+
+
+def arrangement_from_rank(ranks, num_positions, length):
+    """Returns the ordered selections (along a new last axis) of the given ranks."""
+    ranks = np.array(ranks, dtype=np.int64)
+    digits = np.empty(ranks.shape + (length,), dtype=np.int64)
+    for i in range(length - 1, -1, -1):
+        digits[..., i] = ranks % (num_positions - i)
+        ranks //= (num_positions - i)
+    used = np.zeros(ranks.shape + (num_positions,), dtype=bool)
+    positions = np.empty(digits.shape, dtype=np.int8)
+    for i in range(length):
+        free_rank = np.cumsum(~used, axis=-1) - 1
+        picked = np.argmax(~used & (free_rank == digits[..., i:i + 1]), axis=-1)
+        positions[..., i] = picked
+        np.put_along_axis(used, picked[..., None], True, axis=-1)
+    return positions
+
+
+class CornerPattern():
+    """All 8 corners: index = corner permutation * 2187 + corner orientation."""
+    def __init__(self):
+        self.size = cubie.num_corner_permutations * cubie.num_corner_orientations
+        self.solved_index = 0
+
+    def indices(self, cp, co):
+        """Returns the indices of cubie arrays (cp, co) of shape (..., 8)."""
+        return (cubie.permutation_coordinate(cp) * cubie.num_corner_orientations
+            + cubie.orientation_coordinate(co, 3))
+
+    def neighbours(self, indices):
+        """Returns the indices reached from each index by every move, shape (len(indices), num_moves)."""
+        cp, co = np.divmod(indices, cubie.num_corner_orientations)
+        return (cubie.corner_permutation_move_table()[cp].astype(np.int64) * cubie.num_corner_orientations
+            + cubie.corner_orientation_move_table()[co])
+
+
+class EdgePattern():
+    """
+    Six tracked edges: index = rank of their positions * 64 + their orientations
+    (bit i is the orientation of the i-th tracked edge).
+    """
+    def __init__(self, edges):
+        self.edges = np.array(edges)
+        self.num_arrangements = 12 * 11 * 10 * 9 * 8 * 7
+        self.size = self.num_arrangements * 64
+        self.solved_index = int(arrangement_rank(self.edges, 12)) * 64
+
+    def indices(self, ep, eo):
+        """Returns the indices of cubie arrays (ep, eo) of shape (..., 12)."""
+        ep = np.asarray(ep)
+        positions = np.argsort(ep, axis=-1)[..., self.edges]
+        oris = np.take_along_axis(np.asarray(eo, dtype=np.int64), positions, axis=-1)
+        return arrangement_rank(positions, 12) * 64 + np.sum(oris << np.arange(len(self.edges)), axis=-1)
+
+    @functools.lru_cache(maxsize=None)
+    def move_tables(self):
+        """Returns the tables [arrangement, move] -> arrangement and [arrangement, move] -> flipped edges mask."""
+        positions = arrangement_from_rank(np.arange(self.num_arrangements), 12, len(self.edges)).astype(np.intp)
+        arrangement_table = np.empty([self.num_arrangements, cubie.num_moves], dtype=np.int32)
+        flip_table = np.empty([self.num_arrangements, cubie.num_moves], dtype=np.uint8)
+        for move_idx, move in enumerate(cubie.basic_moves()):
+            # The edge at position p is carried to the position q with move.ep[q] == p.
+            new_positions = np.argsort(move.ep)[positions]
+            arrangement_table[:, move_idx] = arrangement_rank(new_positions, 12)
+            flip_table[:, move_idx] = np.sum(move.eo[new_positions].astype(np.uint8) << np.arange(len(self.edges), dtype=np.uint8), axis=-1)
+        return arrangement_table, flip_table
+
+    def neighbours(self, indices):
+        """Returns the indices reached from each index by every move, shape (len(indices), num_moves)."""
+        arrangement_table, flip_table = self.move_tables()
+        arrangements, oris = np.divmod(indices, 64)
+        return arrangement_table[arrangements].astype(np.int64) * 64 + (oris[:, None] ^ flip_table[arrangements])
+
+
+# Available patterns, by name.
+patterns = {
+    'corners': CornerPattern(),
+    'edges_a': EdgePattern(range(0, 6)),
+    'edges_b': EdgePattern(range(6, 12)),
+}
+
+
+def database_path(name):
+    """Returns the path of the packed table of the given pattern."""
+    return os.path.join(rubiks.tables_dir or '.', 'pdb_{0}.bin'.format(name))
+
+
+_worker_pattern = None
+_worker_distances = None
+
+
+def _init_worker(name, work_path):
+    global _worker_pattern
+    global _worker_distances
+    _worker_pattern = patterns[name]
+    _worker_distances = np.memmap(work_path, dtype=np.uint8, mode='r')
+
+
+def _expand(frontier):
+    """Returns the unvisited states adjacent to a chunk of the frontier."""
+    neighbours = _worker_pattern.neighbours(frontier).ravel()
+    neighbours = neighbours[_worker_distances[neighbours] == unvisited]
+    return np.unique(neighbours)
+
+
+def build_pattern_database(name, processes=None):
+    """
+    Builds the table of the given pattern by breadth-first search and stores it nibble-packed.
+    The search keeps one byte per state in a work file and records each completed depth,
+    so an interrupted build resumes from the last completed depth.
+    """
+    pattern = patterns[name]
+    path = database_path(name)
+    work_path = path + '.work'
+    progress_path = path + '.progress'
+    if os.path.exists(path):
+        print(f'Pattern database {path} already built.')
+        return path
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+
+    if os.path.exists(work_path) and os.path.exists(progress_path):
+        with open(progress_path) as f:
+            depth = json.load(f)['depth']
+        distances = np.memmap(work_path, dtype=np.uint8, mode='r+', shape=(pattern.size,))
+        print(f'Resuming {name} pattern database from depth {depth}.')
+    else:
+        depth = 0
+        distances = np.memmap(work_path, dtype=np.uint8, mode='w+', shape=(pattern.size,))
+        distances[:] = unvisited
+        distances[pattern.solved_index] = 0
+        distances.flush()
+    logging.info(f'Building {name} pattern database from depth {depth}.')
+
+    # Build the move tables before forking, so that workers inherit them.
+    pattern.neighbours(np.array([pattern.solved_index]))
+    processes = processes or os.cpu_count()
+    pool = multiprocessing.Pool(processes, initializer=_init_worker, initargs=(name, work_path)) if processes > 1 else None
+    if pool is None:
+        _init_worker(name, work_path)
+    try:
+        while True:
+            time_start = time.time()
+            frontier = np.flatnonzero(distances == depth)
+            if len(frontier) == 0:
+                break
+            chunks = np.array_split(frontier, max(1, len(frontier) // chunk_size))
+            results = pool.imap_unordered(_expand, chunks) if pool is not None else map(_expand, chunks)
+            for new_states in results:
+                distances[new_states] = depth + 1
+            distances.flush()
+            depth += 1
+            with open(progress_path, 'w') as f:
+                json.dump({'depth': depth}, f)
+            print('{0}: depth {1:>2} expanded {2:>10} states in {3:.1f} seconds'.format(
+                name, depth - 1, len(frontier), time.time() - time_start))
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+
+    # Two distances per byte: the even index in the low nibble.
+    padded = np.append(distances, np.uint8(0)) if pattern.size % 2 else np.asarray(distances)
+    packed = (padded[0::2] & 15) | ((padded[1::2] & 15) << 4)
+    # Renamed into place once complete, so that an interrupted write is never taken for a built database.
+    temp_path = path + '.tmp'
+    packed.tofile(temp_path)
+    os.replace(temp_path, path)
+    del distances
+    os.remove(work_path)
+    os.remove(progress_path)
+    logging.info(f'Pattern database {path} built, maximum depth {depth - 1}.')
+    return path
+
+
+class PatternDatabase():
+    """Nibble-packed distance table of one pattern, memory-mapped from disk."""
+    def __init__(self, name):
+        self.name = name
+        self.pattern = patterns[name]
+        self.path = database_path(name)
+        if not os.path.exists(self.path):
+            raise FileNotFoundError(f'Pattern database {self.path} not found, build it with: python pattern_db.py --build={name}')
+        self.table = np.memmap(self.path, dtype=np.uint8, mode='r')
+        if len(self.table) != (self.pattern.size + 1) // 2:
+            raise ValueError(f'Pattern database {self.path} has an unexpected size.')
+
+    def distances(self, indices):
+        """Returns the distances of the given state indices."""
+        indices = np.asarray(indices, dtype=np.int64)
+        return (self.table[indices >> 1] >> ((indices & 1) << 2).astype(np.uint8)) & 15
+
+    def cubie_indices(self, cp, co, ep, eo):
+        """Returns the indices of cubie arrays (as returned by cubie.cubies_from_faces)."""
+        if isinstance(self.pattern, CornerPattern):
+            return self.pattern.indices(cp, co)
+        return self.pattern.indices(ep, eo)
+
+
+@functools.lru_cache(maxsize=None)
+def load_pattern_databases(names=('corners', 'edges_a', 'edges_b')):
+    """Returns the memory-mapped pattern databases with the given names."""
+    return tuple(PatternDatabase(name) for name in names)
+
+
+def heuristic(faces, databases=None):
+    """
+    Returns the admissible distance estimate (maximum over the pattern databases) of
+    a 3x3x3 state, or of a batch of states of shape (..., 6, 3, 3).
+    """
+    databases = databases or load_pattern_databases()
+    cubies = cubie.cubies_from_faces(faces)
+    estimates = [database.distances(database.cubie_indices(*cubies)) for database in databases]
+    return np.max(estimates, axis=0)
+
+
+def main():
+    names = []
+    processes = None
+    try:
+        opts, args = getopt.getopt(sys.argv[1:], 'p:h', ['build=', 'processes=', 'help'])
+        for opt, arg in opts:
+            if opt in ('-h', '--help'):
+                print('Options:')
+                print(' --build=NAME        build a pattern database (corners, edges_a, edges_b or all)')
+                print(' -p N, --processes=N number of worker processes (default: all CPUs)')
+                print(' -h, --help          display this help page and exit')
+                print('\n')
+                quit()
+            elif opt == '--build':
+                names = list(patterns) if arg == 'all' else [arg]
+                for name in names:
+                    if name not in patterns:
+                        print(f'Unknown pattern {name!r}, choose among: {", ".join(patterns)}, all.')
+                        quit()
+            elif opt in ('-p', '--processes'):
+                processes = int(arg)
+    except (getopt.GetoptError, ValueError) as e:
+        print(f'\nError: {e}')
+        print("Call with option '--help' or '-h' for the help page.\n\n")
+        quit()
+
+    for name in names:
+        build_pattern_database(name, processes)
+
+
+if __name__ == '__main__':
+    main()
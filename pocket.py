@@ -0,0 +1,224 @@
+"""
+Complete distance table of the 2x2x2 Rubik's Cube (the Pocket Cube).
+
+A 2x2x2 has no centres, so states are taken up to whole-cube rotations: the DLF
+corner fixes the frame and the other seven corners are described by their
+permutation (0..5039) and orientation (0..728) coordinates, 3,674,160 states
+in all. Turning R, U and B (which leave the DLF corner alone) reaches all of
+them, and a breadth-first search over the coordinate move tables gives the
+distance to solved of each one in quarter turns, stored in one byte per state
+under rubiks.tables_dir and opened as a numpy memory map.
+Following the distances down solves any 2x2x2 optimally, and they are an exact
+oracle to measure the DQN against.
+"""
+
+import os
+import sys
+import time
+import getopt
+import random
+import functools
+import logging
+import numpy as np
+import rubiks
+import cubie
+from twophase import cube_rotations, opposite_faces, solution_length
+
+num_corner_permutations = 5040
+num_corner_orientations = 729
+num_states = num_corner_permutations * num_corner_orientations
+
+# The DLF corner (see cubie.corner_facelet_names) stays in place.
+fixed_corner = 6
+# Quarter turns of the faces it does not touch, numbered as rubiks.Cube actions: R, R', U, U', B, B'.
+moves = [0, 1, 2, 3, 8, 9]
+move_names = [cubie.move_names[move] for move in moves]
+
+unreached = 255
+
+
+def corner_cubies(faces):
+    """
+    Returns the arrays (cp, co) of the 8 corners of 2x2x2 faces (a single (6, 2, 2) state or
+    a batch of shape (..., 6, 2, 2)), in the frame where the DLF corner is home.
+    Raises ValueError if the faces do not describe a valid 2x2x2 cube.
+    """
+    faces = np.asarray(faces)
+    # The corners of a 3x3x3 whose centres take the colours of the DLF corner's faces.
+    big_faces = np.broadcast_to(rubiks.solved_faces(3), faces.shape[:-3] + (6, 3, 3)).copy()
+    big_faces[..., ::2, ::2] = faces
+    flat_faces = big_faces.reshape(faces.shape[:-3] + (54,))
+    centres = flat_faces[..., cubie.centre_facelets]
+    for facelet in cubie.corner_facelets[fixed_corner]:
+        face = facelet // 9
+        centres[..., face] = flat_faces[..., facelet]
+        centres[..., opposite_faces[face]] = np.asarray(opposite_faces)[flat_faces[..., facelet]]
+    flat_faces[..., cubie.centre_facelets] = centres
+    if np.any(np.sort(centres, axis=-1) != np.arange(6)):
+        raise ValueError('The faces do not describe a valid 2x2x2 cube.')
+    cp, co, _, _ = cubie.cubies_from_faces(big_faces)
+    if np.any(np.sort(cp, axis=-1) != np.arange(8)) or np.any(np.sum(co, axis=-1) % 3 != 0):
+        raise ValueError('The cube is not solvable: a corner is twisted or missing.')
+    return cp, co
+
+
+def coordinates(cp, co):
+    """Returns the table index (permutation * num_corner_orientations + orientation) of corner arrays (cp, co)."""
+    others = np.delete(np.asarray(cp, dtype=np.int64), fixed_corner, axis=-1)
+    others -= others > fixed_corner
+    permutation = cubie.permutation_coordinate(others)
+    orientation = cubie.orientation_coordinate(np.delete(co, fixed_corner, axis=-1), 3)
+    return permutation * num_corner_orientations + orientation
+
+
+@functools.lru_cache(maxsize=None)
+def move_tables():
+    """Returns the tables [permutation, move] -> permutation and [orientation, move] -> orientation."""
+    others = cubie.permutation_from_coordinate(np.arange(num_corner_permutations), 7)
+    cp = np.insert(others + (others >= fixed_corner), fixed_corner, fixed_corner, axis=-1)
+    co = np.insert(cubie.orientation_from_coordinate(np.arange(num_corner_orientations), 3, 7), fixed_corner, 0, axis=-1)
+    permutation_table = np.empty([num_corner_permutations, len(moves)], dtype=np.int32)
+    orientation_table = np.empty([num_corner_orientations, len(moves)], dtype=np.int32)
+    for move_idx, move in enumerate(moves):
+        move_cubies = cubie.basic_moves()[move]
+        new_others = np.delete(cp[:, move_cubies.cp], fixed_corner, axis=-1)
+        permutation_table[:, move_idx] = cubie.permutation_coordinate(new_others - (new_others > fixed_corner))
+        new_co = (co[:, move_cubies.cp] + move_cubies.co) % 3
+        orientation_table[:, move_idx] = cubie.orientation_coordinate(np.delete(new_co, fixed_corner, axis=-1), 3)
+    permutation_table.setflags(write=False)
+    orientation_table.setflags(write=False)
+    return permutation_table, orientation_table
+
+
+def children(states):
+    """Returns the table indices (shape (len(states), len(moves))) reached by each move from the given ones."""
+    permutation_table, orientation_table = move_tables()
+    permutations, orientations = np.divmod(np.asarray(states, dtype=np.int64), num_corner_orientations)
+    return permutation_table[permutations] * num_corner_orientations + orientation_table[orientations]
+
+
+def table_path():
+    """Returns the path of the distance table."""
+    return os.path.join(rubiks.tables_dir or '.', 'pocket_distances.npy')
+
+
+def build_distance_table():
+    """Builds the distance table by breadth-first search over the coordinates, returning its path."""
+    path = table_path()
+    table = rubiks.load_table(path, mmap_mode='r')
+    if table is not None and table.shape == (num_states,):
+        print(f'Pocket Cube table {path} already built.')
+        return path
+    if table is not None:
+        logging.warning(f'Rebuilding Pocket Cube table {path}, which has {table.size} entries instead of {num_states}.')
+    # Close the memory map before the file is replaced.
+    del table
+
+    distances = np.full(num_states, unreached, dtype=np.uint8)
+    distances[0] = 0
+    frontier = np.zeros(1, dtype=np.int64)
+    depth = 0
+    while len(frontier) > 0:
+        time_start = time.time()
+        reached = np.unique(children(frontier))
+        frontier = reached[distances[reached] == unreached]
+        depth += 1
+        distances[frontier] = depth
+        print('Pocket Cube table: {0:>7} states at depth {1:>2} ({2:.1f} seconds)'.format(
+            len(frontier), depth, time.time() - time_start))
+    rubiks.save_table(path, distances)
+    logging.info(f'Pocket Cube table {path} built: {num_states} states, at most {depth - 1} quarter turns from solved.')
+    return path
+
+
+@functools.lru_cache(maxsize=None)
+def load_distance_table():
+    """Returns the memory-mapped distance table, building it on the first call (or if it is damaged)."""
+    path = table_path()
+    table = rubiks.load_table(path, mmap_mode='r')
+    if table is None or table.shape != (num_states,):
+        del table
+        build_distance_table()
+        table = np.load(path, mmap_mode='r')
+    return table
+
+
+def distances(faces):
+    """Returns the optimal number of quarter turns (up to whole-cube rotations) solving 2x2x2 faces (..., 6, 2, 2)."""
+    states = coordinates(*corner_cubies(faces))
+    return np.asarray(load_distance_table()[states.ravel()], dtype=np.int64).reshape(states.shape)
+
+
+def solve(cube):
+    """
+    Returns a shortest solution (list of move names) of the given 2x2x2 rubiks.Cube, followed by the
+    whole-cube rotation (x, y and z moves, not counted by twophase.solution_length) restoring the colours' sides.
+    Raises ValueError if the cube cannot be solved.
+    """
+    if cube.edge_length != 2:
+        raise ValueError(f'The Pocket Cube table needs a 2x2x2 cube, not {cube.edge_length}x{cube.edge_length}.')
+    table = load_distance_table()
+    state = int(coordinates(*corner_cubies(cube.faces)))
+    solution = []
+    while table[state] > 0:
+        # Some move always gets one step closer.
+        move_idx = int(np.argmax(table[children([state])[0]] == table[state] - 1))
+        solution.append(move_names[move_idx])
+        state = int(children([state])[0, move_idx])
+
+    cube = cube.copy()
+    cube.apply_sequence(' '.join(solution))
+    flat_faces = cube.faces.reshape(-1)
+    solved = rubiks.solved_faces(2).reshape(-1)
+    for rotation in cube_rotations:
+        if np.array_equal(flat_faces[rubiks.compile_sequence(rotation, 2)], solved):
+            return solution + rotation.split()
+    raise ValueError('The cube is not a rotation of the solved one after the table\'s moves.')
+
+
+def main():
+    sequence = None
+    depth = 20
+    flag_build = False
+    try:
+        opts, args = getopt.getopt(sys.argv[1:], 'h', ['build', 'scramble=', 'depth=', 'seed=', 'help'])
+        for opt, arg in opts:
+            if opt in ('-h', '--help'):
+                print('Options:')
+                print(' --build             build the distance table (it is otherwise built on first use)')
+                print(' --scramble=MOVES    solve the 2x2x2 cube scrambled by the given moves')
+                print(' --depth=N           otherwise scramble with N random actions (default: 20)')
+                print(' --seed=N            set the RNG seed')
+                print(' -h, --help          display this help page and exit')
+                print('\n')
+                quit()
+            elif opt == '--build':
+                flag_build = True
+            elif opt == '--scramble':
+                sequence = arg
+            elif opt == '--depth':
+                depth = int(arg)
+            elif opt == '--seed':
+                random.seed(int(arg))
+    except (getopt.GetoptError, ValueError) as e:
+        print(f'\nError: {e}')
+        print("Call with option '--help' or '-h' for the help page.\n\n")
+        quit()
+
+    if flag_build:
+        build_distance_table()
+        return
+    if sequence is None:
+        sequence = ' '.join(random.choice(rubiks.action_notation(2)) for _ in range(depth))
+    cube = rubiks.Cube(2)
+    cube.apply_sequence(sequence)
+    print(cube)
+    print('Scramble: {0}'.format(sequence))
+    time_start = time.time()
+    solution = solve(cube)
+    print('Solution ({0} moves, {1:.3f} seconds): {2}'.format(
+        solution_length(solution), time.time() - time_start, ' '.join(solution)))
+
+
+if __name__ == '__main__':
+    main()
@@ -13,6 +13,10 @@ import random
 import time
 import getopt
 import sys
+import os
+import re
+import logging
+import functools
 import importlib.util  # MODIFICA: Aggiunto import necessario
 
 # Number of squares along each edge of the Cube.
@@ -23,6 +27,14 @@ console_block = u'\u25a0'
 text_colour_white  = '\033[0m'
 # Number of random rotations to make during a Cube's scrambling.
 scramble_iterations = 25000
+# Directory where move tables are cached between runs (None disables the disk cache).
+tables_dir = 'tables'
+
+# Maximum number of indices stacked at once while composing permutations.
+composition_chunk_size = 2 ** 22
+
+# Move tables already built in this process, keyed by edge length.
+_move_tables = {}
 
 # Colour values of the Rubik's Cube.
 colours = {
@@ -33,15 +45,23 @@ colours = {
 
 # MODIFICA: Mappatura per convertire il dizionario in coordinate numpy
 # U->white(1), F->green(2), R->red(0), B->blue(4), L->orange(5), D->yellow(3)
+# The app's front face is rubiks.Cube's left face: U and D are turned by a quarter turn about the vertical axis.
 cube_dict_mapping = {
-    'U1': (1, 0, 0), 'U2': (1, 0, 1), 'U3': (1, 0, 2), 'U4': (1, 1, 0), 'U5': (1, 1, 1), 'U6': (1, 1, 2), 'U7': (1, 2, 0), 'U8': (1, 2, 1), 'U9': (1, 2, 2),
+    'U1': (1, 0, 2), 'U2': (1, 1, 2), 'U3': (1, 2, 2), 'U4': (1, 0, 1), 'U5': (1, 1, 1), 'U6': (1, 2, 1), 'U7': (1, 0, 0), 'U8': (1, 1, 0), 'U9': (1, 2, 0),
     'L1': (5, 0, 0), 'L2': (5, 0, 1), 'L3': (5, 0, 2), 'L4': (5, 1, 0), 'L5': (5, 1, 1), 'L6': (5, 1, 2), 'L7': (5, 2, 0), 'L8': (5, 2, 1), 'L9': (5, 2, 2),
     'F1': (2, 0, 0), 'F2': (2, 0, 1), 'F3': (2, 0, 2), 'F4': (2, 1, 0), 'F5': (2, 1, 1), 'F6': (2, 1, 2), 'F7': (2, 2, 0), 'F8': (2, 2, 1), 'F9': (2, 2, 2),
     'R1': (0, 0, 0), 'R2': (0, 0, 1), 'R3': (0, 0, 2), 'R4': (0, 1, 0), 'R5': (0, 1, 1), 'R6': (0, 1, 2), 'R7': (0, 2, 0), 'R8': (0, 2, 1), 'R9': (0, 2, 2),
     'B1': (4, 0, 0), 'B2': (4, 0, 1), 'B3': (4, 0, 2), 'B4': (4, 1, 0), 'B5': (4, 1, 1), 'B6': (4, 1, 2), 'B7': (4, 2, 0), 'B8': (4, 2, 1), 'B9': (4, 2, 2),
-    'D1': (3, 0, 0), 'D2': (3, 0, 1), 'D3': (3, 0, 2), 'D4': (3, 1, 0), 'D5': (3, 1, 1), 'D6': (3, 1, 2), 'D7': (3, 2, 0), 'D8': (3, 2, 1), 'D9': (3, 2, 2),
+    'D1': (3, 2, 0), 'D2': (3, 1, 0), 'D3': (3, 0, 0), 'D4': (3, 2, 1), 'D5': (3, 1, 1), 'D6': (3, 0, 1), 'D7': (3, 2, 2), 'D8': (3, 1, 2), 'D9': (3, 0, 2),
 }
 
+# Face of Cube named by each letter of standard notation, in the app's frame of cube_dict_mapping
+# (0 right, 1 up, 2 front, 3 down, 4 back, 5 left). Every move string is read in this frame.
+rubiks_face_positions = {'R': 0, 'U': 1, 'F': 2, 'D': 3, 'B': 4, 'L': 5}
+
+# Names of the squares of cube_dict_mapping, in the order of a 3x3x3 Cube's flattened faces.
+facelet_keys = sorted(cube_dict_mapping, key=lambda key: cube_dict_mapping[key][0] * 9 + cube_dict_mapping[key][1] * 3 + cube_dict_mapping[key][2])
+
 # Colours for console output.
 console_colours = {
     colours['red']: '\033[31m', colours['white']: '\033[37m', colours['green']: '\033[92m',
@@ -58,14 +78,329 @@ face_relations = {
     '_'.join([str(colours['yellow']), 'u']): colours['red'], '_'.join([str(colours['yellow']), 'l']): colours['green'], '_'.join([str(colours['yellow']), 'd']): colours['orange'], '_'.join([str(colours['yellow']), 'r']): colours['blue']
 }
 
+def num_actions(edge_length):
+    """Returns the number of rotation actions available on a Cube of the given size."""
+    return 12 + 4*(edge_length-2)
+
+
+def build_move_table(edge_length):
+    """
+    Computes the flat facelet permutation of every action.
+    Row 'action' holds, for each position of the flattened faces, the position its
+    facelet comes from, so that a move is faces.flat[:] = faces.flat[table[action]].
+    """
+    num_facelets = 6 * edge_length * edge_length
+    table = np.empty([num_actions(edge_length), num_facelets], dtype=np.intp)
+    # Track facelet positions (instead of colours) through the reference rotations.
+    # The tracker skips __init__, which would ask for this very table.
+    tracker = Cube.__new__(Cube)
+    tracker.edge_length = edge_length
+    tracker.cw_rotate_take_idxs = cw_rotate_take_idxs(edge_length)
+    for action in range(table.shape[0]):
+        tracker.faces = np.arange(num_facelets).reshape(6, edge_length, edge_length)
+        tracker.reference_rotate(action)
+        table[action] = tracker.faces.flatten()
+    return table
+
+
+def save_table(path, table):
+    """
+    Saves a table as .npy through a temporary file renamed into place, so that other processes
+    and later runs never read a partly written table.
+    """
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    temp_path = '{0}.{1}.tmp'.format(path, os.getpid())
+    try:
+        with open(temp_path, 'wb') as f:
+            np.save(f, table)
+        os.replace(temp_path, path)
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+
+
+def load_table(path, mmap_mode=None):
+    """Returns the table saved at path, or None if there is none or it cannot be read (e.g. truncated)."""
+    if path is None or not os.path.exists(path):
+        return None
+    try:
+        return np.load(path, mmap_mode=mmap_mode)
+    except (EOFError, OSError, ValueError) as e:
+        logging.warning(f'Ignoring unreadable table {path}: {e}')
+        return None
+
+
+def get_move_table(edge_length):
+    """
+    Returns the move table for the given edge length.
+    Tables are built at most once per process and, if tables_dir is set, stored on disk.
+    """
+    table = _move_tables.get(edge_length)
+    if table is not None:
+        return table
+
+    expected_shape = (num_actions(edge_length), 6 * edge_length * edge_length)
+    path = None
+    if tables_dir is not None:
+        path = os.path.join(tables_dir, 'moves_{0}.npy'.format(edge_length))
+    table = load_table(path)
+    if table is not None and table.shape != expected_shape:
+        logging.warning(f'Ignoring move table {path} with unexpected shape {table.shape}.')
+        table = None
+    if table is None:
+        table = build_move_table(edge_length)
+        if path is not None:
+            try:
+                save_table(path, table)
+            except OSError as e:
+                logging.warning(f'Could not cache move table in {path}: {e}')
+
+    table = np.ascontiguousarray(table, dtype=np.intp)
+    table.setflags(write=False)
+    _move_tables[edge_length] = table
+    return table
+
+
+def compose_permutations(permutations):
+    """
+    Returns the single permutation equivalent to applying the given stack
+    of flat permutations (shape [k, num_facelets]) in order, or one for each
+    stack of a batch (shape [..., k, num_facelets]).
+    Neighbouring pairs are composed together until one is left.
+    """
+    permutations = np.asarray(permutations)
+    while permutations.shape[-2] > 1:
+        if permutations.shape[-2] % 2 == 1:
+            # The odd one out is carried to the next round unchanged.
+            last = permutations[..., -1:, :]
+            permutations = permutations[..., :-1, :]
+        else:
+            last = None
+        # Applying a then b moves the facelet at a[b[i]] to position i.
+        permutations = np.take_along_axis(permutations[..., 0::2, :], permutations[..., 1::2, :], axis=-1)
+        if last is not None:
+            permutations = np.concatenate([permutations, last], axis=-2)
+    return permutations[..., 0, :]
+
+
+def sequence_permutation(actions, edge_length):
+    """
+    Returns the flat permutation equivalent to taking the given actions in order,
+    or one for each row of a 2D array of actions (one sequence per Cube of a batch).
+    """
+    move_table = get_move_table(edge_length)
+    actions = np.asarray(actions, dtype=np.intp)
+    permutation = np.broadcast_to(np.arange(move_table.shape[1], dtype=np.intp), actions.shape[:-1] + move_table.shape[1:])
+    # Compose in chunks so that big cubes never stack more than ~4M indices at once.
+    num_sequences = int(np.prod(actions.shape[:-1]))
+    chunk_length = max(1, composition_chunk_size // (move_table.shape[1] * num_sequences))
+    for start in range(0, actions.shape[-1], chunk_length):
+        chunk = move_table[actions[..., start:start + chunk_length]]
+        permutation = np.take_along_axis(permutation, compose_permutations(chunk), axis=-1)
+    return permutation
+
+
+# Clockwise action of each face in standard notation (the counter-clockwise action follows it).
+notation_face_actions = {letter: 2 * face for letter, face in rubiks_face_positions.items()}
+
+# One move of standard notation: optional inner layer number, face/slice/rotation letter, optional suffix.
+notation_token_pattern = re.compile(r"\s*(\d*)([FULDRBMESxyz])(2'|'2|2|'|)")
+
+
+def parse_sequence(sequence):
+    """
+    Parses a sequence in standard notation (e.g. "R U R' U'", "F2 M' 2R x") into a list of normalized moves.
+    Faces: R U F D B L. Inner layers: nX (layer n counted from face X, e.g. 2R).
+    Middle slices (odd sizes only): M E S. Whole-cube rotations: x y z.
+    Suffixes: ' (counter-clockwise), 2 (half turn).
+    """
+    sequence = sequence.replace('\u2019', "'").replace('\u2032', "'").strip()
+    moves = []
+    position = 0
+    while position < len(sequence):
+        match = notation_token_pattern.match(sequence, position)
+        if match is None or match.end() == position:
+            raise ValueError(f'Invalid move in sequence {sequence!r} at position {position}.')
+        layer, letter, suffix = match.groups()
+        if layer and letter not in notation_face_actions:
+            raise ValueError(f'Only face moves accept a layer number: {match.group().strip()!r}.')
+        if layer and int(layer) == 1:
+            layer = ''
+        moves.append(layer + letter + ('2' if '2' in suffix else suffix))
+        position = match.end()
+        while position < len(sequence) and sequence[position].isspace():
+            position += 1
+    return moves
+
+
+def action_notation(edge_length):
+    """Returns the standard notation name of every action of a Cube of the given size."""
+    names = [None] * num_actions(edge_length)
+    for letter, action in notation_face_actions.items():
+        names[action] = letter
+        names[action + 1] = letter + "'"
+    middle = edge_length // 2 if edge_length % 2 == 1 else None
+    for idx in range(1, edge_length - 1):
+        # Inner rows turn like D (clockwise action) and inner columns like B.
+        row_action = 12 + 2*(idx-1)
+        col_action = 12 + 2*(edge_length-2) + 2*(idx-1)
+        if idx == middle:
+            names[row_action], names[row_action + 1] = 'E', "E'"
+            names[col_action], names[col_action + 1] = "S'", 'S'
+        else:
+            names[row_action] = '{0}D'.format(edge_length - idx)
+            names[row_action + 1] = "{0}D'".format(edge_length - idx)
+            names[col_action] = '{0}B'.format(edge_length - idx)
+            names[col_action + 1] = "{0}B'".format(edge_length - idx)
+    return names
+
+
+def format_actions(actions, edge_length):
+    """Returns the given actions as a sequence in standard notation."""
+    names = action_notation(edge_length)
+    return ' '.join(names[int(action)] for action in actions)
+
+
+def _chain(*permutations):
+    """Returns the permutation applying the given ones in order."""
+    permutation = permutations[0]
+    for next_permutation in permutations[1:]:
+        permutation = permutation[next_permutation]
+    return permutation
+
+
+@functools.lru_cache(maxsize=None)
+def _move_permutation(letter, layer, edge_length):
+    """Returns the clockwise permutation of a single move letter (layer 1 is the outer face)."""
+    move_table = get_move_table(edge_length)
+    num_inner = edge_length - 2
+    if letter in 'MES':
+        if edge_length % 2 == 0:
+            raise ValueError(f'Slice move {letter} needs an odd cube size, not {edge_length}.')
+        # M turns like L, E like D and S like F.
+        return _move_permutation({'M': 'L', 'E': 'D', 'S': 'F'}[letter], edge_length // 2 + 1, edge_length)
+    if letter in 'zy':
+        # z turns the whole cube like F, y like U.
+        if letter == 'z':
+            outer, opposite = move_table[notation_face_actions['F']], move_table[notation_face_actions['B'] + 1]
+            inner = [move_table[12 + 2*num_inner + 2*idx + 1] for idx in range(num_inner)]
+        else:
+            outer, opposite = move_table[notation_face_actions['U']], move_table[notation_face_actions['D'] + 1]
+            inner = [move_table[12 + 2*idx + 1] for idx in range(num_inner)]
+        return _chain(outer, *inner, opposite)
+    if letter == 'x':
+        # Conjugating by y carries turns about the F axis onto the R axis.
+        y = _move_permutation('y', 1, edge_length)
+        return _chain(y, _move_permutation('z', 1, edge_length), np.argsort(y))
+    if not 1 <= layer < edge_length:
+        raise ValueError(f'Layer {layer} does not exist on a cube of size {edge_length}.')
+    if layer == 1:
+        return move_table[notation_face_actions[letter]]
+    if letter in 'RL':
+        y = _move_permutation('y', 1, edge_length)
+        return _chain(y, _move_permutation('F' if letter == 'R' else 'B', layer, edge_length), np.argsort(y))
+    # Inner columns are numbered from F and turn like B on their clockwise action,
+    # inner rows are numbered from U and turn like D on their clockwise action.
+    if letter == 'B':
+        return move_table[12 + 2*num_inner + 2*(edge_length-layer-1)]
+    if letter == 'F':
+        return move_table[12 + 2*num_inner + 2*(layer-2) + 1]
+    if letter == 'D':
+        return move_table[12 + 2*(edge_length-layer-1)]
+    return move_table[12 + 2*(layer-2) + 1]
+
+
+@functools.lru_cache(maxsize=1024)
+def _compile_moves(moves, edge_length):
+    """Compiles a tuple of normalized moves (or of actions) into one read-only permutation."""
+    if all(isinstance(move, int) for move in moves):
+        permutation = sequence_permutation(moves, edge_length)
+    else:
+        stack = []
+        for move in moves:
+            match = notation_token_pattern.fullmatch(move)
+            layer, letter, suffix = match.groups()
+            permutation = _move_permutation(letter, int(layer or 1), edge_length)
+            if suffix == "'":
+                permutation = np.argsort(permutation)
+            elif suffix == '2':
+                permutation = permutation[permutation]
+            stack.append(permutation)
+        permutation = compose_permutations(np.stack(stack))
+    permutation = np.ascontiguousarray(permutation, dtype=np.intp)
+    permutation.setflags(write=False)
+    return permutation
+
+
+def compile_sequence(sequence, edge_length=3):
+    """
+    Returns the single flat permutation equivalent to the given sequence, which can be
+    a string in standard notation, a list of notation moves or a list of actions.
+    Compiled sequences are cached, so replaying a sequence costs one gather.
+    """
+    if isinstance(sequence, str):
+        moves = tuple(parse_sequence(sequence))
+    elif all(isinstance(move, str) for move in sequence):
+        moves = tuple(parse_sequence(' '.join(sequence)))
+    else:
+        moves = tuple(int(action) for action in sequence)
+    return _compile_moves(moves, edge_length)
+
+
+# Packing states with 3 bits per facelet turns every 8 facelets into a 24-bit word (first facelet
+# in the most significant bits), written out as 3 big-endian bytes.
+_facelet_weights = 8 ** np.arange(7, -1, -1, dtype=np.uint32)
+_byte_shifts = np.array([16, 8, 0], dtype=np.uint32)
+
+
+def pack_states(faces):
+    """
+    Packs faces (a single (6, N, N) state or a batch (..., 6, N, N)) with 3 bits per facelet.
+    Returns a uint8 array of shape (..., num_bytes).
+    """
+    faces = np.asarray(faces)
+    flat_faces = faces.reshape(faces.shape[:-3] + (-1,))
+    num_facelets = flat_faces.shape[-1]
+    num_words = (num_facelets + 7) // 8
+    padded = np.zeros(flat_faces.shape[:-1] + (8 * num_words,), dtype=np.uint32)
+    padded[..., :num_facelets] = flat_faces
+    words = padded.reshape(flat_faces.shape[:-1] + (num_words, 8)) @ _facelet_weights
+    packed = (words[..., None] >> _byte_shifts).astype(np.uint8)
+    return packed.reshape(flat_faces.shape[:-1] + (3 * num_words,))[..., :(3 * num_facelets + 7) // 8]
+
+
+def unpack_states(packed, edge_length):
+    """Returns the faces (shape (..., 6, N, N)) of states packed by pack_states."""
+    packed = np.asarray(packed, dtype=np.uint8)
+    num_facelets = 6 * edge_length * edge_length
+    bits = np.unpackbits(packed, axis=-1, count=3 * num_facelets)
+    bits = bits.reshape(packed.shape[:-1] + (num_facelets, 3))
+    faces = (bits[..., 0] << 2) | (bits[..., 1] << 1) | bits[..., 2]
+    return faces.reshape(packed.shape[:-1] + (6, edge_length, edge_length))
+
+
+def solved_faces(edge_length):
+    """Returns the faces of a solved Cube of the given size."""
+    faces = np.empty([6, edge_length, edge_length], dtype=np.uint8)
+    for face_idx in range(6):
+        faces[face_idx].fill(face_idx)
+    return faces
+
+
+def cw_rotate_take_idxs(edge_length):
+    """Returns the take() indices rotating a single face clockwise."""
+    idxs = np.arange(edge_length * edge_length).reshape(edge_length, edge_length)
+    return np.flip(idxs.transpose(), axis=[1])
+
+
 class Cube():
     """Emulates a Rubik's Cube."""
     def __init__(self, edge_length):
         self.edge_length = edge_length
         self.faces = np.zeros([6, self.edge_length, self.edge_length], dtype=np.uint8)
-        cw_rotate_take_idxs = np.arange(self.edge_length * self.edge_length)
-        cw_rotate_take_idxs = cw_rotate_take_idxs.reshape(self.edge_length, self.edge_length)
-        self.cw_rotate_take_idxs = np.flip(cw_rotate_take_idxs.transpose(), axis=[1])
+        self.cw_rotate_take_idxs = cw_rotate_take_idxs(self.edge_length)
+        # Flat facelet permutation of every action, shared by all Cubes of this size.
+        self.move_table = get_move_table(self.edge_length)
         for face_idx in range(self.faces.shape[0]):
             self.faces[face_idx].fill(face_idx)
     
@@ -96,6 +431,14 @@ class Cube():
                 print(f"Avviso: Chiave '{key}' non trovata nella mappatura. Ignorata.")
 
     def rotate(self, action):
+        """Take the given action as a single gather over the flattened faces."""
+        np.take(self.faces, self.move_table[action], out=self.faces.reshape(-1))
+
+    def reference_rotate(self, action):
+        """
+        Take the given action face by face.
+        Slow; only used to build the move tables.
+        """
         if action < 12:
             self.rotate_face(action)
             self.rotate_edges(action)
@@ -281,13 +624,29 @@ class Cube():
                 d_face.transpose()[col_idx] = f_face_copy.transpose()[col_idx]
                 f_face.transpose()[col_idx] = u_face_copy.transpose()[col_idx]
 
+    def apply_permutation(self, permutation):
+        """Rearrange the facelets through a flat permutation (e.g. from sequence_permutation)."""
+        np.take(self.faces, permutation, out=self.faces.reshape(-1))
+
+    def apply_sequence(self, sequence):
+        """Take a whole sequence of moves (notation string, list of moves or of actions) in one step."""
+        self.apply_permutation(compile_sequence(sequence, self.edge_length))
+
     def scramble(self, iterations=scramble_iterations):
-        """Rotate the Cube randomly the specified number of times (iterations)."""
-        for _ in range(iterations):
-            self.random_rotation()    
+        """
+        Rotate the Cube randomly the specified number of times (iterations).
+        The actions are drawn exactly as repeated random_rotation() calls would draw them,
+        but are composed into a single permutation and applied in one step.
+        Returns the list of drawn actions.
+        """
+        action_range = range(num_actions(self.edge_length))
+        actions = [random.choice(action_range) for _ in range(iterations)]
+        self.apply_permutation(sequence_permutation(actions, self.edge_length))
+        return actions
+
     def random_rotation(self):
         """Take a random rotation action."""
-        action = random.choice(range(12 + 4*(self.edge_length-2)))
+        action = random.choice(range(num_actions(self.edge_length)))
         self.rotate(action)
         return action
     
@@ -341,9 +700,110 @@ class Cube():
 
         return cube_str
 
+    def is_solved(self):
+        """Returns whether every face only shows its own colour."""
+        return bool(np.all(self.faces == solved_faces(self.edge_length)))
+
+    def key(self):
+        """
+        Returns a compact bytes key of the Cube's state (3 bits per facelet).
+        Equal keys mean equal states, so keys can fill visited sets and caches.
+        """
+        return pack_states(self.faces).tobytes()
+
+    @classmethod
+    def from_key(cls, key, edge_length):
+        """Returns the Cube whose state was packed into key."""
+        cube = cls(edge_length)
+        cube.faces[:] = unpack_states(np.frombuffer(key, dtype=np.uint8), edge_length)
+        return cube
+
     def __eq__(self, other):
         return np.array_equal(self.faces, other.faces)
-    
+
+    def __hash__(self):
+        # Cubes are mutable: do not rotate a Cube while it is stored in a set or dict.
+        return hash(self.key())
+
+
+class BatchCube():
+    """
+    Emulates many Rubik's Cubes of the same size at once.
+    All Cubes live in one contiguous (batch_size, 6, N, N) array,
+    so a vector of actions (one per Cube) is applied with a single gather.
+    """
+    def __init__(self, batch_size, edge_length):
+        self.edge_length = edge_length
+        self.num_facelets = 6 * edge_length * edge_length
+        self.faces = np.empty([batch_size, 6, edge_length, edge_length], dtype=np.uint8)
+        self.move_table = get_move_table(edge_length)
+        self._solved_faces = solved_faces(edge_length)
+        # Offset of each Cube's first facelet in the flattened batch.
+        self._offsets = (np.arange(batch_size, dtype=np.intp) * self.num_facelets)[:, None]
+        self.reset()
+
+    @classmethod
+    def from_cubes(cls, cubes):
+        """Returns a BatchCube holding copies of the given Cubes."""
+        batch = cls(len(cubes), cubes[0].edge_length)
+        for idx, cube in enumerate(cubes):
+            batch.set_cube(idx, cube)
+        return batch
+
+    def __len__(self):
+        return self.faces.shape[0]
+
+    def copy(self):
+        """Returns a deep copy of the BatchCube."""
+        clone_batch = BatchCube(len(self), self.edge_length)
+        clone_batch.faces[:] = self.faces
+        return clone_batch
+
+    def reset(self, idxs=None):
+        """Reset all Cubes, or only the selected ones (indices or boolean mask), to solved."""
+        if idxs is None:
+            self.faces[:] = self._solved_faces
+        else:
+            self.faces[idxs] = self._solved_faces
+
+    def get_cube(self, idx):
+        """Returns a copy of the Cube at the given index."""
+        cube = Cube(self.edge_length)
+        cube.faces[:] = self.faces[idx]
+        return cube
+
+    def set_cube(self, idx, cube):
+        """Overwrites the Cube at the given index with the state of cube."""
+        if cube.edge_length != self.edge_length:
+            raise ValueError(f'Cannot insert a cube of size {cube.edge_length} in a batch of size {self.edge_length}.')
+        self.faces[idx] = cube.faces
+
+    def rotate(self, actions):
+        """
+        Take one action per Cube (an array of batch_size actions),
+        or the same action on every Cube if a single action is given.
+        """
+        flat_faces = self.faces.reshape(len(self), self.num_facelets)
+        if np.ndim(actions) == 0:
+            np.take(flat_faces, self.move_table[actions], axis=1, out=flat_faces)
+        else:
+            idxs = self.move_table[np.asarray(actions)]
+            idxs += self._offsets
+            np.take(self.faces, idxs, out=flat_faces)
+
+    def is_solved(self):
+        """Returns a boolean array telling which Cubes are solved."""
+        return np.all(self.faces == self._solved_faces, axis=(1, 2, 3))
+
+    def keys(self):
+        """Returns the packed state of every Cube as a (batch_size, num_bytes) uint8 array (see Cube.key)."""
+        return pack_states(self.faces)
+
+    def equal(self, other):
+        """Returns a boolean array telling which Cubes equal other (a BatchCube or a single Cube)."""
+        return np.all(self.faces == other.faces, axis=(-3, -2, -1))
+
+
 def main():
     global edge_length
     load_custom_cube = False
@@ -0,0 +1,183 @@
+"""
+Search-based inference with the DQN of ai_learner.
+
+Rather than following the network greedily one state at a time, these searches
+expand a whole batch of states at once and score all of their children with a
+single forward pass, which is where CPU inference gets its throughput.
+States are kept packed (see rubiks.pack_states) and deduplicated by their keys.
+"""
+
+import time
+import heapq
+import logging
+from collections import namedtuple
+import numpy as np
+import torch
+import rubiks
+
+# Row c is the one-hot encoding of colour c.
+_one_hot_colours = np.eye(6, dtype=np.float32)
+
+
+class SearchResult(namedtuple('SearchResult', ('solution', 'nodes', 'forward_passes', 'seconds'))):
+    """
+    Outcome of a search: the solution (list of rubiks.Cube actions, None if none was found),
+    the number of nodes expanded, the number of network forward passes and the time taken.
+    """
+    @property
+    def nodes_per_second(self):
+        return self.nodes / self.seconds if self.seconds > 0 else 0.
+
+    @property
+    def forward_passes_per_second(self):
+        return self.forward_passes / self.seconds if self.seconds > 0 else 0.
+
+    def __str__(self):
+        outcome = 'No solution found' if self.solution is None else 'Solution ({0} moves)'.format(len(self.solution))
+        return '{0}\nNodes: {1} in {2:.2f} seconds ({3:.0f} nodes/s), forward passes: {4} ({5:.1f}/s)'.format(
+            outcome, self.nodes, self.seconds, self.nodes_per_second, self.forward_passes, self.forward_passes_per_second)
+
+
+def encode_states(faces, device):
+    """Returns the one-hot network input (shape (batch, 6*6*N*N)) of a batch of faces, as built by ai_learner."""
+    one_hot = _one_hot_colours[np.asarray(faces).reshape(len(faces), -1)]
+    return torch.from_numpy(one_hot.reshape(len(faces), -1)).to(device)
+
+
+def state_values(net, faces, device):
+    """Returns the value (the best Q value) of every state of a batch of faces, in one forward pass."""
+    with torch.no_grad():
+        return net(encode_states(faces, device)).max(1)[0].cpu().numpy()
+
+
+def _path(parents, actions, node):
+    """Returns the actions leading from the root to the given node."""
+    path = []
+    while parents[node] >= 0:
+        path.append(actions[node])
+        node = parents[node]
+    return path[::-1]
+
+
+def weighted_astar(cube, net, device, batch_size=1000, weight=0.6, max_nodes=10 ** 6):
+    """
+    Weighted A* from the given rubiks.Cube, expanding up to batch_size states per step.
+    A state reached after g moves has priority weight * g - V, where V is its value under the network,
+    and a state already reached in as few moves is not queued again.
+    Stops at the first solved child or after expanding max_nodes states.
+    """
+    time_start = time.time()
+    edge_length = cube.edge_length
+    move_table = rubiks.get_move_table(edge_length)
+    num_actions = len(move_table)
+    solved = rubiks.solved_faces(edge_length).reshape(-1)
+    if cube.is_solved():
+        return SearchResult([], 0, 0, time.time() - time_start)
+
+    # Node data, indexed by node number.
+    keys = [cube.key()]
+    parents = [-1]
+    actions = [-1]
+    costs = [0]
+    best_cost = {keys[0]: 0}
+    open_list = [(0., 0)]
+    nodes = 0
+    forward_passes = 0
+    while open_list and nodes < max_nodes:
+        batch = []
+        while open_list and len(batch) < min(batch_size, max_nodes - nodes):
+            _, node = heapq.heappop(open_list)
+            # Skip the entries of states reached again in fewer moves.
+            if best_cost[keys[node]] == costs[node]:
+                batch.append(node)
+        if not batch:
+            break
+        nodes += len(batch)
+
+        packed = np.frombuffer(b''.join(keys[node] for node in batch), dtype=np.uint8).reshape(len(batch), -1)
+        parent_faces = rubiks.unpack_states(packed, edge_length).reshape(len(batch), -1)
+        child_faces = parent_faces[:, move_table].reshape(len(batch) * num_actions, -1)
+        solved_children = np.flatnonzero(np.all(child_faces == solved, axis=1))
+        if len(solved_children) > 0:
+            parent, action = divmod(int(solved_children[0]), num_actions)
+            solution = _path(parents, actions, batch[parent]) + [action]
+            return SearchResult(solution, nodes, forward_passes, time.time() - time_start)
+
+        child_keys = rubiks.pack_states(child_faces.reshape(-1, 6, edge_length, edge_length))
+        # Viewed as fixed-size void items, the rows turn straight into bytes keys.
+        child_keys = child_keys.view(np.dtype((np.void, child_keys.shape[1]))).ravel().tolist()
+        child_parents = np.repeat(batch, num_actions).tolist()
+        child_costs = np.repeat([costs[node] + 1 for node in batch], num_actions).tolist()
+        new_children = []
+        for child_idx, (key, parent, cost) in enumerate(zip(child_keys, child_parents, child_costs)):
+            if best_cost.get(key, cost + 1) <= cost:
+                continue
+            best_cost[key] = cost
+            new_children.append(child_idx)
+            keys.append(key)
+            parents.append(parent)
+            actions.append(child_idx % num_actions)
+            costs.append(cost)
+        if not new_children:
+            continue
+
+        values = state_values(net, child_faces[new_children].reshape(-1, 6, edge_length, edge_length), device)
+        forward_passes += 1
+        first_node = len(keys) - len(new_children)
+        for node, value in enumerate(values.tolist(), first_node):
+            heapq.heappush(open_list, (weight * costs[node] - value, node))
+
+    logging.info(f'Weighted A* stopped without a solution after {nodes} nodes.')
+    return SearchResult(None, nodes, forward_passes, time.time() - time_start)
+
+
+def beam_search(cube, net, device, beam_width=100, max_depth=100):
+    """
+    Beam search from the given rubiks.Cube: at every depth the whole beam is scored with one forward
+    pass, and the beam_width children with the highest Q values, among the states not seen before, form
+    the next beam. Ties are broken by beam position and action, so the search is deterministic.
+    Stops at the first solved state, when the beam empties or after max_depth moves.
+    """
+    time_start = time.time()
+    edge_length = cube.edge_length
+    move_table = rubiks.get_move_table(edge_length)
+    num_actions = len(move_table)
+    solved = rubiks.solved_faces(edge_length).reshape(-1)
+    if cube.is_solved():
+        return SearchResult([], 0, 0, time.time() - time_start)
+
+    beam_faces = cube.faces.reshape(1, -1)
+    beam_paths = [[]]
+    seen = {cube.key()}
+    nodes = 0
+    forward_passes = 0
+    for depth in range(max_depth):
+        with torch.no_grad():
+            q_values = net(encode_states(beam_faces, device)).cpu().numpy()
+        forward_passes += 1
+        nodes += len(beam_faces)
+
+        child_faces = beam_faces[:, move_table].reshape(len(beam_faces) * num_actions, -1)
+        solved_children = np.flatnonzero(np.all(child_faces == solved, axis=1))
+        if len(solved_children) > 0:
+            parent, action = divmod(int(solved_children[0]), num_actions)
+            return SearchResult(beam_paths[parent] + [action], nodes, forward_passes, time.time() - time_start)
+
+        child_keys = rubiks.pack_states(child_faces.reshape(-1, 6, edge_length, edge_length))
+        child_keys = child_keys.view(np.dtype((np.void, child_keys.shape[1]))).ravel().tolist()
+        next_beam = []
+        for child_idx in np.argsort(-q_values.ravel(), kind='stable').tolist():
+            key = child_keys[child_idx]
+            if key in seen:
+                continue
+            seen.add(key)
+            next_beam.append(child_idx)
+            if len(next_beam) == beam_width:
+                break
+        if not next_beam:
+            break
+        beam_paths = [beam_paths[child_idx // num_actions] + [child_idx % num_actions] for child_idx in next_beam]
+        beam_faces = child_faces[next_beam]
+
+    logging.info(f'Beam search stopped without a solution after {nodes} nodes.')
+    return SearchResult(None, nodes, forward_passes, time.time() - time_start)
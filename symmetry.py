@@ -0,0 +1,151 @@
+"""
+Symmetries of the Rubik's Cube.
+
+The 48 rotations and reflections of the cube act on a state by moving its
+facelets and relabelling its colours, so that the solved state stays solved.
+States related by a symmetry are equally far from solved, so tables and caches
+keyed on the canonical representative (the smallest of the 48 images) shrink by up to 48x.
+"""
+
+import functools
+import itertools
+import numpy as np
+import rubiks
+
+# Outward normal of each face: 0 front (+z), 1 top (+y), 2 left (-x), 3 bottom (-y), 4 right (+x), 5 back (-z).
+face_normals = np.array([[0, 0, 1], [0, 1, 0], [-1, 0, 0], [0, -1, 0], [1, 0, 0], [0, 0, -1]])
+
+num_symmetries = 48
+
+
+def facelet_coordinates(edge_length):
+    """
+    Returns the position (doubled, so that it is integer) and outward normal of every facelet
+    of the flattened faces, as two (6*N*N, 3) arrays.
+    """
+    steps = 2 * np.arange(edge_length) - (edge_length - 1)
+    rows, cols = np.meshgrid(steps, steps, indexing='ij')
+    rows, cols = rows.flatten(), cols.flatten()
+    side = np.full(rows.shape, edge_length)
+    positions = np.concatenate([
+        np.stack([cols, -rows, side], axis=1),      # front: columns go right, rows go down
+        np.stack([cols, side, rows], axis=1),       # top: rows go towards the front
+        np.stack([-side, -rows, cols], axis=1),     # left: columns go towards the front
+        np.stack([cols, -side, -rows], axis=1),     # bottom: rows go towards the back
+        np.stack([side, -rows, -cols], axis=1),     # right: columns go towards the back
+        np.stack([-cols, -rows, -side], axis=1),    # back: columns go left
+    ])
+    normals = np.repeat(face_normals, edge_length * edge_length, axis=0)
+    return positions, normals
+
+
+@functools.lru_cache(maxsize=None)
+def symmetry_matrices():
+    """Returns the 48 signed permutation matrices of the cube: the 24 rotations first, identity at 0."""
+    rotations = []
+    reflections = []
+    for axes in itertools.permutations(range(3)):
+        for signs in itertools.product([1, -1], repeat=3):
+            matrix = np.zeros([3, 3], dtype=int)
+            matrix[range(3), axes] = signs
+            if round(np.linalg.det(matrix)) == 1:
+                rotations.append(matrix)
+            else:
+                reflections.append(matrix)
+    rotations.sort(key=lambda matrix: not np.array_equal(matrix, np.eye(3)))
+    return tuple(rotations + reflections)
+
+
+@functools.lru_cache(maxsize=None)
+def symmetry_tables(edge_length):
+    """
+    Returns the conjugation tables (position_tables, colour_tables) of the 48 symmetries.
+    The image of faces under symmetry s is colour_tables[s][faces.flat[position_tables[s]]].
+    """
+    positions, normals = facelet_coordinates(edge_length)
+    # Look facelets up by (position, normal) to find where each one is carried.
+    facelet_index = {(tuple(p), tuple(n)): idx for idx, (p, n) in enumerate(zip(positions, normals))}
+    face_index = {tuple(n): idx for idx, n in enumerate(face_normals)}
+
+    position_tables = np.empty([num_symmetries, len(positions)], dtype=np.intp)
+    colour_tables = np.empty([num_symmetries, 6], dtype=np.uint8)
+    for sym_idx, matrix in enumerate(symmetry_matrices()):
+        moved_positions = positions @ matrix.T
+        moved_normals = normals @ matrix.T
+        for idx, (p, n) in enumerate(zip(moved_positions, moved_normals)):
+            position_tables[sym_idx, facelet_index[(tuple(p), tuple(n))]] = idx
+        for face_idx, n in enumerate(face_normals @ matrix.T):
+            colour_tables[sym_idx, face_idx] = face_index[tuple(n)]
+    position_tables.setflags(write=False)
+    colour_tables.setflags(write=False)
+    return position_tables, colour_tables
+
+
+@functools.lru_cache(maxsize=None)
+def action_symmetry_table(edge_length):
+    """
+    Returns the (48, num_actions) table of conjugated actions: taking action a and then symmetry s
+    equals taking symmetry s and then action table[s, a].
+    Entries are -1 where the conjugate is not an action (e.g. a middle slice carried onto the front axis).
+    """
+    move_table = rubiks.get_move_table(edge_length)
+    position_tables, _ = symmetry_tables(edge_length)
+    action_of_permutation = {permutation.tobytes(): action for action, permutation in enumerate(move_table)}
+    table = np.full([num_symmetries, move_table.shape[0]], -1, dtype=np.int16)
+    for sym_idx, position_table in enumerate(position_tables):
+        inverse = np.argsort(position_table)
+        for action, permutation in enumerate(move_table):
+            conjugate = inverse[permutation[position_table]]
+            table[sym_idx, action] = action_of_permutation.get(conjugate.tobytes(), -1)
+    table.setflags(write=False)
+    return table
+
+
+def apply_symmetry(faces, sym_idx):
+    """Returns the image of faces (shape (..., 6, N, N)) under the given symmetry."""
+    faces = np.asarray(faces)
+    position_tables, colour_tables = symmetry_tables(faces.shape[-1])
+    flat_faces = faces.reshape(faces.shape[:-3] + (-1,))
+    relabelled = colour_tables[sym_idx][flat_faces[..., position_tables[sym_idx]]]
+    return relabelled.reshape(faces.shape)
+
+
+def all_symmetries(faces):
+    """Returns the 48 images of faces (shape (..., 6, N, N)) along a new axis: (..., 48, 6, N, N)."""
+    faces = np.asarray(faces)
+    position_tables, colour_tables = symmetry_tables(faces.shape[-1])
+    flat_faces = faces.reshape(faces.shape[:-3] + (-1,))
+    moved = flat_faces[..., position_tables]
+    relabelled = colour_tables[np.arange(num_symmetries)[:, None], moved]
+    return relabelled.reshape(faces.shape[:-3] + (num_symmetries,) + faces.shape[-3:])
+
+
+def canonical_faces(faces):
+    """
+    Returns (canonical, sym_idx): the lexicographically smallest of the 48 images of faces
+    and the symmetry producing it. Works on single states (6, N, N) and batches (..., 6, N, N).
+    """
+    images = all_symmetries(faces)
+    flat_images = images.reshape(images.shape[:-3] + (-1,))
+    # Narrow down the candidates one facelet at a time, stopping once each state has a single one.
+    candidates = np.ones(flat_images.shape[:-1], dtype=bool)
+    for facelet_idx in range(flat_images.shape[-1]):
+        values = np.where(candidates, flat_images[..., facelet_idx], 255)
+        candidates &= values == values.min(axis=-1, keepdims=True)
+        if np.all(candidates.sum(axis=-1) == 1):
+            break
+    sym_idx = np.argmax(candidates, axis=-1)
+    canonical = np.take_along_axis(images, sym_idx[..., None, None, None, None], axis=-4)[..., 0, :, :, :]
+    return canonical, sym_idx
+
+
+def canonical_key(cube):
+    """Returns the packed key (see rubiks.Cube.key) of the canonical form of a Cube."""
+    canonical, _ = canonical_faces(cube.faces)
+    return rubiks.pack_states(canonical).tobytes()
+
+
+def canonical_keys(faces):
+    """Returns the packed keys (a (..., num_bytes) uint8 array) of the canonical forms of a batch of faces."""
+    canonical, _ = canonical_faces(faces)
+    return rubiks.pack_states(canonical)
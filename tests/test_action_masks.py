@@ -0,0 +1,45 @@
+"""
+Checks the precomputed action masks against the original rule-set of check_valid_action.
+"""
+import itertools
+from collections import deque
+
+import numpy as np
+import pytest
+
+import ai_learner
+import rubiks
+
+
+def baseline_check_valid_action(action, recent_actions):
+    """ The original check_valid_action, with the recent actions passed in. """
+    flag_valid_action = True
+
+    # Disallow moves that counter the previous move.
+    if action % 2 == 0:
+        if recent_actions[-1] == action + 1:
+            flag_valid_action = False
+    else:
+        if recent_actions[-1] == action - 1:
+            flag_valid_action = False
+
+    # Disallow 4 similar consecutive moves.
+    if recent_actions[-1] == action and len(set(itertools.islice(recent_actions, len(recent_actions) - 3, len(recent_actions)))) == 1:
+        flag_valid_action = False
+
+    return flag_valid_action
+
+
+@pytest.mark.parametrize('edge_length', [2, 3, 4])
+def test_masks_match_the_rule_set(edge_length, monkeypatch):
+    num_actions = rubiks.num_actions(edge_length)
+    # Every history of 3 actions, -1 standing for no action yet.
+    histories = np.array(list(itertools.product(range(-1, num_actions), repeat=3)))
+    masks = ai_learner.valid_action_masks(histories, num_actions)
+    monkeypatch.setattr(ai_learner, 'edge_length', edge_length)
+    for history, mask in zip(histories.tolist(), masks):
+        recent_actions = deque([-1] * (ai_learner.recent_actions_len - 3) + history, maxlen=ai_learner.recent_actions_len)
+        expected = [baseline_check_valid_action(action, recent_actions) for action in range(num_actions)]
+        assert mask.tolist() == expected, history
+        monkeypatch.setattr(ai_learner, 'recent_actions', recent_actions)
+        assert [ai_learner.check_valid_action(action) for action in range(num_actions)] == expected, history
\ No newline at end of file
@@ -0,0 +1,62 @@
+"""
+Checks that the meet-in-the-middle search finds valid, shortest solutions of short scrambles.
+"""
+import itertools
+
+import numpy as np
+import pytest
+
+import bidirectional
+import rubiks
+
+
+def scrambled(edge_length, actions):
+    cube = rubiks.Cube(edge_length)
+    cube.apply_sequence(list(actions))
+    return cube
+
+
+def solves(cube, actions):
+    cube = cube.copy()
+    cube.apply_sequence(list(actions))
+    return cube.is_solved()
+
+
+def test_solved_cube_needs_no_actions():
+    assert bidirectional.solve(rubiks.Cube(3)) == []
+
+
+@pytest.mark.parametrize('edge_length', [2, 3, 4])
+def test_solutions_are_valid_and_no_longer_than_the_scramble(edge_length):
+    rng = np.random.default_rng(edge_length)
+    for length in range(1, 7):
+        cube = scrambled(edge_length, rng.integers(rubiks.num_actions(edge_length), size=length).tolist())
+        solution = bidirectional.solve(cube)
+        assert solution is not None and len(solution) <= length
+        assert solves(cube, solution)
+
+
+@pytest.mark.parametrize('edge_length', [2, 3])
+def test_solutions_are_shortest(edge_length):
+    rng = np.random.default_rng(edge_length)
+    num_actions = rubiks.num_actions(edge_length)
+    for _ in range(10):
+        cube = scrambled(edge_length, rng.integers(num_actions, size=3).tolist())
+        solution = bidirectional.solve(cube)
+        # No sequence of fewer actions solves the cube.
+        for length in range(len(solution)):
+            assert not any(solves(cube, actions) for actions in itertools.product(range(num_actions), repeat=length))
+
+
+def test_gives_up_past_max_depth_or_time_limit():
+    cube = scrambled(3, [0, 2, 4, 6, 8, 10])
+    assert bidirectional.solve(cube, max_depth=4) is None
+    assert bidirectional.solve(cube, max_states=1000) is None
+    assert len(bidirectional.solve(cube, time_limit=60)) == 6
+
+
+def test_contains_keys():
+    level = np.array([b'ab', b'cd', b'ef'], dtype='V2')
+    keys = np.array([b'cd', b'aa', b'ef', b'zz'], dtype='V2')
+    assert bidirectional.contains_keys(level, keys).tolist() == [True, False, True, False]
+    assert not bidirectional.contains_keys(level[:0], keys).any()
\ No newline at end of file
@@ -0,0 +1,52 @@
+"""
+Checks the endgame table against the bidirectional search on short scrambles.
+"""
+import numpy as np
+import pytest
+
+import bidirectional
+import endgame
+import rubiks
+
+depth = 4
+
+
+@pytest.fixture(scope='module', params=[2, 3])
+def table(request, tmp_path_factory):
+    tables_dir = rubiks.tables_dir
+    rubiks.tables_dir = str(tmp_path_factory.mktemp('tables'))
+    try:
+        endgame.build_endgame_table(depth, request.param, processes=1)
+        yield endgame.EndgameTable(depth, request.param)
+    finally:
+        rubiks.tables_dir = tables_dir
+
+
+def scrambles(edge_length, rng, num_scrambles=30, max_length=7):
+    for _ in range(num_scrambles):
+        cube = rubiks.Cube(edge_length)
+        cube.apply_sequence(rng.integers(rubiks.num_actions(edge_length), size=rng.integers(max_length + 1)).tolist())
+        yield cube
+
+
+def test_distances_match_the_bidirectional_search(table):
+    rng = np.random.default_rng(table.edge_length)
+    for cube in scrambles(table.edge_length, rng):
+        distance, _ = table.lookup(cube.faces)
+        shortest = len(bidirectional.solve(cube))
+        assert distance == (shortest if shortest <= depth else -1)
+        solution = table.solution(cube)
+        if distance < 0:
+            assert solution is None
+        else:
+            assert len(solution) == distance
+            cube.apply_sequence(solution)
+            assert cube.is_solved()
+
+
+def test_batch_lookup_matches_single_lookups(table):
+    rng = np.random.default_rng(table.edge_length)
+    cubes = list(scrambles(table.edge_length, rng, num_scrambles=20))
+    distances, actions = table.lookup(np.stack([cube.faces for cube in cubes]))
+    for cube, distance, action in zip(cubes, distances, actions):
+        assert (distance, action) == table.lookup(cube.faces)
\ No newline at end of file
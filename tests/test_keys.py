@@ -0,0 +1,49 @@
+"""
+Checks the bit-packed state keys of Cube and BatchCube.
+"""
+import numpy as np
+import pytest
+
+import rubiks
+
+
+def scrambled_cubes(edge_length, num_cubes, rng):
+    cubes = []
+    for _ in range(num_cubes):
+        cube = rubiks.Cube(edge_length)
+        cube.apply_sequence(rng.integers(rubiks.num_actions(edge_length), size=30).tolist())
+        cubes.append(cube)
+    return cubes
+
+
+@pytest.mark.parametrize('edge_length', [2, 3, 4, 5, 6, 7])
+def test_key_round_trip(edge_length):
+    rng = np.random.default_rng(edge_length)
+    for cube in [rubiks.Cube(edge_length)] + scrambled_cubes(edge_length, 20, rng):
+        key = cube.key()
+        assert len(key) == (3 * 6 * edge_length * edge_length + 7) // 8
+        restored = rubiks.Cube.from_key(key, edge_length)
+        assert np.array_equal(restored.faces, cube.faces)
+        assert restored == cube and hash(restored) == hash(cube)
+
+    # Any colours at all (including the largest value), not only reachable states.
+    faces = rng.integers(6, size=(50, 6, edge_length, edge_length), dtype=np.uint8)
+    faces[0] = 5
+    assert np.array_equal(rubiks.unpack_states(rubiks.pack_states(faces), edge_length), faces)
+
+
+@pytest.mark.parametrize('edge_length', [2, 3, 4])
+def test_keys_tell_states_apart(edge_length):
+    rng = np.random.default_rng(edge_length)
+    cubes = scrambled_cubes(edge_length, 50, rng)
+    distinct_states = {cube.faces.tobytes() for cube in cubes}
+    assert len({cube.key() for cube in cubes}) == len(distinct_states)
+    assert len(set(cubes)) == len(distinct_states)
+    assert rubiks.Cube.from_key(cubes[0].key(), edge_length) in set(cubes)
+
+
+@pytest.mark.parametrize('edge_length', [2, 3, 5])
+def test_batch_keys_match_cube_keys(edge_length):
+    cubes = scrambled_cubes(edge_length, 10, np.random.default_rng(edge_length))
+    batch = rubiks.BatchCube.from_cubes(cubes)
+    assert [bytes(key) for key in batch.keys()] == [cube.key() for cube in cubes]
\ No newline at end of file
@@ -0,0 +1,33 @@
+"""
+Checks the precomputed move tables against the original face-by-face rotations.
+"""
+import numpy as np
+import pytest
+
+import rubiks
+
+
+@pytest.mark.parametrize('edge_length', [2, 3, 4, 5, 6])
+def test_move_table_matches_reference_rotate(edge_length):
+    move_table = rubiks.get_move_table(edge_length)
+    assert move_table.shape == (rubiks.num_actions(edge_length), 6 * edge_length * edge_length)
+    for action in range(rubiks.num_actions(edge_length)):
+        # Numbered facelets show where each one goes.
+        reference = rubiks.Cube(edge_length)
+        reference.faces = np.arange(6 * edge_length * edge_length, dtype=np.uint8).reshape(6, edge_length, edge_length)
+        cube = reference.copy()
+        reference.reference_rotate(action)
+        cube.rotate(action)
+        assert np.array_equal(cube.faces, reference.faces), action
+
+
+@pytest.mark.parametrize('edge_length', [2, 3, 4, 5, 6])
+def test_sequences_match_reference_rotate(edge_length):
+    rng = np.random.default_rng(edge_length)
+    actions = rng.integers(rubiks.num_actions(edge_length), size=200)
+    reference = rubiks.Cube(edge_length)
+    for action in actions:
+        reference.reference_rotate(int(action))
+    cube = rubiks.Cube(edge_length)
+    cube.apply_sequence(actions.tolist())
+    assert np.array_equal(cube.faces, reference.faces)
\ No newline at end of file
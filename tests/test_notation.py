@@ -0,0 +1,35 @@
+"""
+Checks that standard notation means the same move on rubiks.Cube and on the app's cube_status.Cube.
+"""
+import numpy as np
+import pytest
+
+import cube_status
+import rubiks
+
+
+@pytest.mark.parametrize('edge_length', [2, 3, 4, 5])
+def test_action_notation_compiles_to_its_action(edge_length):
+    move_table = rubiks.get_move_table(edge_length)
+    for action, name in enumerate(rubiks.action_notation(edge_length)):
+        assert np.array_equal(rubiks.compile_sequence(name, edge_length), move_table[action]), name
+
+
+@pytest.mark.parametrize('edge_length', [2, 3, 4, 5])
+def test_rotations_turn_every_layer(edge_length):
+    for rotation, face, opposite in [('x', 'R', 'L'), ('y', 'U', 'D'), ('z', 'F', 'B')]:
+        layers = [face] + ['{0}{1}'.format(layer, face) for layer in range(2, edge_length)] + [opposite + "'"]
+        assert np.array_equal(rubiks.compile_sequence(rotation, edge_length), rubiks.compile_sequence(' '.join(layers), edge_length))
+
+
+@pytest.mark.parametrize('face', 'UFRBLD')
+def test_app_turns_match_notation(face):
+    for suffix, counter_clockwise in [('', False), ("'", True)]:
+        turned = cube_status.Cube()
+        turned.turn(face, counter_clockwise)
+        sequence = cube_status.Cube()
+        sequence.apply_sequence(face + suffix)
+        solver_cube = rubiks.Cube(3)
+        solver_cube.apply_sequence(face + suffix)
+        assert np.array_equal(turned.faces, sequence.faces)
+        assert np.array_equal(turned.faces, solver_cube.faces)
\ No newline at end of file
@@ -0,0 +1,52 @@
+"""
+Checks the 2x2x2 distance table against the bidirectional search on short scrambles.
+"""
+import numpy as np
+
+import bidirectional
+import pocket
+import rubiks
+import twophase
+
+
+def scramble(actions):
+    cube = rubiks.Cube(2)
+    cube.apply_sequence(list(actions))
+    return cube
+
+
+def test_table_covers_every_state():
+    table = pocket.load_distance_table()
+    assert table.shape == (pocket.num_states,)
+    assert np.count_nonzero(table == 0) == 1
+    # Every 2x2x2 state is at most 14 quarter turns from solved.
+    assert table.max() == 14
+
+
+def test_distances_match_the_bidirectional_search():
+    rng = np.random.default_rng(0)
+    for length in range(9):
+        # Turning only the faces that leave the fixed corner alone, the two searches count the same moves.
+        cube = scramble(rng.choice(pocket.moves, size=length).tolist())
+        assert int(pocket.distances(cube.faces)) == len(bidirectional.solve(cube))
+
+        # Any other action may be undone by a whole-cube rotation, which the table does not count.
+        cube = scramble(rng.integers(rubiks.num_actions(2), size=length).tolist())
+        assert int(pocket.distances(cube.faces)) <= min(length, len(bidirectional.solve(cube)))
+
+
+def test_solutions_are_shortest_and_valid():
+    rng = np.random.default_rng(1)
+    for _ in range(20):
+        cube = scramble(rng.integers(rubiks.num_actions(2), size=30).tolist())
+        solution = pocket.solve(cube)
+        assert twophase.solution_length(solution) == int(pocket.distances(cube.faces))
+        cube.apply_sequence(' '.join(solution))
+        assert cube.is_solved()
+
+
+def test_batch_distances():
+    rng = np.random.default_rng(2)
+    cubes = [scramble(rng.integers(rubiks.num_actions(2), size=20).tolist()) for _ in range(10)]
+    distances = pocket.distances(np.stack([cube.faces for cube in cubes]))
+    assert distances.tolist() == [int(pocket.distances(cube.faces)) for cube in cubes]
\ No newline at end of file
@@ -0,0 +1,73 @@
+"""
+Checks the memory-mapped replay memory: reopening, schema checks and the conversion of older memories.
+"""
+import json
+
+import numpy as np
+import pytest
+import torch
+
+import ai_learner
+
+device = torch.device('cpu')
+
+
+def random_transitions(num_transitions, edge_length, seed=0):
+    rng = np.random.default_rng(seed)
+    num_squares = 6 * edge_length * edge_length
+    return (
+        rng.integers(6, size=(num_transitions, num_squares), dtype=np.uint8),
+        rng.integers(12, size=num_transitions, dtype=np.uint8),
+        rng.integers(6, size=(num_transitions, num_squares), dtype=np.uint8),
+        rng.random(num_transitions, dtype=np.float32))
+
+
+def test_reopen_resumes_position_and_size(tmp_path):
+    path = str(tmp_path / 'memory')
+    states, actions, next_states, rewards = random_transitions(13, 3)
+    memory = ai_learner.ReplayMemory(10, 3, device, path)
+    memory.push_batch(states, actions, next_states, rewards)
+    memory.flush()
+    with open(ai_learner.ReplayMemory.schema_path(path)) as f:
+        assert json.load(f)['position'] == 3
+
+    reopened = ai_learner.ReplayMemory.open(path, 10, 3, device)
+    assert (reopened.position, len(reopened)) == (3, 10)
+    saved = reopened.state_dict()
+    # The ring buffer kept the last 10 transitions, oldest first.
+    assert np.array_equal(saved['states'], states[3:])
+    assert np.array_equal(saved['actions'], actions[3:])
+    assert np.array_equal(saved['next_states'], next_states[3:])
+    assert np.array_equal(saved['rewards'], rewards[3:])
+
+
+@pytest.mark.parametrize('capacity, edge_length', [(20, 3), (10, 4)])
+def test_open_rejects_another_size_or_capacity(tmp_path, capacity, edge_length):
+    path = str(tmp_path / 'memory')
+    ai_learner.ReplayMemory(10, 3, device, path).flush()
+    with pytest.raises(ValueError):
+        ai_learner.ReplayMemory.open(path, capacity, edge_length, device)
+
+
+def test_load_state_dict_converts_the_transition_list(tmp_path):
+    states, actions, next_states, rewards = random_transitions(6, 2)
+    one_hot = lambda squares: torch.nn.functional.one_hot(torch.as_tensor(squares, dtype=torch.int64), 6).reshape(-1).float()
+    # Older memories were pickled lists of Transitions of one-hot tensors, with None in the unused slots.
+    saved = [
+        ai_learner.Transition(one_hot(state), torch.tensor([[int(action)]]), one_hot(next_state), torch.tensor([float(reward)]))
+        for state, action, next_state, reward in zip(states, actions, next_states, rewards)] + [None, None]
+    memory = ai_learner.ReplayMemory(4, 2, device, str(tmp_path / 'memory'))
+    memory.load_state_dict(saved)
+    converted = memory.state_dict()
+    assert len(memory) == 4
+    assert np.array_equal(converted['states'], states[2:])
+    assert np.array_equal(converted['actions'], actions[2:])
+    assert np.array_equal(converted['next_states'], next_states[2:])
+    assert np.allclose(converted['rewards'], rewards[2:])
+
+
+def test_load_state_dict_ignores_another_size():
+    states, actions, next_states, rewards = random_transitions(3, 3)
+    memory = ai_learner.ReplayMemory(4, 2, device)
+    memory.load_state_dict({'states': states, 'actions': actions, 'next_states': next_states, 'rewards': rewards})
+    assert len(memory) == 0
\ No newline at end of file
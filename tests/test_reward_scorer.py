@@ -0,0 +1,20 @@
+"""
+Checks the incremental RewardScorer against the original loop implementation of the rewards.
+"""
+import numpy as np
+import pytest
+
+import ai_learner
+import rubiks
+from test_rewards import loop_reward_function, random_cubes
+
+
+@pytest.mark.parametrize('edge_length', [2, 3, 4, 5, 6])
+def test_reward_scorer(edge_length):
+    rng = np.random.default_rng(edge_length)
+    scorer = ai_learner.RewardScorer(edge_length)
+    for cube in random_cubes(edge_length, rng, num_cubes=5):
+        assert scorer.reset(cube) == loop_reward_function(cube)
+        for action in rng.integers(rubiks.num_actions(edge_length), size=40):
+            cube.rotate(int(action))
+            assert scorer.update(cube, int(action)) == loop_reward_function(cube)
\ No newline at end of file
@@ -0,0 +1,269 @@
+"""
+Checks the vectorized reward functions of ai_learner against the original
+loop implementation, kept below as the reference.
+"""
+import numpy as np
+import pytest
+
+import ai_learner
+import rubiks
+from rubiks import Cube, face_relations
+
+
+def loop_reward_function(cube):
+    """ Calculates a cube's reward, which is a scalar measurement of how good it is. """
+    total_correct = 0.
+    reward = 0.
+
+    # Check corner correctness.
+    total_correct_corners = 0
+    total_correct_corners += loop_check_corners(cube.faces)
+    total_correct_corners *= 3
+    total_correct += total_correct_corners
+
+    if cube.edge_length >= 3:
+        # Check edge correctness.
+        total_correct_edges = 0
+        total_correct_edges += loop_check_edges(cube.faces, cube.edge_length)
+        total_correct_edges *= 2
+        total_correct += total_correct_edges
+
+        # Check inner correctness.
+        total_correct_inner = loop_check_inner(cube.faces, cube.edge_length)
+        total_correct += total_correct_inner
+
+    reward += total_correct
+
+    for face_idx,face in enumerate(cube.faces):
+        # Provides up to 2 extra points for each face, depending on colour correctness.
+        num_correct_colours = np.sum(face.flatten() == face_idx)
+        reward += 2 * num_correct_colours / (cube.edge_length * cube.edge_length)
+
+    return total_correct, reward
+
+
+def loop_check_inner(faces, edge_length):
+    """
+    Returns the number of inner blocks of a cube that are correct.
+    """
+    num_correct_inner = 0
+
+    for face_idx in range(6):
+        num_correct_inner += np.sum(faces[face_idx, 1:-1, 1:-1] == face_idx)
+    return num_correct_inner
+
+
+def loop_check_edges(faces, edge_length):
+    """
+    Returns the number of edge blocks of a cube that are entirely correct.
+    """
+    num_correct_edges = 0
+
+    for face_idx in [0, 1, 3, 5]:
+        # Face above.
+        u_face_colour = face_relations['_'.join([str(face_idx), 'u'])]
+        u_face = faces[u_face_colour]
+
+        # Face to the left.
+        l_face_colour = face_relations['_'.join([str(face_idx), 'l'])]
+        l_face = faces[l_face_colour]
+
+        # Face below.
+        d_face_colour = face_relations['_'.join([str(face_idx), 'd'])]
+        d_face = faces[d_face_colour]
+
+        # Face to the right.
+        r_face_colour = face_relations['_'.join([str(face_idx), 'r'])]
+        r_face = faces[r_face_colour]
+
+        if face_idx == 0:
+            # Check all 4 sides of face 0
+            for edge_idx in range(1, edge_length - 1):
+                # Upper edge
+                if faces[face_idx, 0, edge_idx] == face_idx:
+                    u_face_edge = u_face[-1, edge_idx]
+                    if u_face_edge == u_face_colour:
+                        num_correct_edges += 1
+                # Left edge
+                if faces[face_idx, edge_idx, 0] == face_idx:
+                    l_face_edge = l_face[edge_idx, -1]
+                    if l_face_edge == l_face_colour:
+                        num_correct_edges += 1
+                # Bottom edge
+                if faces[face_idx, -1, edge_idx] == face_idx:
+                    d_face_edge = d_face[0, edge_idx]
+                    if d_face_edge == d_face_colour:
+                        num_correct_edges += 1
+                # Right edge
+                if faces[face_idx, edge_idx, -1] == face_idx:
+                    r_face_edge = r_face[edge_idx, 0]
+                    if r_face_edge == r_face_colour:
+                        num_correct_edges += 1
+
+        elif face_idx == 1:
+            # Check left and right sides of face 1
+            for edge_idx in range(1, edge_length - 1):
+                # Left edge
+                if faces[face_idx, edge_idx, 0] == face_idx:
+                    l_face_edge = l_face[0, edge_idx]
+                    if l_face_edge == l_face_colour:
+                        num_correct_edges += 1
+                # Right edge
+                if faces[face_idx, edge_idx, -1] == face_idx:
+                    r_face_edge = r_face[0, -1-edge_idx]
+                    if r_face_edge == r_face_colour:
+                        num_correct_edges += 1
+
+        elif face_idx == 3:
+            # Check left and right sides of face 3
+            for edge_idx in range(1, edge_length - 1):
+                # Left edge
+                if faces[face_idx, edge_idx, 0] == face_idx:
+                    l_face_edge = l_face[-1, -1-edge_idx]
+                    if l_face_edge == l_face_colour:
+                        num_correct_edges += 1
+                # Right edge
+                if faces[face_idx, edge_idx, -1] == face_idx:
+                    r_face_edge = r_face[-1, edge_idx]
+                    if r_face_edge == r_face_colour:
+                        num_correct_edges += 1
+
+        elif face_idx == 5:
+            # Check all 4 sides of face 5
+            for edge_idx in range(1, edge_length - 1):
+                # Upper edge
+                if faces[face_idx, 0, edge_idx] == face_idx:
+                    u_face_edge = u_face[0, -1-edge_idx]
+                    if u_face_edge == u_face_colour:
+                        num_correct_edges += 1
+                # Left edge
+                if faces[face_idx, edge_idx, 0] == face_idx:
+                    l_face_edge = l_face[edge_idx, -1]
+                    if l_face_edge == l_face_colour:
+                        num_correct_edges += 1
+                # Bottom edge
+                if faces[face_idx, -1, edge_idx] == face_idx:
+                    d_face_edge = d_face[-1, -1-edge_idx]
+                    if d_face_edge == d_face_colour:
+                        num_correct_edges += 1
+                # Right edge
+                if faces[face_idx, edge_idx, -1] == face_idx:
+                    r_face_edge = r_face[edge_idx, 0]
+                    if r_face_edge == r_face_colour:
+                        num_correct_edges += 1
+
+    return num_correct_edges
+
+
+def loop_check_corners(faces):
+    """
+    Returns the number of corner blocks of a cube that are entirely correct.
+    """
+    num_correct_corners = 0
+
+    for face_idx in [0, 5]:
+        # Face above.
+        u_face_colour = face_relations['_'.join([str(face_idx), 'u'])]
+        u_face = faces[u_face_colour]
+
+        # Face to the left.
+        l_face_colour = face_relations['_'.join([str(face_idx), 'l'])]
+        l_face = faces[l_face_colour]
+
+        # Face below.
+        d_face_colour = face_relations['_'.join([str(face_idx), 'd'])]
+        d_face = faces[d_face_colour]
+
+        # Face to the right.
+        r_face_colour = face_relations['_'.join([str(face_idx), 'r'])]
+        r_face = faces[r_face_colour]
+
+        if face_idx == 0:
+            # Top-left
+            if faces[face_idx, 0, 0] == face_idx:
+                l_face_corner = l_face[0, -1]
+                if l_face_corner == l_face_colour:
+                    u_face_corner = u_face[-1, 0]
+                    if u_face_corner == u_face_colour:
+                        num_correct_corners += 1
+            # Top-right
+            if faces[face_idx, 0, -1] == face_idx:
+                r_face_corner = r_face[0, 0]
+                if r_face_corner == r_face_colour:
+                    u_face_corner = u_face[-1, -1]
+                    if u_face_corner == u_face_colour:
+                        num_correct_corners += 1
+            # Bottom-left
+            if faces[face_idx, -1, 0] == face_idx:
+                l_face_corner = l_face[-1, -1]
+                if l_face_corner == l_face_colour:
+                    d_face_corner = d_face[0, 0]
+                    if d_face_corner == d_face_colour:
+                        num_correct_corners += 1
+            # Bottom-right
+            if faces[face_idx, -1, -1] == face_idx:
+                r_face_corner = r_face[-1, 0]
+                if r_face_corner == r_face_colour:
+                    d_face_corner = d_face[0, -1]
+                    if d_face_corner == d_face_colour:
+                        num_correct_corners += 1
+
+        elif face_idx == 5:
+            # Top-left
+            if faces[face_idx, 0, 0] == face_idx:
+                l_face_corner = l_face[0, -1]
+                if l_face_corner == l_face_colour:
+                    u_face_corner = u_face[0, -1]
+                    if u_face_corner == u_face_colour:
+                        num_correct_corners += 1
+            # Top-right
+            if faces[face_idx, 0, -1] == face_idx:
+                r_face_corner = r_face[0, 0]
+                if r_face_corner == r_face_colour:
+                    u_face_corner = u_face[0, 0]
+                    if u_face_corner == u_face_colour:
+                        num_correct_corners += 1
+            # Bottom-left
+            if faces[face_idx, -1, 0] == face_idx:
+                l_face_corner = l_face[-1, -1]
+                if l_face_corner == l_face_colour:
+                    d_face_corner = d_face[-1, -1]
+                    if d_face_corner == d_face_colour:
+                        num_correct_corners += 1
+            # Bottom-right
+            if faces[face_idx, -1, -1] == face_idx:
+                r_face_corner = r_face[-1, 0]
+                if r_face_corner == r_face_colour:
+                    d_face_corner = d_face[-1, 0]
+                    if d_face_corner == d_face_colour:
+                        num_correct_corners += 1
+
+    return num_correct_corners
+
+
+def random_cubes(edge_length, rng, num_cubes=20, num_actions=30):
+    """ Yields scrambled cubes, then cubes with random colours on every facelet. """
+    for _ in range(num_cubes):
+        cube = Cube(edge_length)
+        for action in rng.integers(rubiks.num_actions(edge_length), size=num_actions):
+            cube.rotate(int(action))
+        yield cube
+    for _ in range(num_cubes):
+        cube = Cube(edge_length)
+        cube.faces = rng.integers(6, size=cube.faces.shape).astype(np.uint8)
+        yield cube
+
+
+@pytest.mark.parametrize('edge_length', [2, 3, 4, 5, 6])
+def test_reward_function(edge_length):
+    rng = np.random.default_rng(edge_length)
+    for cube in [Cube(edge_length)] + list(random_cubes(edge_length, rng)):
+        assert ai_learner.reward_function(cube) == loop_reward_function(cube)
+
+
+@pytest.mark.parametrize('edge_length', [2, 3, 4, 5, 6])
+def test_batch_reward_function(edge_length):
+    rng = np.random.default_rng(edge_length)
+    cubes = [Cube(edge_length)] + list(random_cubes(edge_length, rng))
+    total_correct, reward = ai_learner.batch_reward_function(np.stack([cube.faces for cube in cubes]))
+    assert [(a, b) for a, b in zip(total_correct.tolist(), reward.tolist())] == [loop_reward_function(cube) for cube in cubes]
@@ -0,0 +1,24 @@
+"""
+Checks that the solutions ai_learner prints for a cube loaded from the app replay on the app's cube.
+"""
+import pytest
+
+import ai_learner
+import cube_status
+import rubiks
+
+
+@pytest.mark.parametrize('solver', ['twophase', 'bidirectional'])
+@pytest.mark.parametrize('gui_moves', ['F R U', "U' F' R L2 D"])
+def test_printed_solution_solves_the_app_cube(solver, gui_moves, capsys, monkeypatch):
+    app_cube = cube_status.Cube()
+    app_cube.apply_sequence(gui_moves)
+    loaded_cube = rubiks.Cube(3)
+    loaded_cube.load_from_dict(dict(app_cube.blocks))
+
+    monkeypatch.setattr(ai_learner, 'solver', solver)
+    ai_learner.solver_attempt(loaded_cube)
+    solution_lines = [line for line in capsys.readouterr().out.splitlines() if line.startswith('Solution (')]
+    assert len(solution_lines) == 1
+    app_cube.apply_sequence(solution_lines[0].split(': ', 1)[1])
+    assert app_cube.solver_cube.is_solved()
\ No newline at end of file
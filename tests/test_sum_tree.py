@@ -0,0 +1,68 @@
+"""
+Checks the SumTree behind the prioritized replay memory, and that its sampling follows --seed.
+"""
+import numpy as np
+import pytest
+import torch
+
+import ai_learner
+
+
+@pytest.mark.parametrize('capacity', [1, 5, 8, 1000])
+def test_total_and_priorities(capacity):
+    rng = np.random.default_rng(capacity)
+    tree = ai_learner.SumTree(capacity)
+    priorities = rng.random(capacity)
+    tree.update(np.arange(capacity), priorities)
+    assert tree.total == pytest.approx(priorities.sum())
+    assert np.array_equal(tree.priorities(np.arange(capacity)), priorities)
+    # Every internal node holds the sum of its children.
+    internal = np.arange(1, tree.num_leaves)
+    assert np.allclose(tree.tree[internal], tree.tree[2 * internal] + tree.tree[2 * internal + 1])
+
+
+def test_batched_update_of_the_same_leaf():
+    tree = ai_learner.SumTree(10)
+    tree.update(np.arange(10), np.ones(10))
+    tree.update([3, 7, 3], [2., 4., 6.])
+    assert tree.priorities([3, 7]).tolist() == [6., 4.]
+    assert tree.total == pytest.approx(8 + 6 + 4)
+    internal = np.arange(1, tree.num_leaves)
+    assert np.allclose(tree.tree[internal], tree.tree[2 * internal] + tree.tree[2 * internal + 1])
+
+
+def test_find_matches_the_running_sum():
+    rng = np.random.default_rng(0)
+    priorities = rng.random(37)
+    priorities[[4, 20]] = 0.
+    tree = ai_learner.SumTree(len(priorities))
+    tree.update(np.arange(len(priorities)), priorities)
+    values = rng.random(1000) * priorities.sum()
+    expected = np.searchsorted(np.cumsum(priorities), values, side='right')
+    assert np.array_equal(tree.find(values), expected)
+    assert not np.isin(tree.find(values), [4, 20]).any()
+
+
+def test_sampling_is_proportional_to_priority():
+    rng = np.random.default_rng(1)
+    priorities = np.array([1., 2., 3., 4., 0., 10.])
+    tree = ai_learner.SumTree(len(priorities))
+    tree.update(np.arange(len(priorities)), priorities)
+    num_draws = 200000
+    counts = np.bincount(tree.find(rng.random(num_draws) * tree.total), minlength=len(priorities))
+    assert np.allclose(counts / num_draws, priorities / priorities.sum(), atol=0.005)
+
+
+def filled_memory():
+    memory = ai_learner.PrioritizedReplayMemory(64, 2, torch.device('cpu'))
+    states = np.random.default_rng(2).integers(6, size=(64, 24), dtype=np.uint8)
+    memory.push_batch(states, np.arange(64) % 12, states, np.arange(64, dtype=np.float32))
+    memory.update_priorities(np.arange(64), np.linspace(0., 5., 64))
+    return memory
+
+
+def test_prioritized_sampling_follows_the_seed(monkeypatch):
+    monkeypatch.setattr(ai_learner, 'root_seed', 7)
+    first, second = filled_memory(), filled_memory()
+    for _ in range(3):
+        assert np.array_equal(first.sample(16, 0.4)[1], second.sample(16, 0.4)[1])
\ No newline at end of file
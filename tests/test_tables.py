@@ -0,0 +1,64 @@
+"""
+Checks that the tables cached under rubiks.tables_dir are written whole and rebuilt when damaged.
+"""
+import os
+
+import numpy as np
+import pytest
+
+import endgame
+import rubiks
+import twophase
+
+
+@pytest.fixture
+def tables_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(rubiks, 'tables_dir', str(tmp_path))
+    monkeypatch.setattr(rubiks, '_move_tables', {})
+    return tmp_path
+
+
+def truncate(path):
+    with open(path, 'rb') as f:
+        data = f.read()
+    with open(path, 'wb') as f:
+        f.write(data[:len(data) // 2])
+
+
+def test_save_table_leaves_no_temporary_files(tables_dir):
+    path = str(tables_dir / 'table.npy')
+    rubiks.save_table(path, np.arange(10))
+    assert os.listdir(tables_dir) == ['table.npy']
+    assert np.array_equal(rubiks.load_table(path), np.arange(10))
+
+
+def test_truncated_move_table_is_rebuilt(tables_dir):
+    expected = rubiks.get_move_table(3).copy()
+    path = str(tables_dir / 'moves_3.npy')
+    truncate(path)
+    assert rubiks.load_table(path) is None
+    rubiks._move_tables.clear()
+    assert np.array_equal(rubiks.get_move_table(3), expected)
+    assert np.array_equal(np.load(path), expected)
+
+
+def test_truncated_two_phase_table_is_rebuilt(tables_dir):
+    table = np.arange(1000, dtype=np.int32)
+    twophase._cached_table('test', lambda: table, table.shape, table.dtype)
+    truncate(str(tables_dir / 'twophase_test.npy'))
+    assert np.array_equal(twophase._cached_table('test', lambda: table, table.shape, table.dtype), table)
+    assert np.array_equal(np.load(str(tables_dir / 'twophase_test.npy')), table)
+
+
+def test_incomplete_endgame_table_is_rebuilt(tables_dir):
+    hashes_path, keys_path, moves_path = endgame.build_endgame_table(2, 3, processes=1)
+    num_states = len(endgame.EndgameTable(2, 3))
+    os.remove(moves_path)
+    with pytest.raises(FileNotFoundError):
+        endgame.EndgameTable(2, 3)
+    endgame.build_endgame_table(2, 3, processes=1)
+    truncate(keys_path)
+    with pytest.raises(FileNotFoundError):
+        endgame.EndgameTable(2, 3)
+    endgame.build_endgame_table(2, 3, processes=1)
+    assert len(endgame.EndgameTable(2, 3)) == num_states
\ No newline at end of file
@@ -0,0 +1,363 @@
+"""
+Two-phase solver for the 3x3x3 Rubik's Cube (Kociemba's algorithm).
+
+Phase 1 takes the cube into the subgroup G1 = <U, D, L2, R2, F2, B2>, where every
+cubie is oriented and the four middle-layer edges sit in the middle layer.
+Phase 2 solves the cube with G1 moves only. Both phases run IDA* over cubie
+coordinates, with coordinate move tables and pruning tables that are built once
+with numpy and cached under rubiks.tables_dir.
+"""
+
+import os
+import sys
+import time
+import getopt
+import logging
+import functools
+import itertools
+import numpy as np
+import rubiks
+import cubie
+from pattern_db import arrangement_rank, arrangement_from_rank
+
+# Moves of the subgroup G1 (indices in cubie.move_names): U, U', D, D', then the half turns.
+phase2_moves = [2, 3, 6, 7] + list(range(12, 18))
+
+# Face turned by each move (0 R, 1 U, 2 F, 3 D, 4 B, 5 L) and the opposite of each face.
+move_faces = [move // 2 for move in range(12)] + list(range(6))
+opposite_faces = [5, 3, 4, 1, 2, 0]
+
+# Middle-layer edges (BR, FR, FL, BL), tracked by the slice coordinate.
+slice_edges = [8, 9, 10, 11]
+num_slice_arrangements = 12 * 11 * 10 * 9
+num_slice_combinations = 495
+num_slice_permutations = 24
+num_ud_edge_permutations = 40320
+
+# Longest phase 2 tried after each phase 1 solution: deeper phase 2 searches cost far more
+# than moving on to the next phase 1 solution.
+phase2_max_depth = 12
+
+# The 24 whole-cube rotations, one of which brings back home centres turned by slice moves.
+cube_rotations = [' '.join(filter(None, [first, second]))
+    for first in ['', 'x', 'x2', "x'", 'z', "z'"] for second in ['', 'y', 'y2', "y'"]]
+
+
+def _cached_table(name, build, shape, dtype):
+    """
+    Returns the table built by build(), stored on disk as twophase_{name}.npy if tables_dir is set.
+    A stored table without the given shape and dtype (stale or damaged) is rebuilt.
+    """
+    path = None
+    if rubiks.tables_dir is not None:
+        path = os.path.join(rubiks.tables_dir, 'twophase_{0}.npy'.format(name))
+    table = rubiks.load_table(path)
+    if table is not None:
+        if table.shape == tuple(shape) and table.dtype == dtype:
+            return table
+        logging.warning(f'Ignoring two-phase table {path} with unexpected shape {table.shape} or dtype {table.dtype}.')
+    logging.info(f'Building two-phase table {name}.')
+    table = build()
+    if path is not None:
+        try:
+            rubiks.save_table(path, table)
+        except OSError as e:
+            logging.warning(f'Could not cache two-phase table in {path}: {e}')
+    return table
+
+
+@functools.lru_cache(maxsize=None)
+def slice_tables():
+    """
+    Returns the tables of the slice coordinate (the ordered positions of the middle-layer edges):
+    [arrangement, move] -> arrangement, arrangement -> combination (0..494, which 4 positions)
+    and arrangement -> permutation (0..23, their order within those positions).
+    """
+    positions = arrangement_from_rank(np.arange(num_slice_arrangements), 12, len(slice_edges)).astype(np.intp)
+    move_table = np.empty([num_slice_arrangements, cubie.num_moves], dtype=np.int32)
+    for move_idx, move in enumerate(cubie.basic_moves()):
+        # The edge at position p is carried to the position q with move.ep[q] == p.
+        move_table[:, move_idx] = arrangement_rank(np.argsort(move.ep)[positions], 12)
+    combination_index = {combination: idx for idx, combination in enumerate(itertools.combinations(range(12), 4))}
+    combinations = np.array([combination_index[tuple(sorted(p))] for p in positions.tolist()], dtype=np.int32)
+    permutations = cubie.permutation_coordinate(np.argsort(np.argsort(positions, axis=-1), axis=-1)).astype(np.int32)
+    return move_table, combinations, permutations
+
+
+def ud_edge_move_table():
+    """Returns the table [permutation of the 8 U and D edges, move] -> permutation, -1 for moves outside G1."""
+    perms = cubie.permutation_from_coordinate(np.arange(num_ud_edge_permutations), 8)
+    table = np.full([num_ud_edge_permutations, cubie.num_moves], -1, dtype=np.int32)
+    for move_idx in phase2_moves:
+        move = cubie.basic_moves()[move_idx]
+        table[:, move_idx] = cubie.permutation_coordinate(perms[:, move.ep[:8]])
+    return table
+
+
+def reorientation(cube):
+    """Returns the whole-cube rotation (in notation, '' if none) that brings the centres of a 3x3x3 rubiks.Cube home."""
+    flat_faces = cube.faces.reshape(-1)
+    for rotation in cube_rotations:
+        if np.array_equal(flat_faces[rubiks.compile_sequence(rotation, 3)[cubie.centre_facelets]], np.arange(6)):
+            return rotation
+    raise ValueError('The centres of the cube are not a rotation of the solved ones.')
+
+
+def solution_length(solution):
+    """Returns the number of face moves of a solution, leaving out whole-cube rotations."""
+    return sum(1 for move in solution if move[0] not in 'xyz')
+
+
+def _project_move_table(move_table, projection, size):
+    """Returns the move table of a projection of the slice coordinate, -1 where a move leaves it undefined."""
+    defined = np.flatnonzero(projection >= 0)
+    representatives = np.empty(size, dtype=np.int64)
+    representatives[projection[defined]] = defined
+    moved = move_table[representatives]
+    return np.where(moved >= 0, projection[moved], -1).astype(np.int32)
+
+
+def pruning_table(table_a, table_b, moves, solved_index):
+    """
+    Returns the distances (int8) of every pair of coordinates (index a * len(table_b) + b)
+    from the solved pair, by breadth-first search with the given moves.
+    """
+    size_b = len(table_b)
+    distances = np.full(len(table_a) * size_b, -1, dtype=np.int8)
+    distances[solved_index] = 0
+    frontier = np.array([solved_index], dtype=np.int64)
+    depth = 0
+    while len(frontier) > 0:
+        a, b = np.divmod(frontier, size_b)
+        neighbours = (table_a[a][:, moves].astype(np.int64) * size_b + table_b[b][:, moves]).ravel()
+        neighbours = np.unique(neighbours[distances[neighbours] < 0])
+        depth += 1
+        distances[neighbours] = depth
+        frontier = neighbours
+    return distances
+
+
+class TwoPhaseSolver():
+    """Two-phase solver. Tables are loaded once, on construction."""
+    def __init__(self):
+        time_start = time.time()
+        slice_move, slice_combination, slice_permutation = slice_tables()
+        solved_slice = int(arrangement_rank(slice_edges, 12))
+        self.solved_slice = solved_slice
+        solved_combination = int(slice_combination[solved_slice])
+        combination_move = _project_move_table(slice_move, slice_combination, num_slice_combinations)
+        # Phase 2 keeps the middle-layer edges in the middle layer, where their order defines the projection.
+        in_slice = np.full(num_slice_arrangements, -1, dtype=np.int32)
+        in_slice[slice_combination == solved_combination] = slice_permutation[slice_combination == solved_combination]
+        permutation_move = _project_move_table(slice_move, in_slice, num_slice_permutations)
+        twist_move = cubie.corner_orientation_move_table()
+        flip_move = cubie.edge_orientation_move_table()
+        corner_move = cubie.corner_permutation_move_table()
+        ud_edge_move = _cached_table('ud_edge_moves', ud_edge_move_table,
+                                     (num_ud_edge_permutations, cubie.num_moves), np.int32)
+        all_moves = list(range(cubie.num_moves))
+
+        twist_pruning = _cached_table('twist_pruning', lambda: pruning_table(
+            twist_move, combination_move, all_moves, solved_combination),
+            (len(twist_move) * len(combination_move),), np.int8)
+        flip_pruning = _cached_table('flip_pruning', lambda: pruning_table(
+            flip_move, combination_move, all_moves, solved_combination),
+            (len(flip_move) * len(combination_move),), np.int8)
+        twist_flip_pruning = _cached_table('twist_flip_pruning', lambda: pruning_table(
+            twist_move, flip_move, all_moves, 0),
+            (len(twist_move) * len(flip_move),), np.int8)
+        corner_pruning = _cached_table('corner_pruning', lambda: pruning_table(
+            corner_move, permutation_move, phase2_moves, 0),
+            (len(corner_move) * len(permutation_move),), np.int8)
+        ud_edge_pruning = _cached_table('ud_edge_pruning', lambda: pruning_table(
+            ud_edge_move, permutation_move, phase2_moves, 0),
+            (len(ud_edge_move) * len(permutation_move),), np.int8)
+
+        # Plain lists are much faster than numpy arrays for the one-at-a-time lookups of the search.
+        self.twist_move = twist_move.tolist()
+        self.flip_move = flip_move.tolist()
+        self.slice_move = slice_move.tolist()
+        self.corner_move = corner_move.tolist()
+        self.ud_edge_move = ud_edge_move.tolist()
+        self.slice_combination = slice_combination.tolist()
+        self.slice_permutation = slice_permutation.tolist()
+        self.twist_pruning = twist_pruning.tolist()
+        self.flip_pruning = flip_pruning.tolist()
+        self.twist_flip_pruning = twist_flip_pruning.tolist()
+        self.corner_pruning = corner_pruning.tolist()
+        self.ud_edge_pruning = ud_edge_pruning.tolist()
+        # Moves allowed after each move (index 18: no previous move): never the same face twice in a row,
+        # and opposite faces (which commute) only in increasing order.
+        self.next_moves = []
+        self.next_phase2_moves = []
+        for previous in range(cubie.num_moves + 1):
+            allowed = [move for move in range(cubie.num_moves) if previous == cubie.num_moves or (
+                move_faces[move] != move_faces[previous]
+                and not (move_faces[move] == opposite_faces[move_faces[previous]] and move_faces[move] < move_faces[previous]))]
+            self.next_moves.append(allowed)
+            self.next_phase2_moves.append([move for move in allowed if move in phase2_moves])
+        logging.info('Two-phase tables loaded in {0:.2f} seconds.'.format(time.time() - time_start))
+
+    def _phase1_distance(self, twist, flip, combination):
+        return max(self.twist_pruning[twist * num_slice_combinations + combination],
+            self.flip_pruning[flip * num_slice_combinations + combination],
+            self.twist_flip_pruning[twist * cubie.num_edge_orientations + flip])
+
+    def _phase2_distance(self, corners, ud_edges, permutation):
+        return max(self.corner_pruning[corners * num_slice_permutations + permutation],
+            self.ud_edge_pruning[ud_edges * num_slice_permutations + permutation])
+
+    def solve(self, cube, max_length=30, time_limit=None):
+        """
+        Returns a solution of the given 3x3x3 rubiks.Cube (or CubieCube) as a list of move names,
+        followed by the whole-cube rotations needed if slice moves displaced the centres.
+        Without a time limit the first solution of at most max_length moves is returned; with one, the
+        search keeps looking for shorter solutions until the time (in seconds) is up.
+        Returns None if there is no solution within max_length moves.
+        Raises ValueError if the cube cannot be solved.
+        """
+        self.cubie_cube = cube if isinstance(cube, cubie.CubieCube) else cubie.CubieCube.from_cube(cube)
+        if not self.cubie_cube.is_valid():
+            raise ValueError('The cube is not solvable: a cubie is twisted, flipped or swapped.')
+        self.max_length = max_length
+        self.deadline = None if time_limit is None else time.time() + time_limit
+        self.solution = None
+        self.flag_stop = False
+        self.nodes = 0
+
+        twist = self.cubie_cube.corner_orientation
+        flip = self.cubie_cube.edge_orientation
+        slice_sorted = int(arrangement_rank(np.argsort(self.cubie_cube.ep)[slice_edges], 12))
+        depth = self._phase1_distance(twist, flip, self.slice_combination[slice_sorted])
+        while depth <= self.max_length and not self.flag_stop:
+            self._phase1(twist, flip, slice_sorted, depth, [])
+            depth += 1
+        if self.solution is None:
+            return None
+        solution = [cubie.move_names[move] for move in self.solution]
+        if not isinstance(cube, cubie.CubieCube):
+            solution += reorientation(cube).split()
+        return solution
+
+    def _phase1(self, twist, flip, slice_sorted, togo, moves):
+        if togo == 0:
+            # A phase 1 solution ending with a G1 move is a shorter one that was already tried.
+            if not moves or moves[-1] not in phase2_moves:
+                self._start_phase2(moves)
+            return
+        twist_moves = self.twist_move[twist]
+        flip_moves = self.flip_move[flip]
+        slice_moves = self.slice_move[slice_sorted]
+        for move in self.next_moves[moves[-1] if moves else cubie.num_moves]:
+            self.nodes += 1
+            new_twist = twist_moves[move]
+            new_flip = flip_moves[move]
+            new_slice = slice_moves[move]
+            combination = self.slice_combination[new_slice]
+            if (self.twist_pruning[new_twist * num_slice_combinations + combination] >= togo
+                    or self.flip_pruning[new_flip * num_slice_combinations + combination] >= togo
+                    or self.twist_flip_pruning[new_twist * cubie.num_edge_orientations + new_flip] >= togo):
+                continue
+            moves.append(move)
+            self._phase1(new_twist, new_flip, new_slice, togo - 1, moves)
+            moves.pop()
+            if self.flag_stop:
+                return
+
+    def _start_phase2(self, phase1_moves):
+        if self.solution is not None and self.deadline is not None and time.time() > self.deadline:
+            self.flag_stop = True
+            return
+        g1_cube = self.cubie_cube.copy()
+        for move in phase1_moves:
+            g1_cube.move(move)
+        corners = g1_cube.corner_permutation
+        ud_edges = int(cubie.permutation_coordinate(g1_cube.ep[:8]))
+        slice_sorted = int(arrangement_rank(np.argsort(g1_cube.ep)[slice_edges], 12))
+        depth = self._phase2_distance(corners, ud_edges, self.slice_permutation[slice_sorted])
+        moves = list(phase1_moves)
+        while depth <= min(phase2_max_depth, self.max_length - len(phase1_moves)):
+            if self._phase2(corners, ud_edges, slice_sorted, depth, moves):
+                self.solution = list(moves)
+                self.max_length = len(moves) - 1
+                self.flag_stop = self.deadline is None
+                return
+            depth += 1
+
+    def _phase2(self, corners, ud_edges, slice_sorted, togo, moves):
+        if togo == 0:
+            return corners == 0 and ud_edges == 0 and slice_sorted == self.solved_slice
+        corner_moves = self.corner_move[corners]
+        ud_edge_moves = self.ud_edge_move[ud_edges]
+        slice_moves = self.slice_move[slice_sorted]
+        for move in self.next_phase2_moves[moves[-1] if moves else cubie.num_moves]:
+            self.nodes += 1
+            new_corners = corner_moves[move]
+            new_ud_edges = ud_edge_moves[move]
+            new_slice = slice_moves[move]
+            permutation = self.slice_permutation[new_slice]
+            if (self.corner_pruning[new_corners * num_slice_permutations + permutation] >= togo
+                    or self.ud_edge_pruning[new_ud_edges * num_slice_permutations + permutation] >= togo):
+                continue
+            moves.append(move)
+            if self._phase2(new_corners, new_ud_edges, new_slice, togo - 1, moves):
+                return True
+            moves.pop()
+        return False
+
+
+@functools.lru_cache(maxsize=None)
+def get_solver():
+    """Returns the shared TwoPhaseSolver, loading its tables on first use."""
+    return TwoPhaseSolver()
+
+
+def solve(cube, max_length=30, time_limit=None):
+    """Returns a solution of the given 3x3x3 rubiks.Cube as a list of move names (see TwoPhaseSolver.solve)."""
+    return get_solver().solve(cube, max_length, time_limit)
+
+
+def main():
+    sequence = None
+    max_length = 30
+    time_limit = None
+    try:
+        opts, args = getopt.getopt(sys.argv[1:], 'h', ['scramble=', 'max_length=', 'time=', 'help'])
+        for opt, arg in opts:
+            if opt in ('-h', '--help'):
+                print('Options:')
+                print(' --scramble=MOVES    solve the cube scrambled by the given moves (default: random)')
+                print(' --max_length=N      longest solution accepted (default: 30)')
+                print(' --time=SECONDS      keep looking for shorter solutions for this long')
+                print(' -h, --help          display this help page and exit')
+                print('\n')
+                quit()
+            elif opt == '--scramble':
+                sequence = arg
+            elif opt == '--max_length':
+                max_length = int(arg)
+            elif opt == '--time':
+                time_limit = float(arg)
+    except (getopt.GetoptError, ValueError) as e:
+        print(f'\nError: {e}')
+        print("Call with option '--help' or '-h' for the help page.\n\n")
+        quit()
+
+    solver = get_solver()
+    cube = rubiks.Cube(3)
+    if sequence is not None:
+        cube.apply_sequence(sequence)
+    else:
+        cube.scramble()
+    print(cube)
+    time_start = time.time()
+    solution = solver.solve(cube, max_length, time_limit)
+    solve_time = time.time() - time_start
+    if solution is None:
+        print(f'No solution found within {max_length} moves.')
+    else:
+        print('Solution ({0} moves, {1:.3f} seconds): {2}'.format(solution_length(solution), solve_time, ' '.join(solution)))
+
+
+if __name__ == '__main__':
+    main()